@@ -24,5 +24,17 @@ JIRA_CONFIG = {
         'CT': {
             'issuetype': {'name': 'Task'}
         }
-    }
+    },
+    # look up tickets by hashes in their descriptions, set to False once bin/backfill_unique_ids.py was run
+    'legacy_lookup': True,
 }
+
+RUNNER_CONFIG = {
+    'workers':  8,
+    'timeout':  900,
+    'executor': 'thread',
+}
+
+CHECKPOINTS_PATH = '/var/lib/jira-reporter/checkpoints.sqlite'
+
+TICKET_INDEX_PATH = '/var/lib/jira-reporter/tickets.sqlite'
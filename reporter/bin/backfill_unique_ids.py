@@ -0,0 +1,78 @@
+"""
+This maintenance script copies report hashes from tickets descriptions to the unique ID custom field
+
+Tickets reported before the unique ID field was set on creation are found by duplicates look up using
+a slower search of tickets descriptions (see Jira.JQL_LEGACY_UNIQUE_ID) and are not kept in the tickets index.
+Run it once via "make backfill_unique_ids" from the base directory of this repository
+(pass --dry-run to only list the tickets that would be updated) and then set JIRA_CONFIG['legacy_lookup']
+to False to turn off the descriptions search.
+"""
+import logging
+import re
+import sys
+
+from reporter.config import JIRA_CONFIG
+from reporter.reporters import Jira
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+
+JQL = "project = 'ER' AND description ~ 'Hash' AND {field} is EMPTY"
+
+# e.g. Hash: 0b7d0f0d7bb5a1e4e20aa3f3c2e4e3c1
+HASH_REGEXP = re.compile(r'^Hash: ([0-9a-f]{32})\s*$', re.MULTILINE)
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_unique_ids(dry_run=False):
+    """
+    Set the unique ID field of tickets that have the hash in their description only
+
+    :type dry_run bool
+    :rtype: int
+    """
+    jira_api = Jira().get_api_client()
+    unique_id_field = JIRA_CONFIG['fields']['custom']['unique_id']
+
+    # fetch all tickets before updating them, the results set shrinks with every update
+    tickets = jira_api.search_issues(
+        JQL.format(field='cf[{}]'.format(unique_id_field.replace('customfield_', ''))),
+        fields=['description'],
+        maxResults=False
+    )
+
+    logger.info('Found {} tickets without the unique ID set'.format(len(tickets)))
+    updated = 0
+
+    for ticket in tickets:
+        matches = HASH_REGEXP.search(ticket.fields.description or '')
+
+        if matches is None:
+            logger.warning('{}: no hash found in the description'.format(ticket.key))
+            continue
+
+        logger.info('{}: setting the unique ID to {}'.format(ticket.key, matches.group(1)))
+
+        if dry_run:
+            continue
+
+        try:
+            ticket.update(fields={unique_id_field: matches.group(1)})
+            updated += 1
+        except Exception:
+            logger.error('{}: failed to set the unique ID'.format(ticket.key), exc_info=True)
+
+    logger.info('Updated {} tickets'.format(updated))
+
+    if not dry_run:
+        logger.info("Set JIRA_CONFIG['legacy_lookup'] to False in config.py to turn off the descriptions search")
+
+    return updated
+
+
+if __name__ == '__main__':
+    backfill_unique_ids(dry_run='--dry-run' in sys.argv[1:])
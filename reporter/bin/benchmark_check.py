@@ -0,0 +1,384 @@
+"""
+This script runs the whole bin/check.py pipeline against local stand-ins and tells where the time goes
+
+Sources query either the synthetic corpora (see reporter.fakes.log_generator) served by the local
+elasticsearch (see reporter.fakes.elasticsearch_server) or the recorded ones (see --corpus and
+reporter.sources.corpus). Reports are sent to the local Jira (see reporter.fakes.jira_server).
+
+Each data volume is handled by a fresh process (so that its peak RSS can be measured), the wall time is split
+into stages (the time spent in a stage called by another one is counted for the inner one only):
+
+* fetch - waiting for elasticsearch rows and documents (the local server time included)
+* filter - _filter and _match methods of sources
+* normalize - grouping entries (Source._normalize_entry)
+* render - completing grouped entries and generating reports (Source._get_reports)
+* classify - Classifier.classify
+* lookup - looking up duplicates in Jira (and updating the tickets found)
+* create - creating new tickets
+* other - the rest, e.g. the runner and the rate limiter
+
+Stage times are summed over all threads, so they add up to the wall time only with --workers 1.
+
+Run it via "make benchmark_check" from the base directory of this repository (config.py is needed
+by bin/check.py, Jira is configured to use the local server), e.g.
+
+python reporter/bin/benchmark_check.py --entries 10000,100000,1000000
+python reporter/bin/benchmark_check.py --corpus /tmp/corpus --workers 8
+"""
+import argparse
+import functools
+import logging
+import multiprocessing
+import resource
+import shutil
+import tempfile
+import threading
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from jira.client import JIRA
+
+from reporter.bin.check import JOBS
+from reporter.classifier import Classifier
+from reporter.fakes.elasticsearch_server import FakeElasticsearchServer
+from reporter.fakes.jira_server import FakeJiraServer
+from reporter.fakes.log_generator import LogGenerator
+from reporter.reporters import Jira
+from reporter.runner import SourceJob, SourcesRunner
+from reporter.sources.anemometer.client import AnemometerClient
+from reporter.sources.common import Source, KibanaSource
+from reporter.sources.corpus import CorpusStore
+from reporter.sources.kibana import PaginatedKibana
+
+UNIQUE_ID_FIELD = 'customfield_13200'
+LAST_SEEN_FIELD = 'customfield_16900'
+
+STAGES = ('fetch', 'filter', 'normalize', 'render', 'classify', 'lookup', 'create')
+
+# synthetic corpora are spread over a bit shorter window than sources query for (the last hour),
+# so that no entries fall out of it while the corpus is being written
+WINDOW = 3300  # [sec]
+
+
+class StageTimer(object):
+    """
+    Sums up the time spent in each stage, the stack of stages entered is kept for each thread
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._times = Counter()
+
+    def get_times(self):
+        """
+        :rtype: dict[str, float]
+        """
+        with self._lock:
+            return dict(self._times)
+
+    def _add(self, stage, took):
+        with self._lock:
+            self._times[stage] += took
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Count the time spent in the with block for a given stage (the outer stage is paused meanwhile)
+
+        :type name str
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+
+        stack = self._local.stack
+        started = time.perf_counter()
+
+        if stack:
+            (outer, outer_started) = stack[-1]
+            self._add(outer, started - outer_started)
+
+        stack.append((name, started))
+
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._add(name, now - stack.pop()[1])
+
+            if stack:
+                stack[-1] = (stack[-1][0], now)
+
+    def wrap(self, owner, method, stage):
+        """
+        Count calls of a given method for a given stage
+
+        :type owner type
+        :type method str
+        :type stage str
+        """
+        func = owner.__dict__[method]
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            with self.stage(stage):
+                return func(*args, **kwargs)
+
+        setattr(owner, method, _wrapper)
+
+    def wrap_iterator(self, owner, method, stage):
+        """
+        Count calls of a given method and getting each item of the iterable it returns for a given stage
+
+        :type owner type
+        :type method str
+        :type stage str
+        """
+        func = owner.__dict__[method]
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            with self.stage(stage):
+                items = iter(func(*args, **kwargs))
+
+            return self._iterate(items, stage)
+
+        setattr(owner, method, _wrapper)
+
+    def _iterate(self, items, stage):
+        while True:
+            with self.stage(stage):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+
+            yield item
+
+
+def get_subclasses(cls):
+    """
+    :type cls type
+    :rtype: set[type]
+    """
+    subclasses = set()
+
+    for subclass in cls.__subclasses__():
+        subclasses.add(subclass)
+        subclasses |= get_subclasses(subclass)
+
+    return subclasses
+
+
+def instrument(timer):
+    """
+    Wrap methods of each stage of the pipeline with the timer
+
+    :type timer StageTimer
+    """
+    timer.wrap_iterator(PaginatedKibana, '_search', 'fetch')
+    timer.wrap(PaginatedKibana, 'get_documents', 'fetch')
+    timer.wrap(AnemometerClient, 'get_queries', 'fetch')
+
+    for source_class in get_subclasses(Source):
+        for method in ('_filter', '_match'):
+            if method in source_class.__dict__:
+                timer.wrap(source_class, method, 'filter')
+
+    timer.wrap(Source, '_normalize_entry', 'normalize')
+    timer.wrap(Source, '_get_reports', 'render')
+    timer.wrap(Classifier, 'classify', 'classify')
+    timer.wrap(Jira, 'find_tickets', 'lookup')
+    timer.wrap(Jira, 'ticket_exists', 'lookup')
+    timer.wrap(JIRA, 'create_issue', 'create')
+
+
+def get_jobs(corpus=None, es_host=None):
+    """
+    Return bin/check.py jobs querying the recorded corpus or the local elasticsearch
+
+    Checkpoints are not used (each run should fetch the whole period). AnemometerSource is skipped
+    unless the corpus is replayed (there is no local stand-in for it).
+
+    :type corpus CorpusStore|None
+    :type es_host str|None
+    :rtype: list[SourceJob]
+    """
+    jobs = []
+
+    for job in JOBS:
+        if issubclass(job.source_class, KibanaSource):
+            job_kwargs = dict(job.kwargs, corpus=corpus, es_host=es_host)
+            job_kwargs.pop('checkpoints', None)
+        elif corpus is not None:
+            job_kwargs = dict(job.kwargs, corpus=corpus)
+        else:
+            continue
+
+        jobs.append(SourceJob(job.source_class, job.query, job.threshold, job.queries, **job_kwargs))
+
+    return jobs
+
+
+def get_peak_rss():
+    """
+    :rtype: int
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kilobytes on Linux
+
+
+def run(settings):
+    """
+    Run all sources and report their issues to the local Jira, return the results
+
+    It is called in a separate process for each data volume.
+
+    :type settings dict
+    :rtype: dict
+    """
+    # sources log every skipped group and failed report
+    logging.basicConfig(level=logging.CRITICAL)
+
+    timer = StageTimer()
+    instrument(timer)
+
+    corpus = CorpusStore(settings['corpus']) if settings['corpus'] else None
+    jobs = get_jobs(corpus=corpus, es_host=settings['es_host'])
+
+    start_rss = get_peak_rss()
+    started = time.perf_counter()
+
+    runner = SourcesRunner(workers=settings['workers'], timeout=settings['timeout'])
+    reports = list(runner.run(jobs))
+    sources_took = time.perf_counter() - started
+
+    outcomes = Jira(config=settings['jira']).report_many(reports, workers=settings['workers'])
+    took = time.perf_counter() - started
+
+    stages = timer.get_times()
+
+    return {
+        'time': took,
+        'sources_time': sources_took,
+        'jira_time': took - sources_took,
+        'stages': dict({stage: stages.get(stage, 0) for stage in STAGES},
+                       other=took - sum(stages.values())),
+        'jobs': len(jobs),
+        'timed_out': len(runner.get_timed_out_jobs()),
+        'reports': len(reports),
+        'reports_per_sec': len(reports) / took,
+        'outcomes': dict(Counter(outcomes)),
+        'start_rss': start_rss,
+        'peak_rss': get_peak_rss(),
+    }
+
+
+def run_volume(args, entries):
+    """
+    Run the pipeline for a given number of synthetic entries (or the recorded corpus when entries is None)
+
+    :type args argparse.Namespace
+    :type entries int|None
+    :rtype: dict
+    """
+    data_dir = None
+    es_server = None
+    jira_server = FakeJiraServer(latency=args.latency,
+                                 custom_fields={UNIQUE_ID_FIELD: 'Unique ID', LAST_SEEN_FIELD: 'ER Date'}).start()
+
+    settings = {
+        'corpus': args.corpus,
+        'es_host': None,
+        'workers': args.workers,
+        'timeout': args.timeout,
+        'jira': {
+            'url': jira_server.url,
+            'user': 'benchmark',
+            'password': 'benchmark',
+            'project': 'ER',
+            'fields': {
+                'default': {
+                    'issuetype': {'name': 'Defect'},
+                    'priority': {'id': '8'},
+                },
+                'custom': {
+                    'unique_id': UNIQUE_ID_FIELD,
+                    'last_seen': LAST_SEEN_FIELD,
+                },
+            },
+            'rate_limit': {'rate': args.rate, 'burst': args.burst},
+        },
+    }
+
+    try:
+        if entries is not None:
+            data_dir = tempfile.mkdtemp(prefix='benchmark-check-')
+
+            generator = LogGenerator(entries=entries, groups=args.groups, zipf=args.zipf, seed=args.seed,
+                                     window=WINDOW, now=time.time())
+            generator.write(data_dir)
+
+            es_server = FakeElasticsearchServer(data_dir=data_dir).start()
+            settings['es_host'] = es_server.url
+
+        # a fresh process for each run, so that the peak RSS of the previous one is not counted
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = executor.submit(run, settings).result()
+    finally:
+        jira_server.stop()
+
+        if es_server is not None:
+            es_server.stop()
+
+        if data_dir is not None:
+            shutil.rmtree(data_dir)
+
+    results['entries'] = entries
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end benchmark of bin/check.py pipeline')
+    parser.add_argument('--entries', default='10000,100000',
+                        help='comma separated list of synthetic corpus sizes (entries logged in an hour)')
+    parser.add_argument('--corpus', default=None, help='replay the corpus recorded in that directory instead')
+    parser.add_argument('--groups', type=int, default=100, help='how many distinct groups each source has')
+    parser.add_argument('--zipf', type=float, default=1.1, help='exponent of groups Zipf distribution')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of synthetic corpora')
+    parser.add_argument('--workers', type=int, default=1, help='sources run and reports sent at once')
+    parser.add_argument('--timeout', type=int, default=900, help='[sec] drop reports from a source that runs longer')
+    parser.add_argument('--latency', type=float, default=0.05, help='[sec] Jira response time')
+    parser.add_argument('--rate', type=float, default=Jira.RATE_LIMIT['rate'], help='Jira requests per second')
+    parser.add_argument('--burst', type=int, default=Jira.RATE_LIMIT['burst'], help='Jira requests burst')
+    parser.add_argument('--slot', type=int, default=3600, help='[sec] how often the CronJob is run')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    volumes = [None] if args.corpus else [int(value) for value in args.entries.split(',')]
+
+    print('{:>9} {:>7} {:>9} {:>8} {:>8}'.format('entries', 'reports', 'time [s]', 'sources', 'jira') +
+          ''.join(' {:>9}'.format(stage) for stage in STAGES + ('other',)) +
+          ' {:>9} {:>11} {:>6}  {}'.format('RSS [MB]', 'reports/sec', 'slot', 'outcomes'))
+
+    for entries in volumes:
+        results = run_volume(args, entries)
+
+        print('{:>9} {reports:>7} {time:>9.2f} {sources_time:>8.2f} {jira_time:>8.2f}'.format(
+            'corpus' if entries is None else entries, **results) +
+              ''.join(' {:>9.2f}'.format(results['stages'][stage]) for stage in STAGES + ('other',)) +
+              ' {:>9.1f} {:>11.1f} {:>5.0f}%  {}{}'.format(
+                  results['peak_rss'] / 1024 / 1024, results['reports_per_sec'], 100 * results['time'] / args.slot,
+                  results['outcomes'],
+                  ' ({} jobs timed out)'.format(results['timed_out']) if results['timed_out'] else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+This script measures how fast reports are sent to Jira with different concurrency and batching settings
+
+A local stand-in for Jira is used (see reporter.fakes.jira_server), a part of reports is already
+reported there (open, closed a while ago and closed as "Won't Fix" tickets).
+
+Run it via "make benchmark_jira" from the base directory of this repository (config.py is not needed,
+Jira is configured to use the local server), e.g.
+
+python reporter/bin/benchmark_jira.py --reports 300 --workers 1,4,8 --batch-sizes 1,50 --latency 0.05
+"""
+import argparse
+import hashlib
+import logging
+import time
+
+from collections import Counter
+
+from reporter.fakes.jira_server import FakeJiraServer
+from reporter.reporters import Jira
+from reporter.reports import Report
+
+UNIQUE_ID_FIELD = 'customfield_13200'
+LAST_SEEN_FIELD = 'customfield_16900'
+
+logger = logging.getLogger(__name__)
+
+
+def get_server(args):
+    """
+    Start the local Jira with a part of reports already reported
+
+    :type args argparse.Namespace
+    :rtype: FakeJiraServer
+    """
+    server = FakeJiraServer(latency=args.latency, rate_limit=args.server_rate_limit, error_rate=args.error_rate,
+                            custom_fields={UNIQUE_ID_FIELD: 'Unique ID', LAST_SEEN_FIELD: 'ER Date'})
+
+    month_ago = time.time() - 30 * 86400
+
+    for idx in range(int(args.reports * args.duplicates)):
+        fields = {'summary': get_summary(idx), UNIQUE_ID_FIELD: get_unique_id(idx)}
+
+        if idx % 3 == 0:
+            server.add_issue(status='Closed', resolution="Won't Fix", fields=fields)
+        elif idx % 3 == 1:
+            server.add_issue(status='Closed', resolution='Done', resolved=month_ago, fields=fields)
+        else:
+            server.add_issue(fields=dict(fields, **{LAST_SEEN_FIELD: '2020-01-01'}))
+
+    return server.start()
+
+
+def get_summary(idx):
+    return 'Benchmark report #{}'.format(idx)
+
+
+def get_unique_id(idx):
+    return hashlib.md5(get_summary(idx).encode('utf-8')).hexdigest()
+
+
+def get_reports(count):
+    """
+    :type count int
+    :rtype: list[Report]
+    """
+    reports = []
+
+    for idx in range(count):
+        report = Report(summary=get_summary(idx), description='Something went wrong ({})'.format(idx))
+        report.set_unique_id(get_unique_id(idx))
+        report.set_counter(idx + 1)
+
+        reports.append(report)
+
+    return reports
+
+
+def run(args, workers, batch_size):
+    """
+    Send reports to a fresh local Jira and return the results
+
+    :type args argparse.Namespace
+    :type workers int
+    :type batch_size int
+    :rtype: dict
+    """
+    server = get_server(args)
+
+    config = {
+        'url': server.url,
+        'user': 'benchmark',
+        'password': 'benchmark',
+        'project': 'ER',
+        'fields': {
+            'default': {
+                'issuetype': {'name': 'Defect'},
+                'priority': {'id': '8'},
+            },
+            'custom': {
+                'unique_id': UNIQUE_ID_FIELD,
+                'last_seen': LAST_SEEN_FIELD,
+            },
+        },
+        'rate_limit': {'rate': args.rate, 'burst': args.burst},
+    }
+
+    try:
+        reporter = Jira(config=config)
+        reporter.LOOKUP_BATCH_SIZE = batch_size
+
+        reports = get_reports(args.reports)
+        server_stats = server.get_stats()
+
+        started = time.time()
+        outcomes = reporter.report_many(reports, workers=workers)
+        took = time.time() - started
+
+        # count only requests sent while reporting
+        stats = Counter(server.get_stats())
+        stats.subtract(server_stats)
+    finally:
+        server.stop()
+
+    return {
+        'workers': workers,
+        'batch_size': batch_size,
+        'time': took,
+        'reports_per_sec': len(reports) / took,
+        'requests': sum(count for (endpoint, count) in stats.items() if endpoint != '429'),
+        'rejected': stats['429'],
+        'outcomes': dict(Counter(outcomes)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of sending reports to Jira')
+    parser.add_argument('--reports', type=int, default=200, help='how many reports to send')
+    parser.add_argument('--duplicates', type=float, default=0.8, help='fraction of reports already in Jira')
+    parser.add_argument('--workers', default='1,4,8', help='comma separated list of workers counts')
+    parser.add_argument('--batch-sizes', default='1,50', help='comma separated list of look up batch sizes')
+    parser.add_argument('--latency', type=float, default=0.05, help='[sec] Jira response time')
+    parser.add_argument('--rate', type=float, default=Jira.RATE_LIMIT['rate'], help='client requests per second')
+    parser.add_argument('--burst', type=int, default=Jira.RATE_LIMIT['burst'], help='client requests burst')
+    parser.add_argument('--server-rate-limit', type=int, default=None, help='server requests per second')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests rejected by the server')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    print('{:>8} {:>10} {:>9} {:>12} {:>9} {:>9}  {}'.format(
+        'workers', 'batch size', 'time [s]', 'reports/sec', 'requests', 'HTTP 429', 'outcomes'))
+
+    for workers in [int(value) for value in args.workers.split(',')]:
+        for batch_size in [int(value) for value in args.batch_sizes.split(',')]:
+            results = run(args, workers, batch_size)
+
+            print('{workers:>8} {batch_size:>10} {time:>9.2f} {reports_per_sec:>12.1f} '
+                  '{requests:>9} {rejected:>9}  {outcomes}'.format(**results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+This script measures the hot path of each source over fixed corpora: _filter, _normalize (via _normalize_entries),
+_generate_reports and Classifier.classify for every source (and query) run by bin/check.py, plus generalize_sql
+
+Corpora are generated by reporter.fakes.log_generator with a fixed seed and time window, so each run gets
+the same entries. For each stage the best time out of --repeat runs is reported as entries per second
+(entries are the filtered ones for _normalize, the grouped ones for _generate_reports and the reports
+for classify). Allocations are measured in a separate run with tracemalloc enabled:
+
+* peak bytes / entry - how much memory a stage allocates at its peak
+* blocks / entry - memory blocks still allocated when a stage is done (e.g. grouped entries)
+
+Results can be saved as a JSON baseline and compared against it later on - the script exits with 1 when
+any stage got slower (or allocates more) than the tolerance allows.
+
+Run it via "make benchmark_sources" from the base directory of this repository (config.py is needed), e.g.
+
+python reporter/bin/benchmark_sources.py --entries 100000 --save benchmarks.json
+python reporter/bin/benchmark_sources.py --entries 100000 --compare benchmarks.json --tolerance 0.2
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+
+from reporter.bin.check import JOBS
+from reporter.classifier import Classifier
+from reporter.fakes.log_generator import LogGenerator, SCHEMAS
+from reporter.helpers import generalize_sql, _generalize_sql
+from reporter.sources import PHPLogsCoordinator
+from reporter.sources.common import Source
+
+# corpora are generated for this time window
+NOW = 1580468400  # 2020-01-31T11:00:00Z
+
+# stages that took less than that are too noisy to be compared with the baseline
+MIN_COMPARED_TIME = 0.005  # [sec]
+
+def get_cases():
+    """
+    Yield (source class, query, threshold) tuples for every job in bin/check.py (the coordinator is expanded)
+
+    Sources that no corpus can be generated for are skipped (i.e. AnemometerSource).
+
+    :rtype: collections.Iterable[tuple[type, str, int]]
+    """
+    for job in JOBS:
+        if job.source_class is PHPLogsCoordinator:
+            sources = job.kwargs['sources']
+        else:
+            sources = [(job.source_class, job.queries or [(job.query, job.threshold)])]
+
+        for (source_class, queries) in sources:
+            if not any(source_class.__name__ in schema_class.SOURCES for schema_class in SCHEMAS):
+                continue
+
+            for (query, threshold) in queries:
+                yield source_class, query, threshold
+
+
+def get_case_name(source_class, query):
+    """
+    :type source_class type
+    :type query str
+    :rtype: str
+    """
+    return '{}:{}'.format(source_class.__name__, query) if query else source_class.__name__
+
+
+class Corpora(object):
+    """
+    Generates (and keeps) serialized corpora for each source, entries are decoded for each run
+    (sources modify entries they handle)
+    """
+    def __init__(self, entries, groups, zipf):
+        """
+        :type entries int
+        :type groups int
+        :type zipf float
+        """
+        self._entries = entries
+        self._groups = groups
+        self._zipf = zipf
+        self._corpora = dict()  # source class name -> list of JSON-encoded entries
+
+    def get_entries(self, source_name):
+        """
+        :type source_name str
+        :rtype: list[dict]
+        """
+        if source_name not in self._corpora:
+            schemas = [schema_class for schema_class in SCHEMAS if source_name in schema_class.SOURCES]
+            generator = LogGenerator(schemas=schemas, entries=self._entries, groups=self._groups, zipf=self._zipf,
+                                     now=NOW)
+
+            self._corpora[source_name] = [json.dumps(document) for (_, document) in generator.get_documents()]
+
+        return [json.loads(line) for line in self._corpora[source_name]]
+
+
+def measure(func, prepare, repeat):
+    """
+    Return the best time out of given number of runs and the allocations (measured in a separate run)
+
+    :type func callable
+    :type prepare callable
+    :type repeat int
+    :arg prepare: returns a fresh tuple of func arguments for each run
+    :rtype: dict
+    """
+    best = None
+
+    for _ in range(repeat):
+        args = prepare()
+
+        started = time.perf_counter()
+        func(*args)
+        took = time.perf_counter() - started
+
+        best = took if best is None else min(best, took)
+
+    args = prepare()
+
+    # traces are cleared on start, so only the allocations made by func are counted
+    tracemalloc.start()
+    result = func(*args)
+    (_, peak) = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+
+    del result
+
+    return {'time': best, 'peak_bytes': peak, 'blocks': blocks}
+
+
+def run_case(corpora, classifier, source_class, query, threshold, repeat):
+    """
+    Measure all stages of a given source and query, return the results for each stage
+
+    Each stage is given the output of the previous one and a fresh source instance
+    (normalized keys are cached by the source).
+
+    :type corpora Corpora
+    :type classifier Classifier
+    :type source_class type
+    :type query str
+    :type threshold int
+    :type repeat int
+    :rtype: dict[str, dict]
+    """
+    entries = corpora.get_entries(source_class.__name__)
+
+    # keep entries a given query matches (sources sharing the index, see PHPLogsCoordinator)
+    if source_class._match is not Source._match:
+        source = source_class()
+        entries = [entry for entry in entries if source.match(entry, query)]
+
+    encoded = [json.dumps(entry) for entry in entries]
+
+    def get_entries():
+        return source_class(), [json.loads(line) for line in encoded]
+
+    def get_filtered():
+        (source, data) = get_entries()
+        return source_class(), [entry for entry in data if source._filter(entry)]
+
+    def get_normalized():
+        (source, data) = get_filtered()
+        return source_class(), source._normalize_entries(data)
+
+    filtered = get_filtered()[1]
+    normalized = get_normalized()[1]
+    reports = source_class()._generate_reports(get_normalized()[1], threshold)
+
+    stages = [
+        ('filter', len(entries), get_entries,
+         lambda source, data: [entry for entry in data if source._filter(entry)]),
+        ('normalize', len(filtered), get_filtered,
+         lambda source, data: source._normalize_entries(data)),
+        ('generate_reports', len(normalized), get_normalized,
+         lambda source, data: source._generate_reports(data, threshold)),
+        ('classify', len(reports), lambda: (reports,),
+         lambda data: [classifier.classify(report) for report in data]),
+    ]
+
+    results = dict()
+
+    for (stage, count, prepare, func) in stages:
+        results[stage] = dict(measure(func, prepare, repeat), entries=count)
+
+    results['generate_reports']['reports'] = len(reports)
+
+    return results
+
+
+def run_generalize_sql(corpora, repeat):
+    """
+    Measure generalize_sql over SQL logs queries (the cache is cleared before each run)
+
+    :type corpora Corpora
+    :type repeat int
+    :rtype: dict[str, dict]
+    """
+    queries = [entry['@message'] for entry in corpora.get_entries('DBQueryNoLimitSource')]
+
+    def get_queries():
+        _generalize_sql.cache_clear()
+        return (queries,)
+
+    return {'generalize_sql': dict(
+        measure(lambda data: [generalize_sql(query) for query in data], get_queries, repeat),
+        entries=len(queries)
+    )}
+
+
+def summarize(results):
+    """
+    Add entries per second and allocations per entry
+
+    :type results dict
+    """
+    for result in results.values():
+        entries = result['entries']
+
+        result['entries_per_sec'] = entries / result['time'] if result['time'] > 0 else 0
+        result['peak_bytes_per_entry'] = result['peak_bytes'] / entries if entries else 0
+        result['blocks_per_entry'] = result['blocks'] / entries if entries else 0
+
+
+def compare(result, baseline, tolerance):
+    """
+    Return the list of regressions of a given stage compared to its baseline
+
+    :type result dict
+    :type baseline dict|None
+    :type tolerance float
+    :rtype: list[str]
+    """
+    if baseline is None or result['entries'] == 0 or min(result['time'], baseline['time']) < MIN_COMPARED_TIME:
+        return []
+
+    regressions = []
+
+    if result['entries_per_sec'] < baseline['entries_per_sec'] * (1 - tolerance):
+        regressions.append('{:.0f}% slower'.format(
+            100 * (1 - result['entries_per_sec'] / baseline['entries_per_sec'])))
+
+    if result['peak_bytes_per_entry'] > baseline['peak_bytes_per_entry'] * (1 + tolerance):
+        regressions.append('{:.0f}% more memory'.format(
+            100 * (result['peak_bytes_per_entry'] / baseline['peak_bytes_per_entry'] - 1)))
+
+    return regressions
+
+
+def print_results(name, results, baseline, tolerance):
+    """
+    Print the results of each stage of a given case and return how many of them regressed
+
+    :type name str
+    :type results dict[str, dict]
+    :type baseline dict[str, dict]|None
+    :type tolerance float
+    :rtype: int
+    """
+    summarize(results)
+    regressions = 0
+
+    for (stage, result) in results.items():
+        problems = compare(result, (baseline or {}).get(stage), tolerance)
+        regressions += 1 if problems else 0
+
+        print('{:<50} {:<17} {entries:>8} {time:>9.4f} {entries_per_sec:>12.0f} {peak_bytes_per_entry:>13.1f} '
+              '{blocks_per_entry:>13.2f}  {}'.format(name, stage, ', '.join(problems) or '-', **result))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark of sources filter / normalize / report stages')
+    parser.add_argument('--entries', type=int, default=100000, help='how many entries each source gets')
+    parser.add_argument('--groups', type=int, default=100, help='how many distinct groups each corpus has')
+    parser.add_argument('--zipf', type=float, default=1.1, help='exponent of groups Zipf distribution')
+    parser.add_argument('--repeat', type=int, default=3, help='the best time out of that many runs is taken')
+    parser.add_argument('--sources', default=None,
+                        help='comma separated list of source classes to run (and / or generalize_sql)')
+    parser.add_argument('--save', default=None, help='save the results as a JSON baseline to that file')
+    parser.add_argument('--compare', default=None, help='compare the results with a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown when comparing (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    # sources log every skipped group and failed report
+    logging.basicConfig(
+        level=logging.CRITICAL,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    baseline = dict()
+
+    if args.compare:
+        with open(args.compare) as handle:
+            saved = json.load(handle)
+
+        if saved['meta']['entries'] != args.entries or saved['meta']['groups'] != args.groups:
+            print('Warning: the baseline was measured for {entries} entries and {groups} groups'.format(
+                **saved['meta']))
+
+        baseline = saved['results']
+
+    sources = args.sources.split(',') if args.sources else None
+    corpora = Corpora(args.entries, args.groups, args.zipf)
+    classifier = Classifier()
+
+    results = dict()
+    regressions = 0
+
+    print('{:<50} {:<17} {:>8} {:>9} {:>12} {:>13} {:>13}  {}'.format(
+        'source', 'stage', 'entries', 'time [s]', 'entries/sec', 'peak B/entry', 'blocks/entry', 'vs baseline'))
+
+    cases = [(get_case_name(source_class, query), source_class, query, threshold)
+             for (source_class, query, threshold) in get_cases()
+             if sources is None or source_class.__name__ in sources]
+
+    for (name, source_class, query, threshold) in cases:
+        results[name] = run_case(corpora, classifier, source_class, query, threshold, args.repeat)
+        regressions += print_results(name, results[name], baseline.get(name), args.tolerance)
+
+    if sources is None or 'generalize_sql' in sources:
+        results['helpers'] = run_generalize_sql(corpora, args.repeat)
+        regressions += print_results('helpers', results['helpers'], baseline.get('helpers'), args.tolerance)
+
+    if args.save:
+        with open(args.save, 'wt') as handle:
+            json.dump({
+                'meta': {
+                    'entries': args.entries,
+                    'groups': args.groups,
+                    'zipf': args.zipf,
+                    'python': platform.python_version(),
+                    'created': int(time.time()),
+                },
+                'results': results,
+            }, handle, indent=True, sort_keys=True)
+
+        print('Baseline saved to {}'.format(args.save))
+
+    if regressions:
+        print('{} stages regressed (tolerance: {:.0f}%)'.format(regressions, 100 * args.tolerance))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,103 +5,120 @@ and reports issues to JIRA when given thresholds are reached
 """
 import logging
 
-from time import sleep
-
+from reporter import config
 from reporter.reporters import Jira
+from reporter.runner import SourceJob, SourcesRunner
 from reporter.sources import PHPErrorsSource, PHPExceptionsSource, DBQueryErrorsSource,\
     DBQueryNoLimitSource, NotCachedWikiaApiResponsesSource, KilledDatabaseQueriesSource, \
     PHPAssertionsSource, PandoraErrorsSource, PHPSecuritySource, \
     MercurySource, HeliosSource, VignetteThumbVerificationSource, AnemometerSource, \
     ChatLogsSource, PHPExecutionTimeoutSource, BackendSource, PHPTriggeredSource, \
-    IndexDigestSource, ReportsPipeSource, PHPTypeErrorsSource, \
+    IndexDigestSource, ReportsPipeSource, PHPTypeErrorsSource, PHPLogsCoordinator, \
     CeleryLogsSource, KubernetesBackoffSource, UCPErrorsSource
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+# keep checkpoints for sources with long periods, so that only new entries are fetched on each run
+# @see CHECKPOINTS_PATH in config.py
+CHECKPOINTS = getattr(config, 'CHECKPOINTS_PATH', None)
 
 # get reports from various sources
-reports = []
+JOBS = [
+    # sources reading logstash-mediawiki index share a single scan of it
+    SourceJob(PHPLogsCoordinator, sources=[
+        # PHP warnings and errors
+        (PHPErrorsSource, [
+            ("PHP Fatal Error", 5),
+            ("PHP Catchable Fatal", 5),
+            ("PHP Warning", 50),
+            ("PHP Strict Standards", 200),
+            ("PHP Notice", 1500),
+        ]),
+
+        # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Severity%20error
+        (PHPExceptionsSource, [
+            ('error', 50),
+            ('critical', 0),  # PLATFORM-2271
+        ]),
+
+        # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/DBQuery%20errors
+        (DBQueryErrorsSource, [('', 20)]),
 
-# PHP warnings and errors
-source = PHPErrorsSource()
+        # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/AssertionException
+        (PHPAssertionsSource, [('', 5)]),
 
-reports += source.query("PHP Fatal Error", threshold=5)
-reports += source.query("PHP Catchable Fatal", threshold=5)
-reports += source.query("PHP Warning", threshold=50)
-reports += source.query("PHP Strict Standards", threshold=200)
-reports += source.query("PHP Notice", threshold=1500)
+        # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-1540
+        (PHPSecuritySource, [('', 0)]),  # security problems is always important
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Severity%20error
-reports += PHPExceptionsSource().query(query='error', threshold=50)
-reports += PHPExceptionsSource().query(query='critical', threshold=0)  # PLATFORM-2271
+        (PHPTriggeredSource, [('', 1)]),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/DBQuery%20errors
-reports += DBQueryErrorsSource().query(threshold=20)
+        (PHPTypeErrorsSource, [('', 5)]),
+    ]),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-836
-reports += DBQueryNoLimitSource().query(threshold=50)
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-836
+    SourceJob(DBQueryNoLimitSource, threshold=50),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/wikia.php%20caching%20disabled
-reports += NotCachedWikiaApiResponsesSource().query(threshold=500)  # we serve 75k not cached responses an hour
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/wikia.php%20caching%20disabled
+    SourceJob(NotCachedWikiaApiResponsesSource, threshold=500),  # we serve 75k not cached responses an hour
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/drozdo.pt-kill
-reports += KilledDatabaseQueriesSource().query(threshold=5)
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/drozdo.pt-kill
+    SourceJob(KilledDatabaseQueriesSource, threshold=5),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/AssertionException
-reports += PHPAssertionsSource().query(threshold=5)
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-1420
+    SourceJob(PandoraErrorsSource, threshold=50),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-1420
-reports += PandoraErrorsSource().query(threshold=50)
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-2055
+    SourceJob(MercurySource, queries=[('emergency', 0), ('error', 50)]),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-1540
-reports += PHPSecuritySource().query(threshold=0)  # security problems is always important
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Helios%20errors
+    SourceJob(HeliosSource, threshold=5),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/PLATFORM-2055
-reports += MercurySource().query('emergency', threshold=0)
-reports += MercurySource().query('error', threshold=50)
+    # @see https://kibana.wikia-inc.com/index.html#/dashboard/elasticsearch/Vigniette%20Thumb%20Verifier
+    SourceJob(VignetteThumbVerificationSource, threshold=5),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Helios%20errors
-reports += HeliosSource().query(threshold=5)
+    # @see https://fandom.atlassian.net/browse/PLATFORM-2180
+    SourceJob(AnemometerSource, threshold=0),
 
-# @see https://kibana.wikia-inc.com/index.html#/dashboard/elasticsearch/Vigniette%20Thumb%20Verifier
-reports += VignetteThumbVerificationSource().query(threshold=5)
+    # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Chat%20Server%20errors
+    SourceJob(ChatLogsSource, queries=[('uncaughtException', 1), ('SyntaxError', 1)]),
 
-# @see https://fandom.atlassian.net/browse/PLATFORM-2180
-reports += AnemometerSource().query(threshold=0)
+    SourceJob(PHPExecutionTimeoutSource, threshold=5, period=21600, checkpoints=CHECKPOINTS),
 
-# @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Chat%20Server%20errors
-reports += ChatLogsSource().query('uncaughtException', threshold=1)
-reports += ChatLogsSource().query('SyntaxError', threshold=1)
+    SourceJob(BackendSource, threshold=2),
 
-reports += PHPExecutionTimeoutSource(period=21600).query(threshold=5)
+    SourceJob(IndexDigestSource, threshold=1),
 
-reports += BackendSource().query(threshold=2)
+    SourceJob(ReportsPipeSource, threshold=1),
 
-reports += PHPTriggeredSource().query(threshold=1)
+    SourceJob(CeleryLogsSource, threshold=5),
 
-reports += IndexDigestSource().query(threshold=1)
+    SourceJob(KubernetesBackoffSource, threshold=1),
 
-reports += ReportsPipeSource().query(threshold=1)
+    SourceJob(UCPErrorsSource),
+]
 
-reports += PHPTypeErrorsSource().query(threshold=5)
 
-reports += CeleryLogsSource().query(threshold=5)
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
 
-reports += KubernetesBackoffSource().query(threshold=1)
+    # run all sources concurrently and report issues as soon as a given source is done
+    # @see RUNNER_CONFIG in config.py
+    runner = SourcesRunner(**getattr(config, 'RUNNER_CONFIG', {}))
+    # @see TICKET_INDEX_PATH in config.py
+    reporter = Jira(index_path=getattr(config, 'TICKET_INDEX_PATH', None))
 
-reports += UCPErrorsSource().query()
+    # reports of each source are sent as soon as it is done, Jira is asked about all of them with a few queries
+    # requests sent to Jira are rate limited by the reporter itself
+    outcomes = []
 
-logging.info('Reporting {} issues...'.format(len(reports)))
-reporter = Jira()
+    for reports in runner.run_batches(JOBS):
+        if reports:
+            outcomes += reporter.report_many(reports)
 
-reported = 0
-for report in reports:
-    sleep(1)  # avoid hitting Jira with too many searches for ticket hash (we perform 150+ of them)
+    logging.info('Reported {} tickets (out of {} issues)'.format(outcomes.count(Jira.OUTCOME_REPORTED), len(outcomes)))
 
-    if reporter.report(report):
-        reported += 1
 
-logging.info('Reported {} tickets'.format(reported))
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ This script is a sandbox for testing new sources
 import logging
 import json
 
+from reporter import config
 from reporter.reporters import Jira
 from reporter.sources import KilledDatabaseQueriesSource, PHPErrorsSource, \
     DBQueryNoLimitSource, DBQueryErrorsSource, PHPAssertionsSource, PHPExceptionsSource, \
@@ -12,6 +13,7 @@ from reporter.sources import KilledDatabaseQueriesSource, PHPErrorsSource, \
     ChatLogsSource, BackendSource, PHPTriggeredSource, IndexDigestSource, ReportsPipeSource, \
     PHPTypeErrorsSource, CeleryLogsSource, KubernetesBackoffSource, UCPErrorsSource
 
+from reporter.sources.corpus import CorpusStore
 from reporter.classifier import Classifier
 
 logging.basicConfig(
@@ -23,6 +25,10 @@ logging.basicConfig(
 reports = list()
 classifier = Classifier()
 
+# record entries returned by the sources or replay the recorded ones (pass corpus=corpus to the source)
+# @see CORPUS_CONFIG in config.py
+corpus = CorpusStore(**config.CORPUS_CONFIG) if getattr(config, 'CORPUS_CONFIG', None) else None
+
 #source = PHPErrorsSource()
 #reports += source.query("PHP Fatal Error", threshold=5)
 #reports += source.query("PHP Notice", threshold=2000)
@@ -52,7 +58,7 @@ classifier = Classifier()
 #reports += HeliosSource().query(threshold=0)
 
 # @see https://fandom.atlassian.net/browse/PLATFORM-2180
-#reports += AnemometerSource().query(threshold=0)
+#reports += AnemometerSource(corpus=corpus).query(threshold=0)
 
 # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/Chat%20Server%20errors
 #reports += ChatLogsSource().query('uncaughtException', threshold=5)
@@ -74,7 +80,7 @@ classifier = Classifier()
 
 #reports += KubernetesBackoffSource().query(threshold=2)
 
-reports += UCPErrorsSource(period=60).query(threshold=5)
+reports += UCPErrorsSource(period=60, corpus=corpus).query(threshold=5)
 
 for report in reports:
     print(report)
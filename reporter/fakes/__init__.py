@@ -0,0 +1,3 @@
+"""
+Local stand-ins for services the reporter talks to (used by tests and benchmarks)
+"""
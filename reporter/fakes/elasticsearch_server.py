@@ -0,0 +1,881 @@
+"""
+Local stand-in for elasticsearch search API used by wikia_common_kibana.Kibana and PaginatedKibana
+
+Documents are read from NDJSON files (one document per line, optionally gzipped), each file is a separate index
+named after the file, e.g. logstash-mediawiki.ndjson.gz. Date suffixes of requested indices are ignored,
+so logstash-mediawiki-2020.01.31 is served from logstash-mediawiki file. Documents can be added in memory as well.
+
+Covers search (query DSL with named queries, see reporter.fakes.es_query), scroll, from / size pagination, sorting,
+_source filtering, filter_path, composite aggregations (with top_hits) and multi-get. Like in elasticsearch,
+values longer than KEYWORD_IGNORE_ABOVE are not aggregated by keyword fields (they get into the missing bucket).
+
+Run it with "python -m reporter.fakes.elasticsearch_server --data-dir corpora/ --port 9200" and pass
+es_host='http://localhost:9200' to the source constructor.
+"""
+import argparse
+import fnmatch
+import glob
+import gzip
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .es_query import ElasticsearchQuery, QueryError, filter_source, get_values, compare, \
+    KEYWORD_SUFFIX, KEYWORD_IGNORE_ABOVE
+
+# e.g. logstash-mediawiki-2020.01.31
+INDEX_DATE_SUFFIX = re.compile(r'-\d{4}\.\d{2}\.\d{2}$')
+
+EXTENSIONS = ['.ndjson', '.ndjson.gz']
+
+
+class IndexNotFoundError(Exception):
+    """ Raised when none of requested indices exist """
+
+
+class Hit(object):
+    """
+    A document matching the query
+    """
+    __slots__ = ['index', 'doc_id', 'source', 'matched_queries']
+
+    def __init__(self, index, doc_id, source, matched_queries=None):
+        """
+        :type index str
+        :type doc_id str
+        :type source dict
+        :type matched_queries list[str]|None
+        """
+        self.index = index
+        self.doc_id = doc_id
+        self.source = source
+        self.matched_queries = matched_queries
+
+
+class FakeElasticsearchServer(object):
+    """
+    Evaluates search requests over local documents and serves them over HTTP from a background thread
+
+    Documents are streamed from files on every search, so the memory usage does not depend on the index size
+    (unless the results need to be sorted or aggregated).
+
+    server = FakeElasticsearchServer(data_dir='corpora/', latency=0.01)
+    server.add_documents('logstash-other', [{'@timestamp': '2020-01-31T10:00:00.000Z', '@message': 'foo'}])
+    server.start()
+    ...
+    server.stop()
+    """
+    # @see index.max_result_window
+    MAX_RESULT_WINDOW = 10000
+
+    # how many scroll contexts can be kept open at once (@see search.max_open_scroll_context)
+    MAX_SCROLL_CONTEXTS = 500
+
+    def __init__(self, data_dir=None, host='127.0.0.1', port=0, latency=0):
+        """
+        :type data_dir str|None
+        :type host str
+        :type port int
+        :type latency float
+        :arg data_dir: directory with NDJSON files (one for each index)
+        :arg port: 0 picks a free port
+        :arg latency: [sec] how long it takes to handle each request
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+
+        self.latency = latency
+
+        self._data_dir = data_dir
+        self._documents = dict()  # index -> list of (doc_id, source) tuples added in memory
+        self._scrolls = OrderedDict()  # scroll ID -> _ScrollContext
+        self._aggregations = OrderedDict()  # request -> buckets (cached for composite aggregation pages)
+        self._stats = Counter()
+
+        server = self
+
+        class _Handler(FakeElasticsearchRequestHandler):
+            elasticsearch = server
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        :rtype: str
+        """
+        (host, port) = self._httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        """ Serve requests in a background thread """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-elasticsearch', daemon=True)
+        self._thread.start()
+
+        self._logger.info('Serving on <{}>'.format(self.url))
+        return self
+
+    def stop(self):
+        """ Stop serving requests """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """ Serve requests in the current thread """
+        self._logger.info('Serving on <{}>'.format(self.url))
+        self._httpd.serve_forever()
+
+    def get_stats(self):
+        """
+        Return the number of requests handled for each endpoint (and the number of documents scanned)
+
+        :rtype: dict[str, int]
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def count(self, name):
+        """
+        :type name str
+        """
+        with self._lock:
+            self._stats[name] += 1
+
+    def add_documents(self, index, documents):
+        """
+        Add documents to the in-memory index ("_id" keys are used as documents IDs)
+
+        :type index str
+        :type documents list[dict]
+        """
+        with self._lock:
+            stored = self._documents.setdefault(index, [])
+
+            for document in documents:
+                document = dict(document)
+                doc_id = str(document.pop('_id', '{}-{}'.format(index, len(stored))))
+
+                stored.append((doc_id, document))
+
+    def get_indices(self):
+        """
+        Return names of all indices (in-memory ones and files)
+
+        :rtype: list[str]
+        """
+        indices = set(self._documents.keys())
+
+        for extension in EXTENSIONS:
+            for path in glob.glob(os.path.join(self._data_dir, '*' + extension)) if self._data_dir else []:
+                indices.add(os.path.basename(path)[:-len(extension)])
+
+        return sorted(indices)
+
+    def resolve_indices(self, names):
+        """
+        Return indices matching comma-separated names (wildcards are supported, date suffixes are ignored)
+
+        :type names str
+        :rtype: list[str]
+        """
+        indices = self.get_indices()
+        resolved = []
+
+        for name in names.split(','):
+            if name in ('_all', '', '*'):
+                return indices
+
+            patterns = {name, INDEX_DATE_SUFFIX.sub('', name)}
+            matching = [index for index in indices if any(fnmatch.fnmatchcase(index, pattern) for pattern in patterns)]
+
+            if not matching and '*' not in name:
+                raise IndexNotFoundError(name)
+
+            resolved += [index for index in matching if index not in resolved]
+
+        return resolved
+
+    def _read_index(self, index):
+        """
+        Yield (doc_id, source) tuples of a given index
+
+        :type index str
+        :rtype: collections.Iterable[tuple[str, dict]]
+        """
+        if index in self._documents:
+            for item in list(self._documents[index]):
+                yield item
+            return
+
+        for extension in EXTENSIONS:
+            path = os.path.join(self._data_dir or '', index + extension)
+
+            if self._data_dir is None or not os.path.exists(path):
+                continue
+
+            opener = gzip.open if extension.endswith('.gz') else open
+
+            with opener(path, 'rt', encoding='utf-8') as handle:
+                for (line_no, line) in enumerate(handle):
+                    if not line.strip():
+                        continue
+
+                    document = json.loads(line)
+                    yield str(document.pop('_id', '{}-{}'.format(index, line_no))), document
+
+    def search(self, indices, query):
+        """
+        Yield hits matching the query (in the index order)
+
+        :type indices list[str]
+        :type query ElasticsearchQuery
+        :rtype: collections.Iterable[Hit]
+        """
+        scanned = 0
+
+        try:
+            for index in indices:
+                for (doc_id, document) in self._read_index(index):
+                    scanned += 1
+
+                    if query.matches(document, doc_id):
+                        yield Hit(index, doc_id, document, query.get_matched_queries(document, doc_id))
+        finally:
+            with self._lock:
+                self._stats['scanned'] += scanned
+
+    def get_documents(self, docs):
+        """
+        Return documents with given IDs (None for the missing ones), indices are scanned once
+
+        :type docs list[tuple[str, str]]
+        :arg docs: list of (index, doc ID) tuples
+        :rtype: list[dict|None]
+        """
+        wanted = set(docs)
+        found = dict()
+
+        for index in set(index for (index, _) in docs):
+            try:
+                indices = self.resolve_indices(index)
+            except IndexNotFoundError:
+                continue
+
+            for resolved in indices:
+                for (doc_id, document) in self._read_index(resolved):
+                    if (index, doc_id) in wanted:
+                        found[(index, doc_id)] = document
+
+        return [found.get(doc) for doc in docs]
+
+    def open_scroll(self, context):
+        """
+        Keep the scroll context for the next scroll requests and return the scroll ID
+
+        :type context _ScrollContext
+        :rtype: str
+        """
+        scroll_id = uuid.uuid4().hex
+
+        with self._lock:
+            self._scrolls[scroll_id] = context
+
+            # drop the oldest contexts
+            while len(self._scrolls) > self.MAX_SCROLL_CONTEXTS:
+                self._scrolls.popitem(last=False)
+
+        return scroll_id
+
+    def get_scroll(self, scroll_id):
+        """
+        :type scroll_id str
+        :rtype: _ScrollContext|None
+        """
+        with self._lock:
+            return self._scrolls.get(scroll_id)
+
+    def close_scroll(self, scroll_id):
+        """
+        :type scroll_id str
+        """
+        with self._lock:
+            self._scrolls.pop(scroll_id, None)
+
+    def get_composite_buckets(self, indices, query, aggregation, cache_key):
+        """
+        Return all buckets of the composite aggregation (sorted by their keys)
+
+        :type indices list[str]
+        :type query ElasticsearchQuery
+        :type aggregation dict
+        :type cache_key str
+        :rtype: list[dict]
+        """
+        with self._lock:
+            if cache_key in self._aggregations:
+                return self._aggregations[cache_key]
+
+        sources = []
+
+        for source in aggregation['composite']['sources']:
+            ((name, params),) = source.items()
+
+            if 'terms' not in params:
+                raise QueryError('Unsupported composite aggregation source: {}'.format(params))
+
+            sources.append((name, params['terms']['field'], params['terms'].get('missing_bucket', False)))
+
+        top_hits = None
+
+        for (name, params) in aggregation.get('aggregations', aggregation.get('aggs', {})).items():
+            if 'top_hits' not in params:
+                raise QueryError('Unsupported sub-aggregation: {}'.format(params))
+
+            top_hits = (name, params['top_hits'])
+
+        groups = OrderedDict()
+
+        for hit in self.search(indices, query):
+            values = []
+
+            for (_, field, missing_bucket) in sources:
+                field_values = get_values(hit.source, field)
+
+                if field.endswith(KEYWORD_SUFFIX):
+                    field_values = [value for value in field_values
+                                    if not isinstance(value, str) or len(value) <= KEYWORD_IGNORE_ABOVE]
+
+                if not field_values and not missing_bucket:
+                    break
+
+                values.append(field_values[0] if field_values else None)
+            else:
+                key = tuple(values)
+
+                if key not in groups:
+                    groups[key] = [0, hit]
+
+                groups[key][0] += 1
+
+        buckets = []
+
+        # missing values go first
+        for key in sorted(groups.keys(), key=lambda values: [(value is not None, type(value).__name__, value)
+                                                             for value in values]):
+            (doc_count, hit) = groups[key]
+
+            bucket = {
+                'key': {name: value for ((name, _, _), value) in zip(sources, key)},
+                'doc_count': doc_count,
+            }
+
+            if top_hits is not None:
+                (name, params) = top_hits
+                bucket[name] = {'hits': {'total': doc_count, 'hits': [
+                    render_hit(hit, params.get('_source'))
+                ][:params.get('size', 3)]}}
+
+            buckets.append(bucket)
+
+        with self._lock:
+            self._aggregations[cache_key] = buckets
+
+            while len(self._aggregations) > 10:
+                self._aggregations.popitem(last=False)
+
+        return buckets
+
+
+def get_source_filter(value):
+    """
+    Return (includes, excludes) for _source filtering parameter
+
+    :type value bool|str|list|dict|None
+    :rtype: tuple[list[str]|None, list[str]]|None
+    :return: None when the source should not be returned
+    """
+    if value is False or value == 'false':
+        return None
+
+    if value is None or value is True or value == 'true':
+        return None, []
+
+    if isinstance(value, str):
+        return value.split(','), []
+
+    if isinstance(value, list):
+        return value, []
+
+    includes = value.get('includes', value.get('include'))
+    excludes = value.get('excludes', value.get('exclude')) or []
+
+    return [includes] if isinstance(includes, str) else includes, [excludes] if isinstance(excludes, str) else excludes
+
+
+def render_hit(hit, source=None):
+    """
+    :type hit Hit
+    :type source object
+    :arg source: _source filtering parameter
+    :rtype: dict
+    """
+    rendered = {'_index': hit.index, '_type': 'doc', '_id': hit.doc_id, '_score': None}
+    source_filter = get_source_filter(source)
+
+    if source_filter is not None:
+        rendered['_source'] = filter_source(hit.source, *source_filter)
+
+    # elasticsearch omits the list when no named query matched
+    if hit.matched_queries:
+        rendered['matched_queries'] = hit.matched_queries
+
+    return rendered
+
+
+def filter_response(response, filter_path):
+    """
+    Keep only selected (dot-separated) paths of the response (@see filter_path parameter)
+
+    :type response dict
+    :type filter_path str|None
+    :rtype: dict
+    """
+    if not filter_path:
+        return response
+
+    return _filter_response(response, [path.split('.') for path in filter_path.split(',')]) or {}
+
+
+def _filter_response(value, paths):
+    if any(not path for path in paths):
+        return value
+
+    if isinstance(value, list):
+        items = [_filter_response(item, paths) for item in value]
+        return [item for item in items if item is not None] or None
+
+    if not isinstance(value, dict):
+        return None
+
+    filtered = dict()
+
+    for (key, item) in value.items():
+        nested = [path[1:] for path in paths if fnmatch.fnmatchcase(key, path[0])]
+
+        if nested:
+            item = _filter_response(item, nested)
+
+            if item is not None and item != {}:
+                filtered[key] = item
+
+    return filtered or None
+
+
+def sort_hits(hits, sort):
+    """
+    Sort hits using sort parameter, e.g. "@timestamp:desc" or [{"@timestamp": "desc"}, "_doc"]
+
+    :type hits list[Hit]
+    :type sort str|list|dict
+    :rtype: list[Hit]
+    """
+    if isinstance(sort, str):
+        sort = [
+            {item.split(':')[0]: item.split(':')[1] if ':' in item else 'asc'} for item in sort.split(',')
+        ]
+    elif isinstance(sort, dict):
+        sort = [sort]
+
+    # sort by the least important field first (Python sorting is stable)
+    for item in reversed(sort):
+        if isinstance(item, str):
+            item = {item: 'asc'}
+
+        ((field, order),) = item.items()
+
+        if isinstance(order, dict):
+            order = order.get('order', 'asc')
+
+        if field == '_doc':
+            continue
+
+        def _key(hit, field=field):
+            values = get_values(hit.source, field)
+            return _SortKey(values[0] if values else None)
+
+        hits.sort(key=_key, reverse=order == 'desc')
+
+    return hits
+
+
+class _SortKey(object):
+    """
+    Compares values using reporter.fakes.es_query.compare (missing values go last)
+    """
+    __slots__ = ['value']
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        if self.value is None or other.value is None:
+            return other.value is None and self.value is not None
+
+        return compare(self.value, other.value) == -1
+
+
+class FakeElasticsearchRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes elasticsearch requests to FakeElasticsearchServer
+    """
+    elasticsearch = None  # type: FakeElasticsearchServer
+
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = [
+        ('GET', r'^/$', 'info'),
+        ('HEAD', r'^/$', 'info'),
+        ('GET', r'^/_search/scroll$', 'scroll'),
+        ('POST', r'^/_search/scroll$', 'scroll'),
+        ('DELETE', r'^/_search/scroll$', 'clear_scroll'),
+        ('GET', r'^/(?:(?P<index>[^/_][^/]*)/)?_search$', 'search'),
+        ('POST', r'^/(?:(?P<index>[^/_][^/]*)/)?_search$', 'search'),
+        ('GET', r'^/(?:(?P<index>[^/_][^/]*)/)?_mget$', 'mget'),
+        ('POST', r'^/(?:(?P<index>[^/_][^/]*)/)?_mget$', 'mget'),
+    ]
+
+    def log_message(self, format, *args):  # pylint:disable=redefined-builtin
+        logging.getLogger('FakeElasticsearchServer').debug(format, *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_HEAD(self):
+        self._handle('HEAD')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _send(self, status, body=None):
+        """
+        :type status int
+        :type body object
+        """
+        payload = json.dumps(body, default=str).encode('utf-8') if body is not None else b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _send_error(self, status, error_type, reason):
+        """
+        :type status int
+        :type error_type str
+        :type reason str
+        """
+        self._send(status, {
+            'error': {'root_cause': [{'type': error_type, 'reason': reason}], 'type': error_type, 'reason': reason},
+            'status': status,
+        })
+
+    def _read_body(self):
+        """
+        :rtype: dict
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+
+        try:
+            body = self._read_body()
+        except ValueError as ex:
+            self._send_error(400, 'parse_exception', str(ex))
+            return
+
+        for (route_method, pattern, endpoint) in self.ROUTES:
+            matches = re.match(pattern, url.path)
+
+            if route_method == method and matches:
+                break
+        else:
+            self._send_error(404, 'not_found', 'Not found: {} {}'.format(method, url.path))
+            return
+
+        time.sleep(self.elasticsearch.latency)
+        self.elasticsearch.count(endpoint)
+
+        params = {name: values[-1] for (name, values) in parse_qs(url.query).items()}
+        params.update({name: value for (name, value) in matches.groupdict().items() if value is not None})
+
+        try:
+            response = getattr(self, '_handle_{}'.format(endpoint))(params, body)
+        except IndexNotFoundError as ex:
+            self._send_error(404, 'index_not_found_exception', 'no such index [{}]'.format(ex))
+            return
+        except (QueryError, KeyError, TypeError, ValueError) as ex:
+            self._send_error(400, 'search_phase_execution_exception', '{}: {}'.format(type(ex).__name__, ex))
+            return
+
+        if response is not None:
+            (status, response) = response
+            self._send(status, filter_response(response, params.get('filter_path')))
+
+    def _handle_info(self, params, body):
+        return 200, {
+            'name': 'fake-elasticsearch',
+            'cluster_name': 'fake',
+            'version': {'number': '6.8.0', 'lucene_version': '7.7.0'},
+            'tagline': 'You Know, for Search',
+        }
+
+    @staticmethod
+    def _get_page(hits, size, returned):
+        """
+        Return the page of hits, the total (with the lower bound only when there are more hits to scan)
+        and the iterator over the rest of hits (None when there are no more hits)
+
+        :type hits collections.Iterator[Hit]
+        :type size int
+        :type returned int
+        :arg returned: how many hits were returned before
+        :rtype: tuple[list[Hit], dict, collections.Iterator[Hit]|None]
+        """
+        page = list(itertools.islice(hits, size + 1))
+        has_more = len(page) > size
+
+        total = {'value': returned + len(page), 'relation': 'gte' if has_more else 'eq'}
+        rest = itertools.chain(page[size:], hits) if has_more else None
+
+        return page[:size], total, rest
+
+    def _handle_search(self, params, body):
+        indices = self.elasticsearch.resolve_indices(params.get('index', '_all'))
+        query = ElasticsearchQuery(body.get('query'))
+
+        size = int(body.get('size', params.get('size', 10)))
+        offset = int(body.get('from', params.get('from', 0)))
+        source = body.get('_source', params.get('_source'))
+        sort = body.get('sort', params.get('sort'))
+
+        hits = self.elasticsearch.search(indices, query)
+
+        aggregations = body.get('aggregations', body.get('aggs'))
+
+        if aggregations:
+            return 200, self._get_aggregations(indices, query, aggregations, size, body)
+
+        if sort and sort not in ('_doc', ['_doc']):
+            hits = iter(sort_hits(list(hits), sort))
+
+        if 'scroll' in params:
+            (page, total, rest) = self._get_page(hits, size, 0)
+            response = self._get_response(page, total, source)
+
+            response['_scroll_id'] = self.elasticsearch.open_scroll(
+                _ScrollContext(rest or iter([]), size, len(page), source))
+
+            return 200, response
+
+        if offset + size > self.elasticsearch.MAX_RESULT_WINDOW:
+            raise QueryError('Result window is too large, from + size must be less than or equal to: [{}] '
+                             'but was [{}]. See the scroll api for a more efficient way to request large '
+                             'data sets.'.format(self.elasticsearch.MAX_RESULT_WINDOW, offset + size))
+
+        # count all matching documents
+        hits = list(hits)
+        total = {'value': len(hits), 'relation': 'eq'}
+
+        return 200, self._get_response(hits[offset:offset + size], total, source)
+
+    @staticmethod
+    def _get_response(page, total, source):
+        """
+        :type page list[Hit]
+        :type total dict
+        :type source object
+        :rtype: dict
+        """
+        return {
+            'took': 1,
+            'timed_out': False,
+            '_shards': {'total': 1, 'successful': 1, 'skipped': 0, 'failed': 0},
+            'hits': {
+                # elasticsearch 6.x returns the exact number
+                'total': total['value'] if total['relation'] == 'eq' else total,
+                'max_score': None,
+                'hits': [render_hit(hit, source) for hit in page],
+            },
+        }
+
+    def _get_aggregations(self, indices, query, aggregations, size, body):
+        """
+        :type indices list[str]
+        :type query ElasticsearchQuery
+        :type aggregations dict
+        :type size int
+        :type body dict
+        :rtype: dict
+        """
+        results = dict()
+
+        for (name, aggregation) in aggregations.items():
+            if 'composite' not in aggregation:
+                raise QueryError('Unsupported aggregation: {}'.format(list(aggregation.keys())))
+
+            composite = aggregation['composite']
+
+            # pages of the same aggregation differ by the "after" key only
+            cache_key = json.dumps([indices, body.get('query'), name, dict(
+                aggregation, composite={key: value for (key, value) in composite.items() if key != 'after'})],
+                sort_keys=True)
+
+            buckets = self.elasticsearch.get_composite_buckets(indices, query, aggregation, cache_key)
+
+            after = composite.get('after')
+
+            if after is not None:
+                after_key = [after.get(list(source.keys())[0]) for source in composite['sources']]
+                buckets = [bucket for bucket in buckets if self._is_after(list(bucket['key'].values()), after_key)]
+
+            page = buckets[:composite.get('size', 10)]
+
+            results[name] = {'buckets': page}
+
+            if page:
+                results[name]['after_key'] = page[-1]['key']
+
+        response = self._get_response([], {'value': 0, 'relation': 'eq'}, None)
+        response['aggregations'] = results
+
+        return response
+
+    @staticmethod
+    def _is_after(key, after_key):
+        """
+        :type key list
+        :type after_key list
+        :rtype: bool
+        """
+        for (value, after) in zip(key, after_key):
+            if value == after:
+                continue
+
+            # missing values go first
+            if value is None or after is None:
+                return after is None
+
+            return compare(value, after) == 1
+
+        return False
+
+    def _handle_scroll(self, params, body):
+        scroll_id = body.get('scroll_id', params.get('scroll_id'))
+        context = self.elasticsearch.get_scroll(scroll_id)
+
+        if context is None:
+            self._send_error(404, 'search_context_missing_exception', 'No search context found for id [{}]'.format(
+                scroll_id))
+            return None
+
+        (page, total, rest) = self._get_page(context.hits, context.size, context.returned)
+
+        context.hits = rest or iter([])
+        context.returned += len(page)
+
+        response = self._get_response(page, total, context.source)
+        response['_scroll_id'] = scroll_id
+
+        return 200, response
+
+    def _handle_clear_scroll(self, params, body):
+        scroll_ids = body.get('scroll_id', params.get('scroll_id', ''))
+
+        for scroll_id in scroll_ids if isinstance(scroll_ids, list) else scroll_ids.split(','):
+            self.elasticsearch.close_scroll(scroll_id)
+
+        return 200, {'succeeded': True, 'num_freed': len(scroll_ids)}
+
+    def _handle_mget(self, params, body):
+        docs = [
+            (doc.get('_index', params.get('index')), str(doc['_id']), doc.get('_source', params.get('_source')))
+            for doc in body.get('docs', [])
+        ]
+
+        documents = self.elasticsearch.get_documents([(index, doc_id) for (index, doc_id, _) in docs])
+
+        response = []
+
+        for ((index, doc_id, source), document) in zip(docs, documents):
+            if document is None:
+                response.append({'_index': index, '_type': 'doc', '_id': doc_id, 'found': False})
+                continue
+
+            rendered = render_hit(Hit(index, doc_id, document), source)
+            del rendered['_score']
+
+            response.append(dict(rendered, found=True))
+
+        return 200, {'docs': response}
+
+
+class _ScrollContext(object):
+    """
+    Hits iterator kept between scroll requests
+    """
+    def __init__(self, hits, size, returned, source):
+        """
+        :type hits collections.Iterator[Hit]
+        :type size int
+        :type returned int
+        :type source object
+        :arg size: page size set by the search request
+        :arg returned: how many hits were returned so far
+        :arg source: _source filtering parameter of the search request
+        """
+        self.hits = hits
+        self.size = size
+        self.returned = returned
+        self.source = source
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for elasticsearch search API')
+    parser.add_argument('--data-dir', required=True, help='directory with NDJSON files (one for each index)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9200)
+    parser.add_argument('--latency', type=float, default=0, help='[sec] added to each request')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    server = FakeElasticsearchServer(data_dir=args.data_dir, host=args.host, port=args.port, latency=args.latency)
+    logging.info('Indices: {}'.format(', '.join(server.get_indices())))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
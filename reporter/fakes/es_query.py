@@ -0,0 +1,709 @@
+"""
+Evaluates the subset of elasticsearch query DSL used by the reporter against documents kept locally
+
+Lucene query string syntax is supported as well (see LuceneQuery), e.g.
+@message:"^PHP Fatal" AND -@context.logGroup: "createwiki" AND @context.num_rows: [1000 TO *]
+"""
+import calendar
+import fnmatch
+import re
+import time
+
+from functools import lru_cache
+
+# @see https://www.elastic.co/guide/en/elasticsearch/reference/6.8/query-dsl-query-string-query.html
+SPECIAL_CHARS = set(' \t\n():"[]{}/\\')
+
+# text fields are analyzed into lowercased words
+WORDS = re.compile(r'\w+')
+
+# suffix of "keyword" sub-fields (we do not analyze fields, the raw value is used instead)
+KEYWORD_SUFFIX = '.keyword'
+
+# longer strings are not indexed as keywords (@see ignore_above of logstash index template)
+KEYWORD_IGNORE_ABOVE = 256
+
+# e.g. now-1h, now-15m
+DATE_MATH = re.compile(r'^now(?:-(\d+)([smhdw]))?$')
+DATE_MATH_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+class QueryError(ValueError):
+    """ Raised when a query can not be parsed or is not supported """
+
+
+@lru_cache(maxsize=100000)
+def analyze(text):
+    """
+    Split the text into lowercased words (the way the standard analyzer does)
+
+    :type text str
+    :rtype: tuple[str]
+    """
+    return tuple(WORDS.findall(text.lower()))
+
+
+def to_text(value):
+    """
+    :type value object
+    :rtype: str
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    return str(value)
+
+
+def get_values(document, field):
+    """
+    Return all scalar values of a (dot-separated) field, lists are flattened
+
+    '*' returns all values of the document.
+
+    :type document dict
+    :type field str
+    :rtype: list
+    """
+    if field.endswith(KEYWORD_SUFFIX):
+        field = field[:-len(KEYWORD_SUFFIX)]
+
+    values = []
+
+    if field in ('*', '_all'):
+        _collect_values(document, values)
+        return values
+
+    _get_values(document, field.split('.'), values)
+    return values
+
+
+def _collect_values(value, values):
+    if isinstance(value, dict):
+        for item in value.values():
+            _collect_values(item, values)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_values(item, values)
+    elif value is not None:
+        values.append(value)
+
+
+def _get_values(value, path, values):
+    if isinstance(value, list):
+        for item in value:
+            _get_values(item, path, values)
+        return
+
+    if not path:
+        if value is not None and not isinstance(value, dict):
+            values.append(value)
+        return
+
+    if not isinstance(value, dict):
+        return
+
+    # keys can contain dots as well (e.g. "kubernetes.namespace_name" stored as a single key)
+    for idx in range(len(path), 0, -1):
+        key = '.'.join(path[:idx])
+
+        if key in value:
+            _get_values(value[key], path[idx:], values)
+
+
+def has_phrase(value, words):
+    """
+    Tell whether the analyzed value contains given words in the same order
+
+    :type value object
+    :type words tuple[str]
+    :rtype: bool
+    """
+    tokens = analyze(to_text(value))
+    size = len(words)
+
+    if size == 0:
+        return False
+
+    if size == 1:
+        return words[0] in tokens
+
+    return any(tokens[idx:idx + size] == words for idx in range(len(tokens) - size + 1))
+
+
+def matches_pattern(regex, value):
+    """
+    Tell whether the whole value or any of its words match the pattern (wildcard or regular expression)
+
+    :type regex typing.Pattern
+    :type value object
+    :rtype: bool
+    """
+    text = to_text(value)
+    return regex.fullmatch(text.lower()) is not None or any(regex.fullmatch(word) for word in analyze(text))
+
+
+def parse_date(value, now=None):
+    """
+    Return UNIX timestamp for ISO 8601 date, epoch milliseconds or date math expression (e.g. now-1h)
+
+    :type value str|int|float
+    :type now float|None
+    :rtype: float|None
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value / 1000.0
+
+    matches = DATE_MATH.match(str(value))
+
+    if matches:
+        delta = int(matches.group(1)) * DATE_MATH_UNITS[matches.group(2)] if matches.group(1) else 0
+        return (now or time.time()) - delta
+
+    try:
+        # e.g. 2020-01-31T10:00:00.000Z
+        timestamp = calendar.timegm(time.strptime(str(value)[:19], '%Y-%m-%dT%H:%M:%S'))
+    except ValueError:
+        return None
+
+    fraction = re.match(r'^\.(\d+)', str(value)[19:])
+    return timestamp + float('0.' + fraction.group(1)) if fraction else timestamp
+
+
+def compare(value, bound):
+    """
+    Compare values as numbers, dates or strings (in this order), return -1, 0 or 1 (None if they can't be compared)
+
+    :type value object
+    :type bound object
+    :rtype: int|None
+    """
+    pairs = [
+        (lambda item: float(item) if not isinstance(item, bool) else None),
+        parse_date,
+        to_text,
+    ]
+
+    for cast in pairs:
+        try:
+            (left, right) = (cast(value), cast(bound))
+        except (TypeError, ValueError):
+            continue
+
+        if left is not None and right is not None:
+            return (left > right) - (left < right)
+
+    return None
+
+
+def in_range(value, gte=None, gt=None, lte=None, lt=None):
+    """
+    :rtype: bool
+    """
+    for (bound, accepted) in [(gte, (0, 1)), (gt, (1,)), (lte, (-1, 0)), (lt, (-1,))]:
+        if bound is not None and compare(value, bound) not in accepted:
+            return False
+
+    return True
+
+
+def java_hash_code(value):
+    """
+    String.hashCode() from Java (used by sampling scripts)
+
+    :type value str
+    :rtype: int
+    """
+    result = 0
+
+    for char in value:
+        result = (31 * result + ord(char)) & 0xFFFFFFFF
+
+    return result - 0x100000000 if result & 0x80000000 else result
+
+
+class LuceneQuery(object):
+    """
+    Parsed Lucene query string that can be matched against documents
+
+    Supported: AND, OR, NOT, &&, ||, +/- modifiers, parentheses, field:value, field:"phrase", bare terms,
+    wildcards (* and ?), /regular expressions/, ranges ([a TO b], {a TO b}, >=a) and field:* (exists)
+
+    Text values are matched the way analyzed fields are: lowercased words of the query need to be found
+    in the field value (in the same order), wildcards and regular expressions are matched against
+    both the whole value and its words.
+    """
+    OCCUR_MUST = 'must'
+    OCCUR_SHOULD = 'should'
+    OCCUR_MUST_NOT = 'must_not'
+
+    def __init__(self, query, default_field='*', default_operator='OR'):
+        """
+        :type query str
+        :type default_field str
+        :type default_operator str
+        """
+        self._query = query
+        self._pos = 0
+        self._default_operator = default_operator.upper()
+
+        self._predicate = self._parse_clauses(default_field)
+
+        self._skip_spaces()
+
+        if self._pos < len(self._query):
+            raise QueryError('Unexpected "{}" in {}'.format(self._query[self._pos:], query))
+
+    def matches(self, document):
+        """
+        :type document dict
+        :rtype: bool
+        """
+        return self._predicate(document)
+
+    def _peek(self, size=1):
+        return self._query[self._pos:self._pos + size]
+
+    def _skip_spaces(self):
+        while self._pos < len(self._query) and self._query[self._pos].isspace():
+            self._pos += 1
+
+    def _is_keyword(self, keyword):
+        """
+        :type keyword str
+        :rtype: bool
+        """
+        end = self._pos + len(keyword)
+
+        return self._query[self._pos:end] == keyword and \
+            (end >= len(self._query) or self._query[end].isspace() or self._query[end] in '(-+')
+
+    def _parse_clauses(self, field):
+        """
+        Parse clauses until the closing parenthesis or the end of the query
+        """
+        clauses = []  # list of [occur, predicate]
+        conjunction = None
+
+        while True:
+            self._skip_spaces()
+
+            if self._pos >= len(self._query) or self._peek() == ')':
+                break
+
+            if self._is_keyword('AND') or self._peek(2) == '&&':
+                self._pos += 2 if self._peek(2) == '&&' else 3
+                conjunction = 'AND'
+
+                # AND makes the previous clause required
+                if clauses and clauses[-1][0] == self.OCCUR_SHOULD:
+                    clauses[-1][0] = self.OCCUR_MUST
+                continue
+
+            if self._is_keyword('OR') or self._peek(2) == '||':
+                self._pos += 2
+                conjunction = 'OR'
+                continue
+
+            occur = self.OCCUR_MUST if conjunction == 'AND' or \
+                (conjunction is None and clauses and self._default_operator == 'AND') else self.OCCUR_SHOULD
+
+            if self._peek() == '+':
+                self._pos += 1
+                occur = self.OCCUR_MUST
+            elif self._peek() == '-' or self._peek() == '!':
+                self._pos += 1
+                occur = self.OCCUR_MUST_NOT
+            elif self._is_keyword('NOT'):
+                self._pos += 3
+                occur = self.OCCUR_MUST_NOT
+
+            self._skip_spaces()
+            clauses.append([occur, self._parse_clause(field)])
+            conjunction = None
+
+        if not clauses:
+            raise QueryError('Empty query: {}'.format(self._query))
+
+        must = [predicate for (occur, predicate) in clauses if occur == self.OCCUR_MUST]
+        should = [predicate for (occur, predicate) in clauses if occur == self.OCCUR_SHOULD]
+        must_not = [predicate for (occur, predicate) in clauses if occur == self.OCCUR_MUST_NOT]
+
+        def _predicate(document):
+            if any(predicate(document) for predicate in must_not):
+                return False
+
+            if not all(predicate(document) for predicate in must):
+                return False
+
+            # optional clauses need to match when there are no required ones
+            return bool(must) or not should or any(predicate(document) for predicate in should)
+
+        return _predicate
+
+    def _parse_clause(self, field):
+        """
+        Parse a single (optionally grouped) clause for a given field
+        """
+        if self._peek() == '(':
+            self._pos += 1
+            predicate = self._parse_clauses(field)
+            self._skip_spaces()
+
+            if self._peek() != ')':
+                raise QueryError('Missing closing parenthesis in {}'.format(self._query))
+
+            self._pos += 1
+            return predicate
+
+        if self._peek() not in ('"', '/', '[', '{', '>', '<'):
+            start = self._pos
+            (term, _) = self._read_term()
+
+            # field:value
+            if self._peek() == ':':
+                self._pos += 1
+                self._skip_spaces()
+                return self._parse_clause(term)
+
+            self._pos = start
+
+        return self._parse_value(field)
+
+    def _read_term(self):
+        """
+        Read a term and return it with its wildcard pattern (None if it has no wildcards)
+
+        :rtype: tuple[str, str|None]
+        """
+        chars = []
+        pattern = []
+        has_wildcards = False
+
+        while self._pos < len(self._query):
+            char = self._query[self._pos]
+
+            if char == '\\' and self._pos + 1 < len(self._query):
+                char = self._query[self._pos + 1]
+                self._pos += 2
+
+                chars.append(char)
+                pattern.append(re.escape(char))
+                continue
+
+            if char in SPECIAL_CHARS:
+                break
+
+            if char in '*?':
+                has_wildcards = True
+                pattern.append('.*' if char == '*' else '.')
+            else:
+                pattern.append(re.escape(char))
+
+            chars.append(char)
+            self._pos += 1
+
+        if not chars:
+            raise QueryError('Term expected at {} in {}'.format(self._pos, self._query))
+
+        return ''.join(chars), ''.join(pattern) if has_wildcards else None
+
+    def _read_until(self, end):
+        """
+        Read (and unescape) everything up to a given character
+        """
+        chars = []
+        self._pos += 1
+
+        while self._pos < len(self._query) and self._query[self._pos] != end:
+            if self._query[self._pos] == '\\' and self._pos + 1 < len(self._query):
+                self._pos += 1
+
+            chars.append(self._query[self._pos])
+            self._pos += 1
+
+        if self._pos >= len(self._query):
+            raise QueryError('Missing closing {} in {}'.format(end, self._query))
+
+        self._pos += 1
+        return ''.join(chars)
+
+    def _parse_value(self, field):
+        char = self._peek()
+
+        # "phrase"
+        if char == '"':
+            words = analyze(self._read_until('"'))
+            return lambda document: any(has_phrase(value, words) for value in get_values(document, field))
+
+        # /regular expression/
+        if char == '/':
+            regex = re.compile(self._read_until('/'))
+            return lambda document: any(matches_pattern(regex, value) for value in get_values(document, field))
+
+        # [a TO b], {a TO b}, [a TO b}
+        if char in '[{':
+            end = min([pos for pos in (self._query.find(']', self._pos), self._query.find('}', self._pos)) if pos > 0]
+                      or [len(self._query)])
+            closing = self._query[end:end + 1]
+
+            bounds = re.match(r'^\s*(\S+)\s+TO\s+(\S+)\s*$', self._query[self._pos + 1:end])
+            self._pos = end + 1
+
+            if bounds is None or not closing:
+                raise QueryError('Invalid range in {}'.format(self._query))
+
+            (lower, upper) = [None if bound == '*' else bound for bound in bounds.groups()]
+            kwargs = {'gte' if char == '[' else 'gt': lower, 'lte' if closing == ']' else 'lt': upper}
+
+            return lambda document: any(in_range(value, **kwargs) for value in get_values(document, field))
+
+        # >=a, <b
+        if char in '<>':
+            operator = self._peek(2) if self._peek(2) in ('>=', '<=') else char
+            self._pos += len(operator)
+
+            (bound, _) = self._read_term()
+            kwargs = {{'>=': 'gte', '>': 'gt', '<=': 'lte', '<': 'lt'}[operator]: bound}
+
+            return lambda document: any(in_range(value, **kwargs) for value in get_values(document, field))
+
+        (term, pattern) = self._read_term()
+
+        # field:* - the field is set
+        if term == '*':
+            return lambda document: any(to_text(value) != '' for value in get_values(document, field))
+
+        if pattern is not None:
+            regex = re.compile(pattern.lower())
+            return lambda document: any(matches_pattern(regex, value) for value in get_values(document, field))
+
+        words = analyze(term)
+        return lambda document: any(has_phrase(value, words) for value in get_values(document, field))
+
+
+class ElasticsearchQuery(object):
+    """
+    Compiled query DSL: bool, query_string, match, match_phrase, term, terms, range, exists,
+    match_all and sampling scripts (see PaginatedKibana._get_search_body)
+
+    Named queries (with "_name" parameter) are reported for matching documents (see get_matched_queries)
+    """
+    def __init__(self, query, now=None):
+        """
+        :type query dict|None
+        :type now float|None
+        """
+        self._now = now
+        self._named = []
+        self._predicate = self._compile(query or {'match_all': {}})
+
+    def matches(self, document, doc_id=None):
+        """
+        :type document dict
+        :type doc_id str|None
+        :rtype: bool
+        """
+        return self._predicate(document, doc_id)
+
+    def get_matched_queries(self, document, doc_id=None):
+        """
+        :type document dict
+        :type doc_id str|None
+        :rtype: list[str]
+        """
+        return [name for (name, predicate) in self._named if predicate(document, doc_id)]
+
+    def _compile(self, query):
+        """
+        :type query dict
+        :rtype: callable
+        """
+        if not isinstance(query, dict) or len(query) != 1:
+            raise QueryError('Invalid query: {}'.format(query))
+
+        ((kind, params),) = query.items()
+        compiler = getattr(self, '_compile_{}'.format(kind), None)
+
+        if compiler is None:
+            raise QueryError('Unsupported query: {}'.format(kind))
+
+        if isinstance(params, dict) and '_name' in params:
+            params = dict(params)
+            name = params.pop('_name')
+
+            predicate = compiler(params)
+            self._named.append((name, predicate))
+
+            return predicate
+
+        return compiler(params)
+
+    def _compile_list(self, queries):
+        """
+        :type queries dict|list|None
+        :rtype: list[callable]
+        """
+        if queries is None:
+            return []
+
+        return [self._compile(query) for query in (queries if isinstance(queries, list) else [queries])]
+
+    @staticmethod
+    def _get_field(params):
+        """
+        Return a single field and its parameters, e.g. {"@message": "foo"}
+
+        :type params dict
+        :rtype: tuple[str, object]
+        """
+        if not isinstance(params, dict) or len(params) != 1:
+            raise QueryError('A single field expected: {}'.format(params))
+
+        return list(params.items())[0]
+
+    @staticmethod
+    def _compile_match_all(params):
+        return lambda document, doc_id: True
+
+    def _compile_bool(self, params):
+        must = self._compile_list(params.get('must')) + self._compile_list(params.get('filter'))
+        should = self._compile_list(params.get('should'))
+        must_not = self._compile_list(params.get('must_not'))
+
+        minimum_should_match = int(params.get('minimum_should_match', 0 if must else 1))
+
+        def _predicate(document, doc_id):
+            if any(predicate(document, doc_id) for predicate in must_not):
+                return False
+
+            if not all(predicate(document, doc_id) for predicate in must):
+                return False
+
+            if should and minimum_should_match:
+                return sum(1 for predicate in should if predicate(document, doc_id)) >= minimum_should_match
+
+            return True
+
+        return _predicate
+
+    @staticmethod
+    def _compile_query_string(params):
+        query = LuceneQuery(
+            params['query'],
+            default_field=params.get('default_field', '*'),
+            default_operator=params.get('default_operator', 'OR'),
+        )
+
+        return lambda document, doc_id: query.matches(document)
+
+    def _compile_match(self, params):
+        (field, value) = self._get_field(params)
+        operator = 'OR'
+
+        if isinstance(value, dict):
+            operator = value.get('operator', 'OR').upper()
+            value = value['query']
+
+        words = analyze(to_text(value))
+        check = all if operator == 'AND' else any
+
+        return lambda document, doc_id: any(
+            check(word in analyze(to_text(item)) for word in words) for item in get_values(document, field))
+
+    def _compile_match_phrase(self, params):
+        (field, value) = self._get_field(params)
+        words = analyze(to_text(value['query'] if isinstance(value, dict) else value))
+
+        return lambda document, doc_id: any(has_phrase(item, words) for item in get_values(document, field))
+
+    def _compile_term(self, params):
+        (field, value) = self._get_field(params)
+        value = value['value'] if isinstance(value, dict) else value
+
+        return lambda document, doc_id: any(compare(item, value) == 0 for item in get_values(document, field))
+
+    def _compile_terms(self, params):
+        (field, values) = self._get_field(params)
+
+        return lambda document, doc_id: any(
+            compare(item, value) == 0 for item in get_values(document, field) for value in values)
+
+    def _compile_exists(self, params):
+        field = params['field']
+        return lambda document, doc_id: len(get_values(document, field)) > 0
+
+    def _compile_range(self, params):
+        (field, bounds) = self._get_field(params)
+
+        # resolve date math (e.g. now-1h) once, numbers are compared as epoch milliseconds
+        bounds = {
+            name: parse_date(value, self._now) * 1000 if isinstance(value, str) and value.startswith('now') else value
+            for (name, value) in bounds.items() if name in ('gte', 'gt', 'lte', 'lt')
+        }
+
+        return lambda document, doc_id: any(in_range(item, **bounds) for item in get_values(document, field))
+
+    @staticmethod
+    def _compile_script(params):
+        # only sampling scripts are supported, e.g. "Math.abs(doc['_id'].value.hashCode()) % 100 < params.sampling"
+        script = params.get('script', {})
+        sampling = script.get('params', {}).get('sampling')
+
+        if sampling is None or 'hashCode' not in script.get('source', ''):
+            raise QueryError('Unsupported script: {}'.format(script))
+
+        return lambda document, doc_id: abs(java_hash_code(str(doc_id))) % 100 < sampling
+
+
+def filter_source(document, includes=None, excludes=None):
+    """
+    Return selected fields of the document (see _source filtering)
+
+    :type document dict
+    :type includes list[str]|None
+    :type excludes list[str]|None
+    :rtype: dict
+    """
+    return _filter_source(document, '', includes, excludes or [])
+
+
+def _filter_source(value, prefix, includes, excludes):
+    filtered = dict()
+
+    for (key, item) in value.items():
+        path = prefix + key
+
+        if any(fnmatch.fnmatchcase(path, pattern) for pattern in excludes):
+            continue
+
+        if includes is None or any(fnmatch.fnmatchcase(path, pattern) or _is_parent(path, pattern)
+                                   for pattern in includes):
+            # the entire object was included
+            if includes is not None and any(fnmatch.fnmatchcase(path, pattern) for pattern in includes):
+                nested_includes = None
+            else:
+                nested_includes = includes
+
+            if isinstance(item, dict):
+                item = _filter_source(item, path + '.', nested_includes, excludes)
+
+                if not item and nested_includes is not None:
+                    continue
+
+            filtered[key] = item
+
+    return filtered
+
+
+def _is_parent(path, pattern):
+    """
+    Tell whether fields matching the pattern can be nested in a given path
+
+    :type path str
+    :type pattern str
+    :rtype: bool
+    """
+    path = path.split('.')
+    pattern = pattern.split('.')
+
+    return len(pattern) > len(path) and all(fnmatch.fnmatchcase(name, part) for (name, part) in zip(path, pattern))
@@ -0,0 +1,562 @@
+"""
+Local stand-in for Jira REST API used by reporter.reporters.Jira
+
+Covers server info, fields, JQL search (see reporter.fakes.jql), issues creation and updates,
+transitions and comments. Latency, rate limits and HTTP 429 responses can be simulated.
+
+Run it with "python -m reporter.fakes.jira_server --port 8080" and set JIRA_CONFIG['url'] to
+http://localhost:8080 in config.py (any user and password are accepted).
+"""
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from .jql import JQLQuery, JQLError
+
+# status -> transitions available, i.e. (ID, name, target status, resolution)
+TRANSITIONS = [
+    ('11', 'Open', 'Open', None),
+    ('21', 'Start Progress', 'In Progress', None),
+    ('31', 'Close', 'Closed', 'Done'),
+]
+
+STATUSES = {'Open': '1', 'In Progress': '3', 'Closed': '6'}
+RESOLUTIONS = {'Done': '1', "Won't Fix": '2', 'Duplicate': '3'}
+
+
+def format_date(timestamp):
+    """
+    :type timestamp float|None
+    :rtype: str|None
+    """
+    if timestamp is None:
+        return None
+
+    # e.g. 2020-01-31T10:00:00.000+0000
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000+0000', time.gmtime(timestamp))
+
+
+class FakeJiraServer(object):
+    """
+    Keeps issues in memory and serves them over HTTP from a background thread
+
+    server = FakeJiraServer(latency=0.05, rate_limit=10)
+    server.add_issue('ER', status='Closed', resolution="Won't Fix", fields={'customfield_13200': 'hash'})
+    server.start()
+    ...
+    server.stop()
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0, rate_limit=None, error_rate=0, retry_after=1,
+                 custom_fields=None):
+        """
+        :type host str
+        :type port int
+        :type latency float
+        :type rate_limit int|None
+        :type error_rate float
+        :type retry_after int
+        :type custom_fields dict|None
+        :arg port: 0 picks a free port
+        :arg latency: [sec] how long it takes to handle each request
+        :arg rate_limit: how many requests per second are accepted, the rest gets HTTP 429
+        :arg error_rate: the fraction of requests that randomly get HTTP 429 (0 - 1)
+        :arg retry_after: [sec] Retry-After header value sent with HTTP 429 responses
+        :arg custom_fields: custom field ID -> name (returned by fields API)
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+        self._custom_fields = custom_fields or {}
+        self._issues = dict()
+        self._counters = Counter()
+        self._requests = deque()
+        self._stats = Counter()
+
+        server = self
+
+        class _Handler(FakeJiraRequestHandler):
+            jira = server
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        :rtype: str
+        """
+        (host, port) = self._httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        """ Serve requests in a background thread """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-jira', daemon=True)
+        self._thread.start()
+
+        self._logger.info('Serving on <{}>'.format(self.url))
+        return self
+
+    def stop(self):
+        """ Stop serving requests """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """ Serve requests in the current thread """
+        self._logger.info('Serving on <{}>'.format(self.url))
+        self._httpd.serve_forever()
+
+    def get_stats(self):
+        """
+        Return the number of requests handled for each endpoint (and the number of HTTP 429 responses)
+
+        :rtype: dict[str, int]
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def add_issue(self, project='ER', status='Open', resolution=None, resolved=None, fields=None):
+        """
+        Add an issue and return its key
+
+        :type project str
+        :type status str
+        :type resolution str|None
+        :type resolved float|None
+        :type fields dict|None
+        :arg resolved: resolution date (UNIX timestamp)
+        :arg fields: other fields, e.g. summary, description and custom fields
+        :rtype: str
+        """
+        now = time.time()
+
+        with self._lock:
+            self._counters[project] += 1
+            self._counters['id'] += 1
+
+            key = '{}-{}'.format(project, self._counters[project])
+
+            issue = {
+                'summary': '',
+                'description': '',
+                'labels': [],
+                'issuetype': 'Defect',
+                'priority': None,
+                'assignee': None,
+                'components': [],
+            }
+            issue.update(fields or {})
+            issue.update({
+                'id': str(10000 + self._counters['id']),
+                'key': key,
+                'project': project,
+                'status': status,
+                'resolution': resolution,
+                'resolutiondate': (now if resolved is None else resolved) if resolution else None,
+                'created': now,
+                'updated': now,
+                'comments': [],
+            })
+
+            self._issues[key] = issue
+
+        return key
+
+    def get_issue(self, key):
+        """
+        :type key str
+        :rtype: dict|None
+        """
+        with self._lock:
+            issue = self._issues.get(key)
+
+            # issues can be fetched by their ID as well
+            if issue is None:
+                issue = next((item for item in self._issues.values() if item['id'] == key), None)
+
+            return issue
+
+    def search(self, jql):
+        """
+        Return issues matching a given JQL query (sorted by their keys)
+
+        :type jql str
+        :rtype: list[dict]
+        """
+        query = JQLQuery(jql)
+
+        with self._lock:
+            issues = [issue for issue in self._issues.values() if query.matches(issue)]
+
+        return sorted(issues, key=lambda issue: (issue['project'], int(issue['key'].split('-')[1])))
+
+    def update_issue(self, issue, fields=None, comment=None):
+        """
+        :type issue dict
+        :type fields dict|None
+        :type comment str|None
+        """
+        with self._lock:
+            for (name, value) in (fields or {}).items():
+                # select fields are set by {"name": ...} or {"id": ...}
+                if isinstance(value, dict) and name in ['issuetype', 'project']:
+                    value = value.get('name') or value.get('key')
+
+                issue[name] = value
+
+            if comment is not None:
+                issue['comments'].append({'id': str(len(issue['comments']) + 1), 'body': comment})
+
+            issue['updated'] = time.time()
+
+    def transition_issue(self, issue, transition_id, comment=None):
+        """
+        :type issue dict
+        :type transition_id str
+        :type comment str|None
+        :rtype: bool
+        """
+        transition = next((item for item in TRANSITIONS if item[0] == str(transition_id)), None)
+
+        if transition is None:
+            return False
+
+        (_, _, status, resolution) = transition
+
+        self.update_issue(issue, fields={
+            'status': status,
+            'resolution': resolution,
+            'resolutiondate': time.time() if resolution else None,
+        }, comment=comment)
+
+        return True
+
+    def check_limits(self, endpoint):
+        """
+        Count the request and return Retry-After value when it should be rejected with HTTP 429
+
+        :type endpoint str
+        :rtype: int|None
+        """
+        now = time.time()
+
+        with self._lock:
+            self._stats[endpoint] += 1
+
+            # requests sent during the last second
+            while self._requests and self._requests[0] < now - 1:
+                self._requests.popleft()
+
+            limited = self.rate_limit is not None and len(self._requests) >= self.rate_limit
+            limited = limited or random.random() < self.error_rate
+
+            if limited:
+                self._stats['429'] += 1
+                return self.retry_after
+
+            self._requests.append(now)
+
+        return None
+
+    def render_issue(self, issue, fields=None):
+        """
+        Return JSON representation of an issue (with selected fields only)
+
+        :type issue dict
+        :type fields list[str]|None
+        :rtype: dict
+        """
+        api = '{}/rest/api/2'.format(self.url)
+
+        with self._lock:
+            issue = dict(issue)
+
+        status = issue['status']
+        resolution = issue['resolution']
+
+        rendered = {
+            'summary': issue['summary'],
+            'description': issue['description'],
+            'labels': issue['labels'],
+            'priority': issue['priority'],
+            'components': issue['components'],
+            'assignee': issue['assignee'],
+            'project': {'self': '{}/project/{}'.format(api, issue['project']), 'key': issue['project']},
+            'issuetype': {'self': '{}/issuetype/1'.format(api), 'name': issue['issuetype']},
+            'status': {'self': '{}/status/{}'.format(api, STATUSES.get(status, '1')), 'name': status},
+            'resolution': {
+                'self': '{}/resolution/{}'.format(api, RESOLUTIONS.get(resolution, '1')), 'name': resolution
+            } if resolution else None,
+            'resolutiondate': format_date(issue['resolutiondate']),
+            'created': format_date(issue['created']),
+            'updated': format_date(issue['updated']),
+            'comment': {'comments': issue['comments'], 'total': len(issue['comments'])},
+        }
+
+        # custom fields
+        for (name, value) in issue.items():
+            if name.startswith('customfield_'):
+                rendered[name] = value
+
+        if fields and '*all' not in fields:
+            rendered = {name: rendered.get(name) for name in fields}
+
+        return {
+            'id': issue['id'],
+            'key': issue['key'],
+            'self': '{}/issue/{}'.format(api, issue['id']),
+            'fields': rendered,
+        }
+
+    def get_fields(self):
+        """
+        :rtype: list[dict]
+        """
+        fields = [
+            {'id': name, 'name': name.capitalize(), 'custom': False, 'clauseNames': [name]}
+            for name in ['summary', 'description', 'labels', 'priority', 'components', 'assignee', 'project',
+                         'issuetype', 'status', 'resolution', 'resolutiondate', 'created', 'updated']
+        ]
+
+        fields += [
+            {'id': field_id, 'name': name, 'custom': True,
+             'clauseNames': ['cf[{}]'.format(field_id.replace('customfield_', '')), name]}
+            for (field_id, name) in self._custom_fields.items()
+        ]
+
+        return fields
+
+
+class FakeJiraRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes Jira REST API requests to FakeJiraServer
+    """
+    jira = None  # type: FakeJiraServer
+
+    protocol_version = 'HTTP/1.1'
+
+    ROUTES = [
+        ('GET', r'^/rest/api/2/serverInfo$', 'server_info'),
+        ('GET', r'^/rest/api/2/field$', 'fields'),
+        ('GET', r'^/rest/auth/1/session$', 'session'),
+        ('GET', r'^/rest/api/2/myself$', 'session'),
+        ('GET', r'^/rest/api/2/search$', 'search'),
+        ('POST', r'^/rest/api/2/search$', 'search'),
+        ('POST', r'^/rest/api/2/issue$', 'create'),
+        ('GET', r'^/rest/api/2/issue/(?P<key>[^/]+)$', 'issue'),
+        ('PUT', r'^/rest/api/2/issue/(?P<key>[^/]+)$', 'update'),
+        ('GET', r'^/rest/api/2/issue/(?P<key>[^/]+)/transitions$', 'transitions'),
+        ('POST', r'^/rest/api/2/issue/(?P<key>[^/]+)/transitions$', 'transition'),
+        ('POST', r'^/rest/api/2/issue/(?P<key>[^/]+)/comment$', 'comment'),
+    ]
+
+    # Jira Cloud returns up to 100 issues per page
+    MAX_RESULTS = 100
+
+    def log_message(self, format, *args):  # pylint:disable=redefined-builtin
+        logging.getLogger('FakeJiraServer').debug(format, *args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def _send(self, status, body=None, headers=None):
+        """
+        :type status int
+        :type body object
+        :type headers dict|None
+        """
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        """
+        :rtype: dict
+        """
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        body = self._read_body()
+
+        for (route_method, pattern, endpoint) in self.ROUTES:
+            matches = re.match(pattern, url.path)
+
+            if route_method == method and matches:
+                break
+        else:
+            self._send(404, {'errorMessages': ['Not found: {} {}'.format(method, url.path)]})
+            return
+
+        time.sleep(self.jira.latency)
+
+        retry_after = self.jira.check_limits(endpoint)
+
+        if retry_after is not None:
+            self._send(429, {'errorMessages': ['Rate limit exceeded']}, {'Retry-After': str(retry_after)})
+            return
+
+        # lists can be passed as repeated parameters, e.g. fields=status&fields=resolution
+        params = {name: ','.join(values) for (name, values) in parse_qs(url.query).items()}
+        params.update(matches.groupdict())
+
+        try:
+            getattr(self, '_handle_{}'.format(endpoint))(params, body)
+        except JQLError as ex:
+            self._send(400, {'errorMessages': [str(ex)]})
+
+    def _get_issue(self, params):
+        """
+        :type params dict
+        :rtype: dict|None
+        """
+        issue = self.jira.get_issue(params['key'])
+
+        if issue is None:
+            self._send(404, {'errorMessages': ['Issue does not exist']})
+
+        return issue
+
+    def _handle_server_info(self, params, body):
+        self._send(200, {
+            'baseUrl': self.jira.url,
+            'version': '1001.0.0',
+            'versionNumbers': [1001, 0, 0],
+            'deploymentType': 'Cloud',
+            'serverTitle': 'Fake Jira',
+        })
+
+    def _handle_fields(self, params, body):
+        self._send(200, self.jira.get_fields())
+
+    def _handle_session(self, params, body):
+        self._send(200, {'name': 'jira-reporter', 'displayName': 'Jira Reporter'})
+
+    def _handle_search(self, params, body):
+        params.update(body)
+
+        start_at = int(params.get('startAt') or 0)
+        max_results = min(int(params.get('maxResults') or 50), self.MAX_RESULTS)
+
+        fields = params.get('fields')
+
+        if isinstance(fields, str):
+            fields = fields.split(',')
+
+        issues = self.jira.search(params.get('jql') or '')
+
+        self._send(200, {
+            'startAt': start_at,
+            'maxResults': max_results,
+            'total': len(issues),
+            'issues': [self.jira.render_issue(issue, fields) for issue in issues[start_at:start_at + max_results]],
+        })
+
+    def _handle_create(self, params, body):
+        fields = dict(body.get('fields', {}))
+
+        project = fields.pop('project', {}).get('key', 'ER')
+        issue_type = fields.pop('issuetype', {}).get('name', 'Defect')
+
+        key = self.jira.add_issue(project, fields=dict(fields, issuetype=issue_type))
+        issue = self.jira.get_issue(key)
+
+        self._send(201, {'id': issue['id'], 'key': key, 'self': '{}/rest/api/2/issue/{}'.format(
+            self.jira.url, issue['id'])})
+
+    def _handle_issue(self, params, body):
+        issue = self._get_issue(params)
+
+        if issue is not None:
+            fields = params.get('fields')
+            self._send(200, self.jira.render_issue(issue, fields.split(',') if fields else None))
+
+    def _handle_update(self, params, body):
+        issue = self._get_issue(params)
+
+        if issue is not None:
+            comments = [item['add']['body'] for item in body.get('update', {}).get('comment', [])]
+
+            self.jira.update_issue(issue, fields=body.get('fields'), comment=comments[0] if comments else None)
+            self._send(204)
+
+    def _handle_transitions(self, params, body):
+        issue = self._get_issue(params)
+
+        if issue is not None:
+            self._send(200, {'transitions': [
+                {'id': transition_id, 'name': name, 'to': {'name': status}}
+                for (transition_id, name, status, _) in TRANSITIONS
+                if status != issue['status']
+            ]})
+
+    def _handle_transition(self, params, body):
+        issue = self._get_issue(params)
+
+        if issue is not None:
+            comments = [item['add']['body'] for item in body.get('update', {}).get('comment', [])]
+
+            if self.jira.transition_issue(issue, body.get('transition', {}).get('id'),
+                                          comment=comments[0] if comments else None):
+                self._send(204)
+            else:
+                self._send(400, {'errorMessages': ['Invalid transition']})
+
+    def _handle_comment(self, params, body):
+        issue = self._get_issue(params)
+
+        if issue is not None:
+            self.jira.update_issue(issue, comment=body.get('body'))
+            self._send(201, issue['comments'][-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for Jira REST API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help='[sec] added to each request')
+    parser.add_argument('--rate-limit', type=int, default=None, help='requests per second accepted')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests rejected with HTTP 429')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    FakeJiraServer(host=args.host, port=args.port, latency=args.latency, rate_limit=args.rate_limit,
+                   error_rate=args.error_rate).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Evaluates the subset of JQL used by the reporter against issues kept in memory
+"""
+import re
+import time
+
+# @see https://support.atlassian.com/jira-software-cloud/docs/advanced-search-reference-jql-operators/
+TOKENS = re.compile(r"""
+    \s*(?:
+        (?P<paren>[(),])
+      | (?P<operator>!=|>=|<=|!~|=|~|>|<)
+      | '(?P<single_quoted>[^']*)'
+      | "(?P<double_quoted>[^"]*)"
+      | (?P<word>[\w\-.\[\]/:]+)
+    )
+""", re.VERBOSE)
+
+# e.g. -15m, -2h, -1d
+RELATIVE_DATE = re.compile(r'^-(\d+)([mhdw])$')
+RELATIVE_DATE_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+ABSOLUTE_DATE_FORMATS = ['%Y/%m/%d %H:%M', '%Y-%m-%d %H:%M', '%Y/%m/%d', '%Y-%m-%d']
+
+# fields that are compared using their timestamps
+DATE_FIELDS = ['created', 'updated', 'resolutiondate']
+
+
+class JQLError(ValueError):
+    """ Raised when a query can not be parsed """
+
+
+def parse_date(value, now=None):
+    """
+    Return UNIX timestamp for relative (e.g. -15m) or absolute (e.g. 2020/01/31 10:00) date
+
+    :type value str
+    :type now float|None
+    :rtype: float
+    """
+    matches = RELATIVE_DATE.match(value)
+
+    if matches:
+        return (now or time.time()) - int(matches.group(1)) * RELATIVE_DATE_UNITS[matches.group(2)]
+
+    for date_format in ABSOLUTE_DATE_FORMATS:
+        try:
+            return time.mktime(time.strptime(value, date_format))
+        except ValueError:
+            pass
+
+    raise JQLError('Unsupported date: {}'.format(value))
+
+
+def get_field_name(field):
+    """
+    :type field str
+    :rtype: str
+    """
+    # e.g. cf[13200] -> customfield_13200
+    matches = re.match(r'^cf\[(\d+)\]$', field)
+    return 'customfield_{}'.format(matches.group(1)) if matches else field.lower()
+
+
+class JQLQuery(object):
+    """
+    Parsed JQL query that can be matched against issues
+
+    Issues are dicts with plain values, e.g. {'key': 'ER-1', 'project': 'ER', 'status': 'Open',
+    'updated': 1580000000.0, 'customfield_13200': '...'}
+
+    Supported: AND, OR, NOT, parentheses, =, !=, ~, !~, >, >=, <, <=, IN, NOT IN, IS [NOT] EMPTY
+    """
+    def __init__(self, jql, now=None):
+        """
+        :type jql str
+        :type now float|None
+        """
+        self._now = now
+        self._tokens = self._tokenize(jql)
+        self._pos = 0
+
+        self._predicate = self._parse_or()
+
+        if self._pos < len(self._tokens):
+            raise JQLError('Unexpected "{}" in {}'.format(self._tokens[self._pos][1], jql))
+
+    @staticmethod
+    def _tokenize(jql):
+        """
+        :type jql str
+        :rtype: list[tuple]
+        """
+        tokens = []
+        pos = 0
+        jql = jql.strip()
+
+        while pos < len(jql):
+            matches = TOKENS.match(jql, pos)
+
+            if matches is None:
+                raise JQLError('Can not parse {}'.format(jql[pos:]))
+
+            kind = matches.lastgroup
+            value = matches.group(kind)
+
+            # quoted values are never keywords
+            tokens.append(('value' if kind.endswith('quoted') else kind, value))
+            pos = matches.end()
+
+        return tokens
+
+    def _peek(self):
+        """
+        :rtype: tuple
+        """
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else (None, None)
+
+    def _next(self):
+        """
+        :rtype: tuple
+        """
+        token = self._peek()
+
+        if token[0] is None:
+            raise JQLError('Unexpected end of the query')
+
+        self._pos += 1
+        return token
+
+    def _is_keyword(self, keyword):
+        """
+        :type keyword str
+        :rtype: bool
+        """
+        (kind, value) = self._peek()
+        return kind == 'word' and value.upper() == keyword
+
+    def _parse_or(self):
+        predicates = [self._parse_and()]
+
+        while self._is_keyword('OR'):
+            self._next()
+            predicates.append(self._parse_and())
+
+        return predicates[0] if len(predicates) == 1 else lambda issue: any(p(issue) for p in predicates)
+
+    def _parse_and(self):
+        predicates = [self._parse_not()]
+
+        while self._is_keyword('AND'):
+            self._next()
+            predicates.append(self._parse_not())
+
+        return predicates[0] if len(predicates) == 1 else lambda issue: all(p(issue) for p in predicates)
+
+    def _parse_not(self):
+        if self._is_keyword('NOT'):
+            self._next()
+            predicate = self._parse_not()
+            return lambda issue: not predicate(issue)
+
+        if self._peek() == ('paren', '('):
+            self._next()
+            predicate = self._parse_or()
+
+            if self._next() != ('paren', ')'):
+                raise JQLError('Missing closing parenthesis')
+
+            return predicate
+
+        return self._parse_clause()
+
+    def _parse_value(self):
+        """
+        :rtype: str
+        """
+        (kind, value) = self._next()
+
+        if kind not in ['value', 'word']:
+            raise JQLError('Unexpected "{}"'.format(value))
+
+        return value
+
+    def _parse_list(self):
+        """
+        :rtype: list[str]
+        """
+        if self._next() != ('paren', '('):
+            raise JQLError('List of values expected')
+
+        values = [self._parse_value()]
+
+        while self._peek() == ('paren', ','):
+            self._next()
+            values.append(self._parse_value())
+
+        if self._next() != ('paren', ')'):
+            raise JQLError('Missing closing parenthesis')
+
+        return values
+
+    def _parse_clause(self):
+        field = get_field_name(self._parse_value())
+
+        if self._is_keyword('IS'):
+            self._next()
+            negated = self._is_keyword('NOT')
+
+            if negated:
+                self._next()
+
+            if not (self._is_keyword('EMPTY') or self._is_keyword('NULL')):
+                raise JQLError('EMPTY expected')
+
+            self._next()
+            return lambda issue: self._is_empty(issue.get(field)) != negated
+
+        negated = self._is_keyword('NOT')
+
+        if negated:
+            self._next()
+
+            if not self._is_keyword('IN'):
+                raise JQLError('IN expected')
+
+        if self._is_keyword('IN'):
+            self._next()
+            values = [value.lower() for value in self._parse_list()]
+            return lambda issue: (str(issue.get(field)).lower() in values) != negated
+
+        (kind, operator) = self._next()
+
+        if kind != 'operator':
+            raise JQLError('Operator expected, got "{}"'.format(operator))
+
+        value = self._parse_value()
+
+        if operator in ['~', '!~']:
+            value = value.lower()
+            return lambda issue: (value in self._get_text(issue.get(field))) != (operator == '!~')
+
+        if field in DATE_FIELDS:
+            value = parse_date(value, self._now)
+            return lambda issue: self._compare(issue.get(field), operator, value)
+
+        value = value.lower()
+        return lambda issue: self._compare(
+            None if issue.get(field) is None else str(issue.get(field)).lower(), operator, value)
+
+    @staticmethod
+    def _is_empty(value):
+        return value is None or value == '' or value == []
+
+    @staticmethod
+    def _get_text(value):
+        """
+        :rtype: str
+        """
+        if isinstance(value, list):
+            value = ' '.join(str(item) for item in value)
+
+        return '' if value is None else str(value).lower()
+
+    @staticmethod
+    def _compare(value, operator, expected):
+        if value is None:
+            return operator == '!='
+
+        return {
+            '=': lambda: value == expected,
+            '!=': lambda: value != expected,
+            '>': lambda: value > expected,
+            '>=': lambda: value >= expected,
+            '<': lambda: value < expected,
+            '<=': lambda: value <= expected,
+        }[operator]()
+
+    def matches(self, issue):
+        """
+        :type issue dict
+        :rtype: bool
+        """
+        return self._predicate(issue)
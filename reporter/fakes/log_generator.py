@@ -0,0 +1,939 @@
+"""
+Generates synthetic log corpora shaped like the indices our sources query
+
+Each schema emits documents of a single kind (e.g. PHP errors in logstash-mediawiki, SQL logs with
+@context.num_rows, Pandora rawMessage, Celery exception, k8s events, UCP stack_trace). Every document
+belongs to one of the configured number of groups (what the source normalizes the entry to) and groups
+are drawn from the Zipf distribution - a few messages are logged all the time, most of them only once in a while.
+Parts that the sources normalize away (release paths, IDs, hosts, URLs) vary between documents of the same group.
+
+Documents are written to NDJSON(.gz) files - one for each index - that reporter.fakes.elasticsearch_server
+serves. They are streamed, so corpora of 10k and 10M entries can be generated alike, e.g.
+
+python -m reporter.fakes.log_generator --data-dir corpora/ --entries 1000000 --groups 500 --zipf 1.2
+
+AnemometerSource is not covered, it does not query elasticsearch (see reporter.sources.corpus to record it).
+"""
+import argparse
+import gzip
+import itertools
+import json
+import logging
+import os
+import random
+import time
+
+# schema classes registered with @schema decorator
+SCHEMAS = []
+
+
+def schema(cls):
+    """
+    Register a schema class (see SCHEMAS)
+    """
+    SCHEMAS.append(cls)
+    return cls
+
+
+class LogSchema(object):
+    """
+    Base class for documents of a given kind
+
+    get_group() returns the parts shared by all documents of a given group (they're kept by the generator),
+    get_document() renders a single document using them.
+    """
+    # used to pick schemas from the command line
+    NAME = None
+
+    # index the documents are written to
+    INDEX = None
+
+    # names of source classes that query these documents
+    SOURCES = []
+
+    # relative volume of documents
+    WEIGHT = 1
+
+    # fraction of documents logged outside of production (most sources filter them out)
+    NON_PRODUCTION_RATIO = 0.1
+
+    WIKIS = ['muppet', 'starwars', 'harrypotter', 'elderscrolls', 'callofduty', 'pl.gothic', 'de.memory-alpha']
+
+    def get_group(self, group, rng):
+        """
+        :type group int
+        :type rng random.Random
+        :rtype: dict
+        :arg group: the group index, 0 is the most frequent one
+        """
+        raise NotImplementedError("get_group() method needs to be overwritten in your class!")
+
+    def get_document(self, group, rng):
+        """
+        :type group dict
+        :type rng random.Random
+        :rtype: dict
+        :arg group: returned by get_group()
+        """
+        raise NotImplementedError("get_document() method needs to be overwritten in your class!")
+
+    def _is_production(self, rng):
+        """
+        :type rng random.Random
+        :rtype: bool
+        """
+        return rng.random() >= self.NON_PRODUCTION_RATIO
+
+    def _get_host(self, rng, production=True):
+        """
+        :type rng random.Random
+        :type production bool
+        :rtype: str
+        """
+        return '{}-s{}'.format(rng.choice(['ap', 'task', 'cron']) if production else 'dev', rng.randint(1, 60))
+
+    def _get_url(self, rng):
+        """
+        :type rng random.Random
+        :rtype: str
+        """
+        return 'https://{}.fandom.com/wiki/Page_{}'.format(rng.choice(self.WIKIS), rng.randint(1, 100000))
+
+    @staticmethod
+    def _get_release_path(rng):
+        """
+        e.g. /usr/wikia/slot1/3006/src (normalized by PHP sources)
+
+        :type rng random.Random
+        :rtype: str
+        """
+        return '/usr/wikia/slot1/{}/src'.format(rng.randint(3000, 3100))
+
+    @staticmethod
+    def _get_php_file(group, rng):
+        """
+        :type group int
+        :type rng random.Random
+        :rtype: str
+        """
+        return '/{}/{}{}.class.php'.format(
+            rng.choice(['includes/wikia/services', 'extensions/wikia/Chat2', 'includes/api', 'skins/oasis/modules']),
+            rng.choice(['UserStats', 'ArticleComments', 'WikiFactory', 'Parser', 'Discussions']), group)
+
+    def _get_trace(self, rng, file_name):
+        """
+        PHP backtrace with release-specific paths
+
+        :type rng random.Random
+        :type file_name str
+        :rtype: list[str]
+        """
+        release = self._get_release_path(rng)
+
+        return ['{}{}:{}'.format(release, file_name, rng.randint(10, 500))] + [
+            '{}/includes/{}:{}'.format(release, name, rng.randint(10, 2000))
+            for name in ['Wiki.php', 'MediaWiki.php', 'WebStart.php', 'index.php']
+        ]
+
+    def _get_mediawiki_fields(self, rng, production=True):
+        """
+        :type rng random.Random
+        :type production bool
+        :rtype: dict
+        """
+        return {
+            'environment': 'prod' if production else 'dev',
+            'app_name': 'mediawiki',
+            'http_method': 'GET' if rng.random() < 0.9 else 'POST',
+            'http_url': self._get_url(rng),
+            'db_name': rng.choice(self.WIKIS).replace('.', ''),
+        }
+
+
+@schema
+class PHPErrorsSchema(LogSchema):
+    """ PHP fatals, warnings and notices (PHPErrorsSource) """
+    NAME = 'php-errors'
+    SOURCES = ['PHPErrorsSource']
+    INDEX = 'logstash-mediawiki'
+    WEIGHT = 20
+
+    # the same as PHPErrorsSource queries in bin/check.py
+    KINDS = ['PHP Notice', 'PHP Warning', 'PHP Strict Standards', 'PHP Fatal Error', 'PHP Catchable Fatal']
+
+    PROBLEMS = [
+        'Undefined index: {name}',
+        'Undefined offset: {number}',
+        'Undefined variable: {name}',
+        'Invalid argument supplied for foreach()',
+        'Call to a member function {name}() on null',
+        'array_key_exists() expects parameter 2 to be array, null given',
+        'Division by zero',
+        'Allowed memory size of 536870912 bytes exhausted (tried to allocate {number} bytes)',
+    ]
+
+    def get_group(self, group, rng):
+        return {
+            'kind': self.KINDS[group % len(self.KINDS)],
+            'problem': rng.choice(self.PROBLEMS),
+            'file': self._get_php_file(group, rng),
+            'line': rng.randint(10, 2000),
+        }
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+        problem = group['problem'].format(name='key{}'.format(rng.randint(1, 50)), number=rng.randint(1, 1 << 20))
+
+        message = '{}: {} in {}{} on line {}'.format(
+            group['kind'], problem, self._get_release_path(rng), group['file'], group['line'])
+
+        if group['kind'] == 'PHP Fatal Error':
+            message += ' Stack trace:\n#0 {}\n#1 {{main}}'.format(self._get_release_path(rng) + group['file'])
+
+        return {
+            '@message': message,
+            '@source_host': self._get_host(rng, production),
+            '@fields': self._get_mediawiki_fields(rng, production),
+            'severity': 'error',
+        }
+
+
+@schema
+class PHPExecutionTimeoutsSchema(LogSchema):
+    """ Execution timeouts of large articles (PHPExecutionTimeoutSource) """
+    NAME = 'php-timeouts'
+    SOURCES = ['PHPExecutionTimeoutSource']
+    INDEX = 'logstash-mediawiki'
+
+    def get_group(self, group, rng):
+        return {'url': 'https://{}.fandom.com/wiki/Very_long_article_{}'.format(rng.choice(self.WIKIS), group)}
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+
+        return {
+            '@message': 'PHP Fatal Error: Maximum execution time of 180 seconds exceeded in '
+                        '{}/includes/parser/Parser.php on line {}'.format(self._get_release_path(rng),
+                                                                          rng.randint(100, 5000)),
+            '@source_host': self._get_host(rng, production),
+            '@fields': dict(self._get_mediawiki_fields(rng, production), http_url=group['url']),
+            'severity': 'error',
+        }
+
+
+@schema
+class PHPExceptionsSchema(LogSchema):
+    """
+    Exceptions logged via WikiaLogger, with @exception.trace (PHPExceptionsSource, PHPAssertionsSource,
+    PHPSecuritySource and PHPTypeErrorsSource)
+    """
+    NAME = 'php-exceptions'
+    SOURCES = ['PHPExceptionsSource', 'PHPAssertionsSource', 'PHPSecuritySource', 'PHPTypeErrorsSource']
+    INDEX = 'logstash-mediawiki'
+    WEIGHT = 10
+
+    # (exception class, message template)
+    EXCEPTIONS = [
+        ('WikiaException', 'Server #{number} ({ip}) is excessively lagged ({number} seconds)'),
+        ('Error', 'Call to undefined method {name}::get{number}()'),
+        ('MWException', 'WikiaDataAccess could not obtain lock to generate data for: {name}:{number}'),
+        ('InvalidArgumentException', 'Invalid {name} given'),
+        ('Wikia\\Util\\AssertionException', 'API call to /user/{number}/attr/{name} timed out after '
+                                            '{number} milliseconds with {number} bytes received'),
+        ('TypeError', 'Argument 1 passed to {name}::get() must be an instance of Title, null given, '
+                      'called in /usr/wikia/slot1/{number}/src/includes/Article.php on line 42'),
+        ('Wikia\\Security\\Exception', 'CSRF detected'),
+        ('BadTitleError', 'The requested page title was invalid'),
+    ]
+
+    def get_group(self, group, rng):
+        (exception_class, message) = self.EXCEPTIONS[group % len(self.EXCEPTIONS)]
+
+        return {
+            'class': exception_class,
+            # keep the group distinct from others of the same class
+            'message': message.replace('{name}', 'Class{}'.format(group)),
+            'file': self._get_php_file(group, rng),
+            'severity': 'critical' if group % 50 == 49 else 'error',
+            'hook': rng.choice(['WikiFactoryChanged', 'ArticleSaveComplete', 'UserSaveSettings']),
+        }
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+
+        message = group['message'].format(number=rng.randint(1, 100), ip='10.8.{}.{}'.format(
+            rng.randint(0, 255), rng.randint(0, 255)))
+        trace = self._get_trace(rng, group['file'])
+        exception = {'class': group['class'], 'message': message, 'file': trace[0], 'trace': trace[1:]}
+
+        document = {
+            '@message': message,
+            '@source_host': self._get_host(rng, production),
+            '@fields': self._get_mediawiki_fields(rng, production),
+            '@context': {},
+            '@exception': exception,
+            'severity': group['severity'],
+        }
+
+        if group['class'] == 'Wikia\\Security\\Exception':
+            exception['file'] = '{}/extensions/wikia/Security/classes/CSRFDetector.class.php:{}'.format(
+                self._get_release_path(rng), rng.randint(10, 100))
+            exception['trace'] = trace
+
+            document['@context'] = {
+                'transaction': 'api/nirvana/{}'.format(group['file'].split('/')[-1].split('.')[0]),
+                'hookName': group['hook'],
+                'editTokenChecked': rng.random() < 0.5,
+                'httpMethodChecked': rng.random() < 0.5,
+            }
+
+        return document
+
+
+@schema
+class DBQueryErrorsSchema(LogSchema):
+    """ DBQueryError exceptions with the query, function and error in a message (DBQueryErrorsSource) """
+    NAME = 'db-errors'
+    SOURCES = ['DBQueryErrorsSource']
+    INDEX = 'logstash-mediawiki'
+    WEIGHT = 3
+
+    # (errno, error)
+    ERRORS = [
+        (1213, 'Deadlock found when trying to get lock; try restarting transaction'),
+        (1205, 'Lock wait timeout exceeded; try restarting transaction'),
+        (1317, 'Query execution was interrupted'),
+        (1146, "Table '{table}' doesn't exist"),
+        (1054, "Unknown column 'foo' in 'where clause'"),
+    ]
+
+    def get_group(self, group, rng):
+        (errno, err) = rng.choice(self.ERRORS)
+        table = rng.choice(['page', 'revision', 'user', 'categorylinks', 'wikicities.city_list'])
+
+        return {
+            'errno': errno,
+            'err': err.format(table=table),
+            'table': table,
+            'function': '{}::get{}'.format(rng.choice(['WikiaDataAccess', 'ArticleComment', 'UserStats']), group),
+        }
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+        server = '10.8.{}.{}'.format(rng.randint(0, 255), rng.randint(0, 255))
+        query = "SELECT * FROM `{}` WHERE id = '{}' LIMIT {}".format(
+            group['table'], rng.randint(1, 1 << 24), rng.randint(1, 500))
+
+        message = 'A database error has occurred.\nQuery: {query}\nFunction: {function}\n' \
+                  'Error: {errno} {err} ({server})'.format(query=query, server=server, **group)
+
+        return {
+            '@message': message.split('\n')[0],
+            '@source_host': self._get_host(rng, production),
+            '@fields': self._get_mediawiki_fields(rng, production),
+            '@context': {'errno': group['errno'], 'err': group['err'], 'server': server},
+            '@exception': {'class': 'DBQueryError', 'message': message, 'trace': self._get_trace(rng, '/Foo.php')},
+            'severity': 'error',
+        }
+
+
+@schema
+class PHPTriggeredSchema(LogSchema):
+    """ Messages logged with @context.jira_reporter set (PHPTriggeredSource) """
+    NAME = 'php-triggered'
+    SOURCES = ['PHPTriggeredSource']
+    INDEX = 'logstash-mediawiki'
+
+    def get_group(self, group, rng):
+        return {'message': 'Video provider #{} is outdated'.format(group)}
+
+    def get_document(self, group, rng):
+        return {
+            '@message': group['message'],
+            '@source_host': self._get_host(rng),
+            '@fields': self._get_mediawiki_fields(rng),
+            '@context': {'jira_reporter': 1, 'tags': ['video-providers'], 'body': 'Please update it'},
+            'severity': 'info',
+        }
+
+
+@schema
+class SQLLogsSchema(LogSchema):
+    """ SQL queries logs with @context.num_rows (DBQueryNoLimitSource), most of them return few rows """
+    NAME = 'sql'
+    SOURCES = ['DBQueryNoLimitSource']
+    INDEX = 'logstash-mediawiki-sql'
+    WEIGHT = 30
+
+    def get_group(self, group, rng):
+        return {
+            'query': 'SELECT {} FROM `{}` WHERE {} = {{value}}'.format(
+                rng.choice(['*', 'page_id, page_title', 'rev_id']),
+                rng.choice(['page', 'revision', 'categorylinks', 'watchlist']),
+                'col_{}'.format(group)),
+            'method': '{}::query{}'.format(rng.choice(['WikiPage', 'Revision', 'CategoryViewer']), group),
+            # one query out of three fetches far too many rows
+            'num_rows': rng.randint(2000, 50000) if group % 3 == 0 else rng.randint(0, 1999),
+        }
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+
+        return {
+            '@message': group['query'].format(value=rng.randint(1, 1 << 24)),
+            '@source_host': self._get_host(rng, production),
+            '@fields': self._get_mediawiki_fields(rng, production),
+            '@context': {'num_rows': group['num_rows'], 'method': group['method'], 'elapsed': rng.random()},
+            '@exception': {'trace': self._get_trace(rng, '/includes/db/Database.php')},
+        }
+
+
+@schema
+class NotCachedResponsesSchema(LogSchema):
+    """ wikia.php responses with caching disabled (NotCachedWikiaApiResponsesSource) """
+    NAME = 'caching'
+    SOURCES = ['NotCachedWikiaApiResponsesSource']
+    INDEX = 'logstash-other'
+    WEIGHT = 5
+
+    def get_group(self, group, rng):
+        return {'controller': 'Controller{}'.format(group), 'method': rng.choice(['index', 'getData', 'render'])}
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+
+        return {
+            '@message': 'wikia-php.caching-disabled',
+            '@source_host': self._get_host(rng, production),
+            '@fields': self._get_mediawiki_fields(rng, production),
+            '@context': dict(group),
+        }
+
+
+@schema
+class KilledQueriesSchema(LogSchema):
+    """ Queries killed by mysql-killer (KilledDatabaseQueriesSource) """
+    NAME = 'mysql-killer'
+    SOURCES = ['KilledDatabaseQueriesSource']
+    INDEX = 'logstash-other'
+
+    def get_group(self, group, rng):
+        return {
+            'query_class': '{}::run{}'.format(rng.choice(['WikiaSearch', 'SpecialWantedpages']), group),
+            'db': rng.choice(self.WIKIS).replace('.', ''),
+        }
+
+    def get_document(self, group, rng):
+        return {
+            '@source_host': 'db-s{}'.format(rng.randint(1, 10)),
+            'program': 'mysql-killer',
+            'query': "SELECT /* {} */ * FROM page WHERE page_id > {}".format(group['query_class'],
+                                                                            rng.randint(1, 1 << 24)),
+            'query_class': group['query_class'],
+            'query_client': '10.8.{}.{}'.format(rng.randint(0, 255), rng.randint(0, 255)),
+            'query_time': rng.randint(60, 600),
+            'db': group['db'],
+            'client': self._get_host(rng),
+        }
+
+
+@schema
+class PandoraSchema(LogSchema):
+    """ Pandora (JVM services) logs with rawMessage (PandoraErrorsSource) """
+    NAME = 'pandora'
+    SOURCES = ['PandoraErrorsSource']
+    INDEX = 'logstash-pandora'
+    WEIGHT = 5
+
+    MESSAGES = [
+        'Unable to get the user information for userId: {number}, Returning the default.',
+        'Exception purging https://services.fandom.com/user-attribute/user/{number}',
+        'error while sending: {{"args":{{"prevRevision":false,"id":{number}}}}}',
+        'Request {hash} timed out after {number} ms',
+    ]
+
+    def get_group(self, group, rng):
+        app_name = rng.choice(['discussion', 'user-attribute', 'content-review', 'helios'])
+
+        return {
+            'appname': app_name,
+            'logger_name': 'com.wikia.{}.Service{}'.format(app_name.replace('-', ''), group),
+            'message': rng.choice(self.MESSAGES),
+        }
+
+    def get_document(self, group, rng):
+        # INFO messages are filtered out by the query
+        level = rng.choice(['ERROR', 'WARN', 'WARN', 'INFO'])
+
+        return {
+            'kubernetes': {'labels': {'type': 'pandora', 'app': group['appname']}},
+            'rawLevel': level,
+            'rawMessage': group['message'].format(number=rng.randint(1, 1 << 24),
+                                                  hash='{:08x}'.format(rng.getrandbits(32))),
+            'appname': group['appname'],
+            'logger_name': group['logger_name'],
+            'thread_name': 'dw-{}'.format(rng.randint(1, 200)),
+            'stack_trace': 'java.lang.RuntimeException: failed\n\tat {}.call(Service.java:{})'.format(
+                group['logger_name'], rng.randint(10, 500)),
+        }
+
+
+@schema
+class MercurySchema(LogSchema):
+    """ Mobile wiki (Mercury) errors (MercurySource) """
+    NAME = 'mercury'
+    SOURCES = ['MercurySource']
+    INDEX = 'logstash-mobile-wiki'
+    WEIGHT = 2
+
+    def get_group(self, group, rng):
+        return {
+            'namespace': rng.choice(['main', 'api', 'server']),
+            'msg': 'Failed to fetch article data #{}'.format(group),
+            'severity': 'emergency' if group % 20 == 19 else 'error',
+        }
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+
+        return dict(group, **{
+            '@message': group['msg'],
+            '@source_host': '{}-mobile-wiki-{}'.format('s' if production else 'r', rng.randint(1, 20)),
+            '@fields': {'environment': 'prod' if production else 'dev'},
+            'error': 'Error: socket hang up',
+        })
+
+
+@schema
+class HeliosSchema(LogSchema):
+    """ Helios (authentication service) errors (HeliosSource) """
+    NAME = 'helios'
+    SOURCES = ['HeliosSource']
+    INDEX = 'logstash-helios'
+
+    def get_group(self, group, rng):
+        return {'message': 'could not authenticate user: token #{} expired'.format(group)}
+
+    def get_document(self, group, rng):
+        return {
+            '@message': group['message'],
+            '@fields': {'environment': 'prod' if self._is_production(rng) else 'dev'},
+            'level': 'error',
+        }
+
+
+@schema
+class VignetteSchema(LogSchema):
+    """ Vignette thumbnails verification errors (VignetteThumbVerificationSource) """
+    NAME = 'vignette'
+    SOURCES = ['VignetteThumbVerificationSource']
+    INDEX = 'logstash-other'
+
+    def get_group(self, group, rng):
+        return {'message': 'thumbnail size mismatch for mode #{}'.format(group)}
+
+    def get_document(self, group, rng):
+        width = rng.randint(100, 2000)
+
+        return {
+            '@message': group['message'],
+            '@source_host': 'vignette-s{}'.format(rng.randint(1, 10)),
+            'appname': 'vignette',
+            'logger_name': 'vignette.util.thumb-verifier',
+            'level': 'ERROR',
+            'thumb-map': 'thumbnail-down/width/{}'.format(width),
+            'estimated': '{}x{}'.format(width, width // 2),
+            'actual': '{}x{}'.format(width, width // 2 + 1),
+        }
+
+
+@schema
+class ChatSchema(LogSchema):
+    """ Chat server errors (ChatLogsSource) """
+    NAME = 'chat'
+    SOURCES = ['ChatLogsSource']
+    INDEX = 'logstash-other'
+
+    def get_group(self, group, rng):
+        return {'message': '{}: Unexpected token #{} in JSON'.format(
+            rng.choice(['uncaughtException', 'SyntaxError']), group)}
+
+    def get_document(self, group, rng):
+        production = self._is_production(rng)
+
+        return {
+            '@message': group['message'],
+            '@source_host': 'chat-s{}'.format(rng.randint(1, 4)),
+            '@fields': {'app_name': 'chat', 'environment': 'prod' if production else 'dev'},
+            'severity': 'error',
+        }
+
+
+@schema
+class BackendSchema(LogSchema):
+    """ Perl backend scripts errors (BackendSource) """
+    NAME = 'backend'
+    SOURCES = ['BackendSource']
+    INDEX = 'logstash-backend'
+    WEIGHT = 2
+
+    def get_group(self, group, rng):
+        return {'script': '/usr/wikia/backend/bin/task{}.pl'.format(group),
+                'table': rng.choice(['events', 'wikicities.city_list', 'stats'])}
+
+    def get_document(self, group, rng):
+        return {
+            '@message': 'LB::error',
+            '@source_host': self._get_host(rng, self._is_production(rng)),
+            '@fields': {'script_name': group['script']},
+            '@context': {'error': 'DBD::mysql::db do failed: Lock wait timeout exceeded [for Statement '
+                                  '"UPDATE {} SET value = {} WHERE id = {}"]'.format(
+                                      group['table'], rng.randint(1, 100), rng.randint(1, 1 << 20))},
+        }
+
+
+@schema
+class IndexDigestSchema(LogSchema):
+    """ index-digest reports (IndexDigestSource) """
+    NAME = 'index-digest'
+    SOURCES = ['IndexDigestSource']
+    INDEX = 'logstash-index-digest'
+
+    def get_group(self, group, rng):
+        return {
+            'meta': {'database_name': rng.choice(['wikicities', 'specials', 'dataware']), 'database_version': '5.7',
+                     'database_host': 'db-s{}'.format(rng.randint(1, 10)), 'version': 'index-digest v1.2.0'},
+            'type': rng.choice(['redundant_indices', 'not_used_tables', 'queries_not_using_index']),
+            'table': 'table_{}'.format(group),
+        }
+
+    def get_document(self, group, rng):
+        return {
+            'meta': group['meta'],
+            'report': {
+                'type': group['type'],
+                'table': group['table'],
+                'message': '"{}" table was last updated {} days ago'.format(group['table'], rng.randint(1, 365)),
+                'context': {'schema': 'CREATE TABLE `{}` (id int)'.format(group['table'])},
+            },
+        }
+
+
+@schema
+class ReportsPipeSchema(LogSchema):
+    """ Reports pushed to the jira-reporter-pipe index (ReportsPipeSource) """
+    NAME = 'pipe'
+    SOURCES = ['ReportsPipeSource']
+    INDEX = 'logstash-jira-reporter-pipe'
+
+    def get_group(self, group, rng):
+        script = '/extensions/wikia/Foo/maintenance/script{}.php'.format(group)
+
+        return {'report': {
+            'title': '{} script is not used'.format(script),
+            'message': '*{{{{{}}}}}* is not used by app nor referenced in Chef'.format(script),
+            'hash': 'not-used-maintenance-scripts-{}'.format(script),
+            'tags': ['not-used-maintenance-scripts'],
+        }}
+
+    def get_document(self, group, rng):
+        return dict(group)
+
+
+@schema
+class CelerySchema(LogSchema):
+    """ Celery workers tasks failures with an exception (CeleryLogsSource) """
+    NAME = 'celery'
+    SOURCES = ['CeleryLogsSource']
+    INDEX = 'logstash-celery'
+    WEIGHT = 2
+
+    def get_group(self, group, rng):
+        return {
+            'queue': rng.choice(['celery-mediawiki', 'celery-scribe', 'celery-discussions']),
+            'exception': rng.choice([
+                'RemoteExecuteError(u"Task #{} failed")'.format(group),
+                'RemoteExecuteError(u"A database error has occurred. Query: SELECT {}")'.format(group),
+            ]),
+        }
+
+    def get_document(self, group, rng):
+        return {
+            '@message': 'Task failed',
+            'event': 'Task failed',
+            'exception': group['exception'],
+            'task_id': '{:032x}'.format(rng.getrandbits(128)),
+            'datacenter': 'SJC',
+            'kubernetes': {'namespace_name': 'prod', 'container_name': group['queue']},
+        }
+
+
+@schema
+class KubernetesEventsSchema(LogSchema):
+    """ Kubernetes events, e.g. jobs that reached the backoff limit (KubernetesBackoffSource) """
+    NAME = 'k8s-events'
+    SOURCES = ['KubernetesBackoffSource']
+    INDEX = 'logstash-k8s-event-logger'
+
+    def get_group(self, group, rng):
+        return {'job': '{}-report-{}'.format(rng.choice(['sla', 'cleanup', 'dumps']), group)}
+
+    def get_document(self, group, rng):
+        # e.g. sla-report-comdev-1542331800
+        name = '{}-{}'.format(group['job'], rng.randint(1500000000, 1600000000))
+
+        return {
+            'eventMessage': 'Job has reached the specified backoff limit',
+            'involvedObject': {'kind': 'Job', 'name': name},
+            'kubernetes': {'namespace_name': 'prod'},
+        }
+
+
+@schema
+class UCPErrorsSchema(LogSchema):
+    """ Unified Community Platform errors with stack_trace (UCPErrorsSource) """
+    NAME = 'ucp'
+    SOURCES = ['UCPErrorsSource']
+    INDEX = 'logstash-mediawiki-unified-platform'
+    WEIGHT = 10
+
+    def get_group(self, group, rng):
+        return {
+            'type': rng.choice(['error', 'error', 'fatal', 'exception']),
+            'message': 'PHP Warning: Undefined index: {{name}} in /srv/mediawiki/includes/Module{}.php '
+                       'on line {}'.format(group, rng.randint(10, 2000)),
+        }
+
+    def get_document(self, group, rng):
+        return {
+            '@message': group['message'].format(name='key{}'.format(rng.randint(1, 50))),
+            '@fields': {'http_url_domain': '{}.fandom.com'.format(rng.choice(self.WIKIS)),
+                        'http_url_path': '/wiki/Page_{}'.format(rng.randint(1, 100000))},
+            'event': {'type': group['type']},
+            'datacenter': 'SJC' if self._is_production(rng) else 'RES',
+            'kubernetes': {'labels': {'app': 'mediawiki-prod-ucp'}},
+            'stack_trace': '#0 /srv/mediawiki/includes/Foo.php({}): bar()\n#1 {{main}}'.format(rng.randint(1, 500)),
+        }
+
+
+class ZipfSampler(object):
+    """
+    Draws group indices from [0, groups) with P(k) proportional to 1 / (k + 1) ^ exponent
+    """
+    def __init__(self, groups, exponent, rng):
+        """
+        :type groups int
+        :type exponent float
+        :type rng random.Random
+        """
+        self._rng = rng
+        self._population = range(groups)
+        self._cum_weights = list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, groups + 1)))
+
+    def sample(self, count):
+        """
+        :type count int
+        :rtype: list[int]
+        """
+        return self._rng.choices(self._population, cum_weights=self._cum_weights, k=count)
+
+
+class LogGenerator(object):
+    """
+    Generates documents of given schemas spread over a time window
+
+    generator = LogGenerator(entries=100000, groups=200, zipf=1.1, seed=42)
+    generator.write('corpora/')
+    """
+    # written next to the indices files
+    MANIFEST = 'generator.json'
+
+    # documents are drawn in batches of this size
+    BATCH_SIZE = 10000
+
+    def __init__(self, schemas=None, entries=10000, groups=100, zipf=1.1, seed=0, window=3600, now=None):
+        """
+        :type schemas list[type]|None
+        :type entries int
+        :type groups int
+        :type zipf float
+        :type seed int
+        :type window int
+        :type now float|None
+        :arg schemas: LogSchema classes (all of them by default)
+        :arg groups: how many distinct groups each schema has
+        :arg zipf: exponent of the Zipf distribution of groups (the higher, the more skewed)
+        :arg window: [sec] documents are spread over that many seconds before now
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._schemas = [schema_class() for schema_class in (schemas or SCHEMAS)]
+        self._entries = entries
+        self._groups = groups
+        self._zipf = zipf
+        self._seed = seed
+
+        now = int(now or time.time())
+        self._time_range = (now - window, now)
+
+    def get_time_range(self):
+        """
+        :rtype: tuple[int, int]
+        """
+        return self._time_range
+
+    def get_indices(self):
+        """
+        :rtype: list[str]
+        """
+        return sorted(set(schema_item.INDEX for schema_item in self._schemas))
+
+    def _get_group(self, schema_item, groups, group):
+        """
+        Return the shared parts of a given group (generated on the first use, the same for a given seed)
+
+        :type schema_item LogSchema
+        :type groups dict[int, dict]
+        :type group int
+        :rtype: dict
+        """
+        if group not in groups:
+            rng = random.Random('{}-{}-{}'.format(self._seed, schema_item.NAME, group))
+            groups[group] = schema_item.get_group(group, rng)
+
+        return groups[group]
+
+    def get_documents(self):
+        """
+        Yield (index, document) tuples
+
+        :rtype: collections.Iterable[tuple[str, dict]]
+        """
+        rng = random.Random(self._seed)
+        samplers = [ZipfSampler(self._groups, self._zipf, rng) for _ in self._schemas]
+        groups = [dict() for _ in self._schemas]  # shared parts of groups for each schema
+
+        cum_weights = list(itertools.accumulate(schema_item.WEIGHT for schema_item in self._schemas))
+        (since, to) = self._time_range
+
+        for offset in range(0, self._entries, self.BATCH_SIZE):
+            count = min(self.BATCH_SIZE, self._entries - offset)
+            schemas = rng.choices(range(len(self._schemas)), cum_weights=cum_weights, k=count)
+
+            # draw groups for all documents of a given schema in the batch at once
+            drawn = {idx: iter(samplers[idx].sample(schemas.count(idx))) for idx in set(schemas)}
+
+            for idx in schemas:
+                schema_item = self._schemas[idx]
+                group = self._get_group(schema_item, groups[idx], next(drawn[idx]))
+
+                document = schema_item.get_document(group, rng)
+
+                timestamp = rng.uniform(since, to)
+                document['@timestamp'] = '{}.{:03d}Z'.format(
+                    time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp)), int(timestamp % 1 * 1000))
+
+                yield schema_item.INDEX, document
+
+    def write(self, data_dir, compress=True):
+        """
+        Write documents to NDJSON files (one for each index) and the manifest, return the number of them per index
+
+        :type data_dir str
+        :type compress bool
+        :rtype: dict[str, int]
+        """
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+
+        extension = '.ndjson.gz' if compress else '.ndjson'
+        handles = dict()
+        written = dict()
+        started = time.time()
+
+        try:
+            for index in self.get_indices():
+                path = os.path.join(data_dir, index + extension)
+                # favour speed over the size for large corpora
+                handles[index] = gzip.open(path, 'wt', encoding='utf-8', compresslevel=1) if compress \
+                    else open(path, 'wt', encoding='utf-8')
+                written[index] = 0
+
+            for (idx, (index, document)) in enumerate(self.get_documents(), start=1):
+                handles[index].write(json.dumps(document) + '\n')
+                written[index] += 1
+
+                if idx % 1000000 == 0:
+                    self._logger.info('{} documents written ({:.1f} per sec)'.format(
+                        idx, idx / (time.time() - started)))
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        with open(os.path.join(data_dir, self.MANIFEST), 'wt') as manifest:
+            json.dump({
+                'entries': self._entries,
+                'groups': self._groups,
+                'zipf': self._zipf,
+                'seed': self._seed,
+                'schemas': [schema_item.NAME for schema_item in self._schemas],
+                'time_range': self._time_range,
+                'indices': written,
+            }, manifest, indent=True)
+
+        self._logger.info('{} documents written to {} in {:.2f} sec'.format(
+            self._entries, data_dir, time.time() - started))
+
+        return written
+
+
+def get_schemas(names):
+    """
+    Return schema classes by their names
+
+    :type names list[str]
+    :rtype: list[type]
+    """
+    schemas = {schema_class.NAME: schema_class for schema_class in SCHEMAS}
+    unknown = set(names) - set(schemas)
+
+    if unknown:
+        raise ValueError('Unknown schemas: {} (available: {})'.format(
+            ', '.join(sorted(unknown)), ', '.join(sorted(schemas))))
+
+    return [schemas[name] for name in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic log corpora for the local elasticsearch')
+    parser.add_argument('--data-dir', required=True, help='directory to write NDJSON files to')
+    parser.add_argument('--entries', type=int, default=10000, help='how many documents to generate')
+    parser.add_argument('--groups', type=int, default=100, help='how many distinct groups each schema has')
+    parser.add_argument('--zipf', type=float, default=1.1, help='exponent of groups Zipf distribution')
+    parser.add_argument('--schemas', default=None, help='comma separated list of schemas (all by default): {}'.format(
+        ', '.join(schema_class.NAME for schema_class in SCHEMAS)))
+    parser.add_argument('--window', type=int, default=3600, help='[sec] spread documents over that period')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-compress', action='store_true', help='write plain NDJSON files')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(name)-35s %(levelname)-8s %(message)s',
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+    generator = LogGenerator(
+        schemas=get_schemas(args.schemas.split(',')) if args.schemas else None,
+        entries=args.entries,
+        groups=args.groups,
+        zipf=args.zipf,
+        seed=args.seed,
+        window=args.window
+    )
+
+    for (index, count) in sorted(generator.write(args.data_dir, compress=not args.no_compress).items()):
+        logging.info('{}: {} documents'.format(index, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,11 @@ Set of helper functions
 """
 import re
 
+from functools import lru_cache
+
+# fields used by is_from_production_host() when given the entire entry
+PRODUCTION_HOST_FIELDS = ['@fields.environment', 'kubernetes.namespace_name']
+
 
 def is_from_production_host(entry):
     """
@@ -22,35 +27,52 @@ def is_from_production_host(entry):
         entry.get('kubernetes', {}).get('namespace_name') == 'prod'
 
 
+# substitutions applied by generalize_sql(), in this order
+SQL_SUBSTITUTIONS = [
+    # MW comments (e.g. /* CategoryDataService::getMostVisited N.N.N.N */)
+    (re.compile(r'\s?/\*.+\*/'), ''),
+    # escaped backslashes and quotes
+    (re.compile(r"\\\\"), ''),
+    (re.compile(r"\\'"), ''),
+    (re.compile(r'\\"'), ''),
+    # quoted strings => X
+    (re.compile(r"'[^\']+'"), 'X'),
+    (re.compile(r'"[^\"]+"'), 'X'),
+    # All newlines, tabs, etc replaced by single space
+    (re.compile(r'\s+'), ' '),
+    # All numbers => N
+    (re.compile(r'-?[0-9]+'), 'N'),
+    # WHERE foo IN ('880987','882618','708228','522330')
+    (re.compile(r' IN\s*\([^)]+\)'), ' IN (XYZ)'),
+]
+
+# how many generalized queries to keep (the same queries are logged over and over again)
+GENERALIZE_SQL_CACHE_SIZE = 10000
+
+
+@lru_cache(maxsize=GENERALIZE_SQL_CACHE_SIZE)
+def _generalize_sql(sql):
+    """
+    :type sql str
+    :rtype: str
+    """
+    for pattern, replacement in SQL_SUBSTITUTIONS:
+        sql = pattern.sub(replacement, sql)
+
+    return sql.strip()
+
+
 def generalize_sql(sql):
     """
     Removes most variables from an SQL query and replaces them with X or N for numbers.
 
-    Based on Mediawiki's DatabaseBase::generalizeSQL
+    Based on Mediawiki's DatabaseBase::generalizeSQL. Patterns are compiled once
+    and the results are cached.
     """
     if sql is None:
         return None
 
-    # MW comments
-    # e.g. /* CategoryDataService::getMostVisited N.N.N.N */
-    sql = re.sub(r'\s?/\*.+\*/', '', sql)
-
-    sql = re.sub(r"\\\\", '', sql)
-    sql = re.sub(r"\\'", '', sql)
-    sql = re.sub(r'\\"', '', sql)
-    sql = re.sub(r"'[^\']+'", 'X', sql)
-    sql = re.sub(r'"[^\"]+"', 'X', sql)
-
-    # All newlines, tabs, etc replaced by single space
-    sql = re.sub(r'\s+', ' ', sql)
-
-    # All numbers => N
-    sql = re.sub(r'-?[0-9]+', 'N', sql)
-
-    # WHERE foo IN ('880987','882618','708228','522330')
-    sql = re.sub(r' IN\s*\([^)]+\)', ' IN (XYZ)', sql)
-
-    return sql.strip()
+    return _generalize_sql(sql)
 
 
 def get_method_from_query(sql):
@@ -0,0 +1,201 @@
+"""
+Rate limiting of HTTP requests sent to Jira
+"""
+import email.utils
+import logging
+import random
+import threading
+import time
+
+from jira.client import JIRA
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket(object):
+    """
+    Allows up to burst calls at once and rate calls per second on average
+
+    Can be shared between threads. All callers wait when the bucket is paused (e.g. when the server asks us to).
+    """
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        """
+        :type rate float
+        :type burst int
+        :type clock callable
+        :type sleep callable
+        :arg rate: how many tokens are added each second
+        :arg burst: how many tokens can be kept in the bucket
+        """
+        self._rate = float(rate)
+        self._burst = burst
+        self._clock = clock
+        self._sleep = sleep
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0
+
+    def acquire(self):
+        """
+        Take a single token from the bucket, wait for it when the bucket is empty (or paused)
+
+        :rtype: float
+        :return: how long (in seconds) the caller had to wait
+        """
+        waited = 0
+
+        while True:
+            with self._lock:
+                now = self._clock()
+
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+
+                delay = self._paused_until - now
+
+                if delay <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+
+                    delay = (1 - self._tokens) / self._rate
+
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """
+        Do not give any tokens for a given number of seconds
+
+        :type seconds float
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    Transport adapter for requests that takes a token from the bucket before sending each request
+
+    Requests rejected with "429 Too Many Requests" (or "503 Service Unavailable" with Retry-After header)
+    are sent again after the time given by Retry-After header or a jittered exponential backoff.
+
+    @see https://developer.atlassian.com/cloud/jira/platform/rate-limiting/
+    """
+    RETRY_STATUS_CODES = [429, 503]
+
+    def __init__(self, bucket, retries=5, backoff=1.0, max_backoff=60, **kwargs):
+        """
+        :type bucket TokenBucket
+        :type retries int
+        :type backoff float
+        :type max_backoff float
+        :arg retries: how many times a rejected request can be sent again
+        :arg backoff: the initial backoff (in seconds), doubled with every retry
+        :arg max_backoff: the backoff limit (in seconds)
+        :arg kwargs: passed to requests.adapters.HTTPAdapter
+        """
+        super(RateLimitedAdapter, self).__init__(**kwargs)
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._bucket = bucket
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+
+    def send(self, request, **kwargs):
+        """
+        :type request requests.PreparedRequest
+        :rtype: requests.Response
+        """
+        attempt = 0
+
+        while True:
+            self._bucket.acquire()
+            response = super(RateLimitedAdapter, self).send(request, **kwargs)
+
+            if not self._should_retry(response) or attempt >= self._retries:
+                return response
+
+            attempt += 1
+            delay = self._get_delay(response, attempt)
+
+            self._logger.warning('Got HTTP {} for {} {}, retrying in {:.1f} sec ({}/{})'.format(
+                response.status_code, request.method, request.url, delay, attempt, self._retries))
+
+            # release the connection and hold back other requests as well
+            response.close()
+            self._bucket.pause(delay)
+
+    def _should_retry(self, response):
+        """
+        :type response requests.Response
+        :rtype: bool
+        """
+        if response.status_code == 429:
+            return True
+
+        return response.status_code in self.RETRY_STATUS_CODES and 'Retry-After' in response.headers
+
+    def _get_delay(self, response, attempt):
+        """
+        Return how long to wait before sending the request again
+
+        :type response requests.Response
+        :type attempt int
+        :rtype: float
+        """
+        retry_after = self.parse_retry_after(response.headers.get('Retry-After'))
+
+        # spread retries of concurrent requests a bit
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self._backoff)
+
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self._max_backoff, self._backoff * 2 ** attempt))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        Return the number of seconds from Retry-After header value (either seconds or HTTP date)
+
+        :type value str|None
+        :rtype: float|None
+        """
+        if value is None:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class RateLimitedJIRA(JIRA):
+    """
+    Jira API client that sends all requests (searches, updates, transitions, comments, ...) via RateLimitedAdapter
+
+    ResilientSession retries are disabled (see max_retries), as the adapter already retries
+    rejected requests. Otherwise each retry of the session would be retried by the adapter as well.
+    """
+    def __init__(self, adapter, **kwargs):
+        """
+        :type adapter RateLimitedAdapter
+        :arg kwargs: passed to jira.client.JIRA
+        """
+        self._adapter = adapter
+        super(RateLimitedJIRA, self).__init__(max_retries=0, **kwargs)
+
+    def _create_http_basic_session(self, username, password, timeout=None):
+        """
+        jira.client.JIRA does not accept a session to be used, mount the adapter when it creates one
+        """
+        super(RateLimitedJIRA, self)._create_http_basic_session(username, password, timeout=timeout)
+
+        self._session.mount('http://', self._adapter)
+        self._session.mount('https://', self._adapter)
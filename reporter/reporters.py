@@ -4,17 +4,27 @@ Contains handling of different services that reports can be sent to
 """
 import json
 import logging
+import threading
 import time
 import datetime
 
+from concurrent.futures import ThreadPoolExecutor
+
 from dateutil.parser import parse
 from dateutil.tz import tzutc
 
-from jira.client import JIRA
+from urllib3.util.retry import Retry
 
-from .config import JIRA_CONFIG
+from .ratelimiter import RateLimitedAdapter, RateLimitedJIRA, TokenBucket
+from .tickets import IndexedTicket, TicketIndex
 from reporter.classifier import Classifier
 
+try:
+    from .config import JIRA_CONFIG
+except ImportError:
+    # config.py is not set up (e.g. when running unit tests), pass the config to Jira constructor then
+    JIRA_CONFIG = None
+
 
 class Jira(object):
     """
@@ -23,59 +33,353 @@ class Jira(object):
     @see http://jira-python.readthedocs.org/en/latest/
     """
 
-    JQL = "description ~ '{hash_value}' AND project = 'ER'"
+    JQL = "project = 'ER' AND ({conditions})"
+    JQL_UNIQUE_ID = "{field} ~ '{unique_id}'"
+
+    # tickets reported before the unique ID field was introduced have the hash in their description only
+    # @see bin/backfill_unique_ids.py
+    JQL_LEGACY_UNIQUE_ID = "description ~ '{unique_id}'"
+
+    # look up such tickets when no ticket has the unique ID set, can be changed via JIRA_CONFIG['legacy_lookup']
+    # (turn it off once bin/backfill_unique_ids.py was run, every new unique ID needs a slow text search otherwise)
+    LEGACY_LOOKUP = True
+
+    # ticket fields that are needed to handle duplicates (see ticket_exists)
+    LOOKUP_FIELDS = ['assignee', 'status', 'resolution', 'resolutiondate', 'issuetype']
+
+    # tickets that are kept in the local index (see sync_index)
+    JQL_INDEX = "project = 'ER' AND {field} is not EMPTY"
+    JQL_UPDATED_SINCE = " AND updated >= '-{minutes}m'"
+
+    # sync tickets updated a bit before the last sync as well
+    INDEX_SYNC_OVERLAP_MINUTES = 10
+
+    # how many unique IDs are looked up with a single JQL query (see find_tickets)
+    LOOKUP_BATCH_SIZE = 50
 
     REOPEN_AFTER_DAYS = 14  # reopen still valid tickets when they were closed X days ago
     REOPEN_TRANSITION_COMMENT = '[~{assignee}], I reopened this ticket - logs say it is still valid'
+    TRANSITION_OPEN = 'Open'
+
+    # budget of HTTP requests sent to Jira, can be changed via JIRA_CONFIG['rate_limit']
+    # @see reporter.ratelimiter.TokenBucket and RateLimitedAdapter
+    RATE_LIMIT = {
+        'rate': 5,       # requests per second on average
+        'burst': 10,     # requests that can be sent at once
+        'retries': 5,    # how many times a request rejected with HTTP 429 is sent again
+        'backoff': 1.0,  # [sec] the initial backoff for retries without Retry-After header
+    }
+
+    # how many times a request that failed to connect is sent again
+    CONNECT_RETRIES = 3
+
+    # how many reports are sent at once by report_many(), can be changed via JIRA_CONFIG['workers']
+    REPORT_WORKERS = 4
+
+    # outcomes of reporting (see report_many)
+    OUTCOME_REPORTED = 'reported'
+    OUTCOME_DUPLICATE = 'duplicate'
+    OUTCOME_SKIPPED = 'skipped'
+    OUTCOME_FAILED = 'failed'
 
     STATUS_CLOSED = "Closed"
     RESOLUTION_WONT_FIX = "Won't Fix"
     RESOLUTION_DUPLICATE = "Duplicate"
 
-    def __init__(self):
+    def __init__(self, index_path=None, config=None):
+        """
+        :type index_path str|None
+        :type config dict|None
+        :arg index_path: SQLite file with the local index of reported tickets (see sync_index)
+        :arg config: JIRA_CONFIG from config.py is used by default
+        """
         self._logger = logging.getLogger('Jira')
-        self._jira = JIRA(
-            server=JIRA_CONFIG['url'],
-            basic_auth=(JIRA_CONFIG['user'], JIRA_CONFIG['password'])
+        self._config = config or JIRA_CONFIG
+
+        # all API calls (searches, updates, transitions, comments, ...) are rate limited
+        rate_limit = dict(self.RATE_LIMIT, **self._config.get('rate_limit', {}))
+
+        self._jira = RateLimitedJIRA(
+            adapter=RateLimitedAdapter(
+                bucket=TokenBucket(rate=rate_limit['rate'], burst=rate_limit['burst']),
+                retries=rate_limit['retries'],
+                backoff=rate_limit['backoff'],
+                max_retries=Retry(total=self.CONNECT_RETRIES, read=False, redirect=False)
+            ),
+            server=self._config['url'],
+            basic_auth=(self._config['user'], self._config['password'])
         )
 
-        self._fields = JIRA_CONFIG.get('fields')
+        self._fields = self._config.get('fields')
         self._last_seen_field = self._fields['custom']['last_seen']
+        self._unique_id_field = self._fields['custom']['unique_id']
 
-        self._project = JIRA_CONFIG.get('project')
+        self._project = self._config.get('project')
         self._server = self._jira.client_info()
 
         self._classifier = Classifier()
 
+        # (project, issue type, status) -> transition name -> ID (see _get_transition_id)
+        self._transitions = dict()
+
+        # ticket key -> "ER Date" set during this run (see _should_update_last_seen)
+        self._last_seen_updates = dict()
+        self._lock = threading.Lock()
+
+        # unique IDs passed to report_many() during this run
+        self._reported_unique_ids = set()
+
         self._logger.info("Using {} project on <{}>".format(self._project, self._server))
 
+        self._index = None
+
+        if index_path:
+            try:
+                self._index = TicketIndex(index_path)
+                self.sync_index()
+            except Exception:
+                # do not use an outdated index, ask Jira instead
+                self._logger.error('Failed to sync the tickets index', exc_info=True)
+                self._index = None
+
     def get_api_client(self):
         return self._jira
 
     def _get_issue_url(self, issue_id):
         return '{server}/browse/{issue_id}'.format(server=self._server, issue_id=issue_id)
 
-    def ticket_exists(self, unique_id):
+    def _get_jql_field(self, field):
         """
-        Checks if ticket with a given unique_id exists
+        :type field str
+        :rtype: str
+        """
+        # e.g. customfield_13200 -> cf[13200]
+        return 'cf[{}]'.format(field.replace('customfield_', ''))
 
-        :type unique_id str
+    def _search_tickets(self, unique_ids):
+        """
+        Run a single (paginated) JQL query for tickets with given unique IDs
+
+        Unique IDs that no ticket was found for are then looked up in tickets descriptions
+        (tickets that do not have the unique ID field set yet, see JQL_LEGACY_UNIQUE_ID and LEGACY_LOOKUP).
+
+        :type unique_ids list[str]
+        :rtype: dict[str, list[jira.resources.Issue]]
+        """
+        field = self._get_jql_field(self._unique_id_field)
+
+        tickets = self._jira.search_issues(
+            self.JQL.format(conditions=' OR '.join(
+                self.JQL_UNIQUE_ID.format(field=field, unique_id=unique_id) for unique_id in unique_ids)),
+            fields=self.LOOKUP_FIELDS + [self._unique_id_field, self._last_seen_field],
+            maxResults=False
+        )
+
+        # text search can match more than we asked for, make sure that unique IDs are the same
+        found = {
+            unique_id: [
+                ticket for ticket in tickets
+                if getattr(ticket.fields, self._unique_id_field, None) == unique_id
+            ]
+            for unique_id in unique_ids
+        }
+
+        not_found = [unique_id for unique_id in unique_ids if not found[unique_id]]
+
+        if not_found and self._config.get('legacy_lookup', self.LEGACY_LOOKUP):
+            found.update(self._search_legacy_tickets(not_found))
+
+        return found
+
+    def _search_legacy_tickets(self, unique_ids):
+        """
+        Run a single (paginated) JQL query for tickets with given unique IDs in their descriptions
+
+        :type unique_ids list[str]
+        :rtype: dict[str, list[jira.resources.Issue]]
+        """
+        tickets = self._jira.search_issues(
+            self.JQL.format(conditions=' OR '.join(
+                self.JQL_LEGACY_UNIQUE_ID.format(unique_id=unique_id) for unique_id in unique_ids)),
+            fields=self.LOOKUP_FIELDS + ['description', self._unique_id_field, self._last_seen_field],
+            maxResults=False
+        )
+
+        found = {
+            unique_id: [
+                ticket for ticket in tickets
+                if unique_id in (ticket.fields.description or '') and
+                not getattr(ticket.fields, self._unique_id_field, None)
+            ]
+            for unique_id in unique_ids
+        }
+
+        legacy = sum(len(tickets) for tickets in found.values())
+
+        if legacy:
+            self._logger.warning('Found {} tickets without the unique ID set, run bin/backfill_unique_ids.py'.format(
+                legacy))
+
+        return found
+
+    def _get_indexed_ticket(self, ticket):
+        """
+        :type ticket jira.resources.Issue
+        :rtype: IndexedTicket
+        """
+        fields = ticket.fields
+
+        return IndexedTicket(
+            key=ticket.key,
+            unique_id=getattr(fields, self._unique_id_field),
+            status=str(fields.status),
+            resolution=str(fields.resolution) if fields.resolution else None,
+            resolution_date=ticket.raw['fields'].get('resolutiondate'),
+            last_seen=getattr(fields, self._last_seen_field, None)
+        )
+
+    def sync_index(self):
         """
-        self._logger.info('Checking {} unique ID...'.format(unique_id))
+        Update the local index with tickets changed since the last sync (all tickets are fetched on the first one)
+        """
+        last_sync = self._index.get_last_sync()
+        started = int(time.time())
+
+        jql = self.JQL_INDEX.format(field=self._get_jql_field(self._unique_id_field))
+
+        if last_sync is not None:
+            # relative dates do not depend on the timezone set for Jira user
+            jql += self.JQL_UPDATED_SINCE.format(
+                minutes=(started - last_sync) // 60 + 1 + self.INDEX_SYNC_OVERLAP_MINUTES)
+
+        self._logger.info('Syncing tickets index ({})...'.format(jql))
+
         tickets = self._jira.search_issues(
-            self.JQL.format(hash_value=unique_id)
+            jql,
+            fields=self.LOOKUP_FIELDS + [self._unique_id_field, self._last_seen_field],
+            maxResults=False
         )
 
+        self._index.update([self._get_indexed_ticket(ticket) for ticket in tickets], synced_at=started)
+
+    def _needs_update(self, ticket):
+        """
+        Checks if an indexed ticket needs to be updated in Jira when reported again (see ticket_exists)
+
+        :type ticket IndexedTicket
+        :rtype: bool
+        """
+        # SUS-1168: tickets closed as "Won't Fix" or "Duplicate" are left as they are
+        if ticket.resolution in [self.RESOLUTION_WONT_FIX, self.RESOLUTION_DUPLICATE]:
+            return False
+
+        # "ER Date" is outdated or the ticket is going to be reopened
+        return ticket.last_seen != self.get_today_timestamp() or (
+            ticket.status == self.STATUS_CLOSED and
+            self._is_older_than(ticket.resolution_date, days=self.REOPEN_AFTER_DAYS)
+        )
+
+    def _find_indexed_tickets(self, unique_ids):
+        """
+        Look up tickets in the local index
+
+        Only tickets that need to be updated are fetched from Jira (with a single JQL query per batch).
+
+        :type unique_ids list[str]
+        :rtype: dict[str, list[jira.resources.Issue|IndexedTicket]]
+        """
+        indexed = self._index.get_tickets(unique_ids)
+        keys = [ticket.key for tickets in indexed.values() for ticket in tickets if self._needs_update(ticket)]
+
+        fetched = dict()
+
+        for offset in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+            batch = keys[offset:offset + self.LOOKUP_BATCH_SIZE]
+
+            try:
+                for ticket in self._jira.search_issues(
+                        'key in ({})'.format(', '.join(batch)),
+                        fields=self.LOOKUP_FIELDS + [self._unique_id_field, self._last_seen_field],
+                        maxResults=False,
+                        validate_query=False):  # do not fail on tickets that were removed since the last sync
+                    fetched[ticket.key] = ticket
+            except Exception:
+                # these unique IDs will be checked one by one when reported
+                self._logger.error('Failed to fetch indexed tickets', exc_info=True)
+
+        found = dict()
+
+        for unique_id, tickets in indexed.items():
+            if all(ticket.key in fetched or not self._needs_update(ticket) for ticket in tickets):
+                found[unique_id] = [fetched.get(ticket.key, ticket) for ticket in tickets]
+
+        self._logger.info('Found {} unique IDs in the tickets index ({} tickets fetched from Jira)'.format(
+            len(found), len(fetched)))
+
+        return found
+
+    def find_tickets(self, unique_ids):
+        """
+        Look up tickets for many unique IDs at once
+
+        Unique IDs are checked in batches, with a single JQL query per batch.
+        Returns a dict with a list of tickets for each unique ID that was successfully checked.
+
+        :type unique_ids list[str]
+        :rtype: dict[str, list[jira.resources.Issue]]
+        """
+        unique_ids = sorted(set(unique_ids))
+        found = dict()
+
+        # ask Jira only about unique IDs that are not in the local index
+        if self._index:
+            found = self._find_indexed_tickets(unique_ids)
+            unique_ids = [unique_id for unique_id in unique_ids if unique_id not in found]
+
+        for offset in range(0, len(unique_ids), self.LOOKUP_BATCH_SIZE):
+            batch = unique_ids[offset:offset + self.LOOKUP_BATCH_SIZE]
+            self._logger.info('Checking {} unique IDs...'.format(len(batch)))
+
+            try:
+                found.update(self._search_tickets(batch))
+            except Exception:
+                # these unique IDs will be checked one by one when reported
+                self._logger.error('Failed to look up tickets', exc_info=True)
+
+        self._logger.info('Found tickets for {} of {} unique IDs'.format(
+            len([tickets for tickets in found.values() if tickets]), len(found)))
+
+        return found
+
+    def ticket_exists(self, unique_id, tickets=None):
+        """
+        Checks if ticket with a given unique_id exists
+
+        :type unique_id str
+        :type tickets list[jira.resources.Issue|IndexedTicket]|None
+        :arg tickets: tickets already found for this unique_id (see find_tickets), Jira is queried when not set
+        """
+        if tickets is None:
+            self._logger.info('Checking {} unique ID...'.format(unique_id))
+            tickets = self._search_tickets([unique_id])[unique_id]
+
         if len(tickets) > 0:
             self._logger.info('Found {} ticket(s)'.format(len(tickets)))
 
             for ticket in tickets:
+                # the local index says that there's nothing to update
+                if isinstance(ticket, IndexedTicket):
+                    self._logger.info('<{url}> ({status}) - up to date'.format(
+                        url=self._get_issue_url(ticket.key), status=ticket.resolution or ticket.status))
+                    continue
+
                 fields = ticket.fields
 
                 self._logger.info('<{url}> {assignee} ({status})'.format(
                     id=ticket.key,
                     url=ticket.permalink(),
-                    assignee=fields.assignee.displayName.encode('utf8') if fields.assignee else None,  # e.g. Jan Ęąwski
+                    # e.g. Jan Ęąwski
+                    assignee=fields.assignee.displayName.encode('utf8') if fields.assignee else None,
                     status=fields.resolution or fields.status  # Done / In Progress / Won't Fix / ...
                 ))
 
@@ -83,11 +387,15 @@ class Jira(object):
                 try:
                     # SUS-1168: do not update ER date for tickets closed as "Won't Fix" or "Duplicate"
                     if str(fields.resolution) != self.RESOLUTION_WONT_FIX and \
-                            str(fields.resolution) != self.RESOLUTION_DUPLICATE:
+                            str(fields.resolution) != self.RESOLUTION_DUPLICATE and \
+                            self._should_update_last_seen(ticket):
                         self._logger.info('Updating ER date')
                         ticket.update(fields={
                             self._last_seen_field: self.get_today_timestamp()
                         })
+
+                        if self._index:
+                            self._index.set_last_seen(ticket.key, self.get_today_timestamp())
                 except Exception:
                     self._logger.error('Failed to update "ER Date" field ({})'.
                                        format(self._last_seen_field), exc_info=True)
@@ -100,32 +408,83 @@ class Jira(object):
                     if self._ticket_is_older_than(ticket, days=self.REOPEN_AFTER_DAYS):
                         self._logger.info('Going to reopen {id} - it is still valid'.format(id=ticket.key))
 
-                        # get transition ID for Open status, it varies between projects
-                        transitions = {}
+                        self._reopen_ticket(ticket)
 
-                        for transition in self.get_api_client().transitions(issue=ticket):
-                            transitions[transition['name']] = transition['id']
+            return True
+        else:
+            return False
 
-                        # reopen and comment the ticket
-                        try:
-                            self.get_api_client().transition_issue(
-                                issue=ticket,
-                                transitionId=transitions['Open']
-                            )
+    def _should_update_last_seen(self, ticket):
+        """
+        Checks if "ER Date" of a ticket is not set to today yet
 
-                            self.get_api_client().add_comment(
-                                issue=ticket,
-                                body=self.REOPEN_TRANSITION_COMMENT.format(
-                                    assignee=fields.assignee.name if fields.assignee else 'Unassigned'
-                                )
-                            )
-                        except Exception:
-                            self._logger.error('Failed to reopen {}'.format(ticket), exc_info=True)
+        Both the value returned by Jira and the updates made during this run are checked,
+        so that a ticket is updated once a day at most.
 
-            return True
-        else:
+        :type ticket jira.resources.Issue
+        :rtype: bool
+        """
+        today = self.get_today_timestamp()
+
+        if getattr(ticket.fields, self._last_seen_field, None) == today:
+            self._logger.info('ER date is already set to today')
             return False
 
+        with self._lock:
+            if self._last_seen_updates.get(ticket.key) == today:
+                self._logger.info('ER date was already updated during this run')
+                return False
+
+            self._last_seen_updates[ticket.key] = today
+
+        return True
+
+    def _get_transition_id(self, ticket, name):
+        """
+        Get ID of a given transition for a ticket
+
+        Transitions vary between projects and workflows, they're fetched once for each
+        project, issue type and status and then kept for the lifetime of the process.
+
+        :type ticket jira.resources.Issue
+        :type name str
+        :rtype: str|None
+        """
+        fields = ticket.fields
+        key = (ticket.key.split('-')[0], str(getattr(fields, 'issuetype', None)), str(fields.status))
+
+        if key not in self._transitions:
+            self._transitions[key] = {
+                transition['name']: transition['id']
+                for transition in self.get_api_client().transitions(issue=ticket)
+            }
+
+        return self._transitions[key].get(name)
+
+    def _reopen_ticket(self, ticket):
+        """
+        Reopen a ticket and comment it (with a single request)
+
+        :type ticket jira.resources.Issue
+        """
+        fields = ticket.fields
+
+        try:
+            transition_id = self._get_transition_id(ticket, self.TRANSITION_OPEN)
+
+            if transition_id is None:
+                raise ValueError('"{}" transition is not available for {}'.format(self.TRANSITION_OPEN, ticket))
+
+            self.get_api_client().transition_issue(
+                issue=ticket,
+                transition=transition_id,
+                comment=self.REOPEN_TRANSITION_COMMENT.format(
+                    assignee=fields.assignee.name if fields.assignee else 'Unassigned'
+                )
+            )
+        except Exception:
+            self._logger.error('Failed to reopen {}'.format(ticket), exc_info=True)
+
     @staticmethod
     def get_today_timestamp():
         """
@@ -141,38 +500,140 @@ class Jira(object):
         :type days int
         :rtype: bool
         """
+        return self._is_older_than(ticket.raw['fields'].get('resolutiondate'), days)
+
+    def _is_older_than(self, resolution_date, days):
+        """
+        :type resolution_date str|None
+        :type days int
+        :rtype: bool
+        """
         resolution_threshold = datetime.datetime.now(tz=tzutc()) - datetime.timedelta(days=days)
         try:
-            resolution_date = parse(ticket.raw['fields'].get('resolutiondate'))
+            resolution_date = parse(resolution_date)
         except:
-            self._logger.error('Failed to get the resolution date for {}'.format(ticket), exc_info=True)
+            self._logger.error('Failed to parse the resolution date ({})'.format(resolution_date), exc_info=True)
             resolution_date = None
 
         return resolution_date is not None and resolution_date < resolution_threshold
 
-    def report(self, report):
+    def report(self, report, tickets=None):
         """
         Send given report to JIRA
 
         It checks if it hasn't been reported already
 
         :type report reporter.reports.Report
+        :type tickets list[jira.resources.Issue]|None
+        :arg tickets: tickets already found for this report (see find_tickets)
+        :rtype: bool
         """
-        self._logger.info('Reporting "{}"'.format(report.get_summary()))
+        return self._report(report, tickets) == self.OUTCOME_REPORTED
 
-        priority = report.get_priority()
-        if priority:
-            self._fields['default']['priority'] = priority
+    def report_many(self, reports, workers=None):
+        """
+        Send given reports to JIRA concurrently
+
+        Duplicates are looked up for all reports at once (see find_tickets). Returns the outcome
+        of reporting (see OUTCOME_* constants) for each report, in the same order.
+
+        :type reports list[reporter.reports.Report]
+        :type workers int|None
+        :arg workers: how many reports are sent at once (REPORT_WORKERS or JIRA_CONFIG['workers'] by default)
+        :rtype: list[str]
+        """
+        workers = workers or self._config.get('workers', self.REPORT_WORKERS)
+
+        # report each unique ID once during a run (this method can be called for every source),
+        # otherwise we would file the same ticket a few times
+        first_reports = set()
+
+        with self._lock:
+            for idx, report in enumerate(reports):
+                if report.get_unique_id() not in self._reported_unique_ids:
+                    self._reported_unique_ids.add(report.get_unique_id())
+                    first_reports.add(idx)
+
+        tickets = self.find_tickets([reports[idx].get_unique_id() for idx in first_reports])
+
+        def _report(idx):
+            report = reports[idx]
+
+            if idx not in first_reports:
+                self._logger.info('Skipping "{}" - already reported in this run'.format(report.get_summary()))
+                return self.OUTCOME_DUPLICATE
+
+            outcome = self._report(report, tickets.get(report.get_unique_id()))
+
+            # let the next call retry it
+            if outcome == self.OUTCOME_FAILED:
+                with self._lock:
+                    self._reported_unique_ids.discard(report.get_unique_id())
+
+            return outcome
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jira') as executor:
+            outcomes = list(executor.map(_report, range(len(reports))))
+
+        self._logger.info('Reported {} reports with {} workers: {}'.format(
+            len(reports), workers,
+            ', '.join('{} {}'.format(outcomes.count(outcome), outcome) for outcome in sorted(set(outcomes)))))
+
+        return outcomes
+
+    def _report(self, report, tickets):
+        """
+        Send given report to JIRA and return the outcome (see OUTCOME_* constants)
+
+        The ticket is built for each report separately, so that reports can be sent concurrently.
+
+        :type report reporter.reports.Report
+        :type tickets list[jira.resources.Issue]|None
+        :rtype: str
+        """
+        self._logger.info('Reporting "{}"'.format(report.get_summary()))
 
         # let's first check if the report is already in JIRA
-        # use "hash" added to a ticket description
+        # use "hash" stored in the unique ID field of a ticket
         try:
-            if self.ticket_exists(report.get_unique_id()):
-                return False
+            if self.ticket_exists(report.get_unique_id(), tickets=tickets):
+                return self.OUTCOME_DUPLICATE
         except Exception:
             self._logger.error('Failed to look up ticket duplicates', exc_info=True)
-            return False
+            return self.OUTCOME_FAILED
 
+        # descriptions are rendered lazily (see Report), they can fail here
+        try:
+            ticket_dict = self._get_ticket_fields(report)
+        except Exception:
+            self._logger.error('Failed to prepare a ticket', exc_info=True)
+            return self.OUTCOME_FAILED
+
+        if ticket_dict is None:
+            self._logger.info('MAIN tickets are now skipped')
+            return self.OUTCOME_SKIPPED
+
+        # report the ticket
+        self._logger.info('Reporting {}'.format(json.dumps(ticket_dict)))
+
+        try:
+            new_issue = self._jira.create_issue(fields=ticket_dict)
+            issue_id = new_issue.key
+
+            self._logger.info('Reported <{}>'.format(self._get_issue_url(issue_id)))
+        except Exception:
+            self._logger.error('Failed to report a ticket', exc_info=True)
+            return self.OUTCOME_FAILED
+
+        return self.OUTCOME_REPORTED
+
+    def _get_ticket_fields(self, report):
+        """
+        Return fields of the ticket to be created for a given report (None when it should not be reported)
+
+        :type report reporter.reports.Report
+        :rtype: dict|None
+        """
         # add a hash and counter
         description = report.get_description().strip()
 
@@ -180,7 +641,6 @@ class Jira(object):
             hash=report.get_unique_id(), counter=report.get_counter()
         )
 
-        # it's not, create a ticket
         ticket_dict = {
             "project": {'key': self._project},
             "summary": report.get_summary()[:250],
@@ -191,6 +651,10 @@ class Jira(object):
         # set default fields as defined in the config.py
         ticket_dict.update(self._fields['default'])
 
+        priority = report.get_priority()
+        if priority:
+            ticket_dict['priority'] = priority
+
         # PLATFORM-2405: classify the report: set a proper project and component
         (project, component_id) = None, None
 
@@ -201,8 +665,7 @@ class Jira(object):
 
         # we do not want to file tickets in MAIN project anymore
         if project == self._classifier.PROJECT_MAIN:
-            self._logger.info('MAIN tickets are now skipped')
-            return False
+            return None
 
         if project:
             ticket_dict['project']['key'] = project
@@ -215,16 +678,7 @@ class Jira(object):
         # PLATFORM-2441: set "ER Date" to indicate when was the last time this ticket was still valid
         ticket_dict[self._last_seen_field] = self.get_today_timestamp()
 
-        # report the ticket
-        self._logger.info('Reporting {}'.format(json.dumps(ticket_dict)))
-
-        try:
-            new_issue = self._jira.create_issue(fields=ticket_dict)
-            issue_id = new_issue.key
+        # store the hash for duplicates look up (it is kept in the description as well for humans)
+        ticket_dict[self._unique_id_field] = report.get_unique_id()
 
-            self._logger.info('Reported <{}>'.format(self._get_issue_url(issue_id)))
-        except Exception:
-            self._logger.error('Failed to report a ticket', exc_info=True)
-            return False
-
-        return True
+        return ticket_dict
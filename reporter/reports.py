@@ -7,10 +7,15 @@ class Report(object):
     """ A report wrapper """
 
     def __init__(self, summary, description, label=False, priority=False):
-        """ Set up the report """
+        """
+        Set up the report
+
+        The description can be a callable returning the text - it's called only when the description is needed
+        """
         self._priority = priority
         self._summary = summary
         self._description = description
+        self._description_parts = list()  # appended to the description when it's needed
 
         self._labels = list()
         if label:
@@ -51,11 +56,18 @@ class Report(object):
 
     def get_description(self):
         """ Get report detailed description """
+        if callable(self._description):
+            self._description = self._description()
+
+        if self._description_parts:
+            self._description += ''.join(part() if callable(part) else part for part in self._description_parts)
+            self._description_parts = list()
+
         return self._description
 
     def append_to_description(self, desc):
-        """ Append a text to the report description """
-        self._description += desc
+        """ Append a text (or a callable returning it) to the report description """
+        self._description_parts.append(desc)
 
     def add_label(self, label):
         """ Add given label to the report """
@@ -69,6 +81,11 @@ class Report(object):
         """ Get priority for the report """
         return self._priority
 
+    def __getstate__(self):
+        """ Callables can not be pickled (e.g. when reports are returned by a separate process) """
+        self.get_description()
+        return self.__dict__
+
     def __repr__(self):
         """ Returns human readable representation of the object """
         return '<Report: {summary} [{labels}] ({unique_id})>\n{description}'.format(
@@ -0,0 +1,251 @@
+"""
+Runs sources queries concurrently and streams reports as soon as a given source is done
+"""
+import logging
+import multiprocessing
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+
+class SourceJob(object):
+    """
+    A single Source.query() call to be performed by the runner
+
+    Only the source class and its constructor arguments are kept here,
+    the source instance is created by the worker itself (this way jobs can be sent to a separate process).
+    """
+    def __init__(self, source_class, query='', threshold=50, queries=None, **kwargs):
+        """
+        :type source_class type
+        :type query str
+        :type threshold int
+        :type queries list[tuple[str, int]]
+        :arg queries: list of (query, threshold) tuples to be run at once (see Source.query_many)
+        :arg kwargs: passed to the source constructor (e.g. period=21600)
+        """
+        self.source_class = source_class
+        self.query = query
+        self.threshold = threshold
+        self.queries = queries
+        self.kwargs = kwargs
+
+    def __call__(self):
+        """
+        :rtype: list[reporter.reports.Report]
+        """
+        source = self.source_class(**self.kwargs)
+
+        if self.queries:
+            return source.query_many(self.queries)
+
+        return source.query(self.query, threshold=self.threshold)
+
+    def __repr__(self):
+        if self.queries:
+            queries = 'queries:{!r}'.format(self.queries)
+        else:
+            queries = 'query:{!r} threshold:{}'.format(self.query, self.threshold)
+
+        return '<SourceJob: {}({}) {}>'.format(
+            self.source_class.__name__,
+            ', '.join('{}={!r}'.format(key, value) for key, value in sorted(self.kwargs.items())),
+            queries
+        )
+
+
+def _call_job(job, connection):
+    """
+    Run a given job in a child process and send its results (or an exception) back to the parent
+
+    :type job SourceJob
+    :type connection multiprocessing.connection.Connection
+    """
+    try:
+        connection.send((True, job()))
+    except Exception as ex:
+        connection.send((False, ex))
+    finally:
+        connection.close()
+
+
+class SourcesRunner(object):
+    """
+    Runs source jobs using a bounded number of daemon threads or processes
+
+    Most of the time spent by a source is a network wait for elasticsearch responses,
+    hence threads are used by default.
+    """
+    EXECUTOR_THREAD = 'thread'
+    EXECUTOR_PROCESS = 'process'
+
+    def __init__(self, workers=8, timeout=900, executor=EXECUTOR_THREAD):
+        """
+        :type workers int
+        :type timeout int
+        :type executor str
+        :arg timeout: how long (in seconds) a single job can take before its results are dropped
+        """
+        assert executor in (self.EXECUTOR_THREAD, self.EXECUTOR_PROCESS), \
+            'Unsupported executor: {}'.format(executor)
+
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._workers = workers
+        self._timeout = timeout
+        self._executor = executor
+
+        self._timed_out = []
+
+        # future -> child process running a job (see _run_in_process)
+        self._processes = dict()
+        self._lock = threading.Lock()
+
+    def _submit(self, job):
+        """
+        Start a given job in a daemon thread (that runs it or waits for a child process) and return its future
+
+        Daemon workers do not block the interpreter exit, so jobs that timed out can be abandoned.
+
+        :type job SourceJob
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        target = self._run_in_process if self._executor == self.EXECUTOR_PROCESS else self._run_in_thread
+        threading.Thread(target=target, args=(job, future), name='source', daemon=True).start()
+
+        return future
+
+    @staticmethod
+    def _run_in_thread(job, future):
+        """
+        :type job SourceJob
+        :type future concurrent.futures.Future
+        """
+        try:
+            future.set_result(job())
+        except Exception as ex:
+            future.set_exception(ex)
+
+    def _run_in_process(self, job, future):
+        """
+        :type job SourceJob
+        :type future concurrent.futures.Future
+        """
+        (receiver, sender) = multiprocessing.Pipe(duplex=False)
+
+        process = multiprocessing.Process(target=_call_job, args=(job, sender), name='source', daemon=True)
+        process.start()
+        sender.close()
+
+        with self._lock:
+            self._processes[future] = process
+
+        succeeded, result = False, None
+
+        try:
+            (succeeded, result) = receiver.recv()
+        except EOFError:
+            # the process was killed (e.g. terminated after a timeout)
+            result = RuntimeError('Process exited with {} code'.format(process.exitcode))
+        except Exception as ex:
+            # e.g. the result could not be unpickled
+            result = ex
+        finally:
+            receiver.close()
+            process.join()
+
+            with self._lock:
+                self._processes.pop(future, None)
+
+        if succeeded:
+            future.set_result(result)
+        else:
+            future.set_exception(result)
+
+    def _abandon(self, future):
+        """
+        Terminate the child process of a job that timed out (threads cannot be interrupted and are left running)
+
+        :type future concurrent.futures.Future
+        """
+        with self._lock:
+            process = self._processes.get(future)
+
+        if process is not None:
+            process.terminate()
+
+    def get_timed_out_jobs(self):
+        """
+        :rtype: list[SourceJob]
+        """
+        return self._timed_out
+
+    def run(self, jobs):
+        """
+        Run all given jobs and yield reports as soon as each job is completed
+
+        :type jobs list[SourceJob]
+        :rtype: collections.Iterable[reporter.reports.Report]
+        """
+        for reports in self.run_batches(jobs):
+            for report in reports:
+                yield report
+
+    def run_batches(self, jobs):
+        """
+        Run all given jobs and yield the list of reports of each job as soon as it is completed
+
+        At most "workers" jobs are run at once, so that the timeout is counted from the moment
+        a job actually starts. A job that timed out is abandoned and its reports are dropped.
+        Child processes are terminated then. Python cannot interrupt a running thread, so the thread
+        is left running in the background until the job completes or the script exits.
+
+        :type jobs list[SourceJob]
+        :rtype: collections.Iterable[list[reporter.reports.Report]]
+        """
+        queue = deque(jobs)
+        running = dict()  # future -> (job, start time)
+
+        self._logger.info('Running {} jobs using {} {} workers (with {} sec timeout)'.format(
+            len(queue), self._workers, self._executor, self._timeout))
+
+        while queue or running:
+            while queue and len(running) < self._workers:
+                job = queue.popleft()
+                running[self._submit(job)] = (job, time.time())
+
+            # wait until the first job completes or the earliest deadline is reached
+            now = time.time()
+            wait_for = min(started + self._timeout for (_, started) in running.values()) - now
+
+            done, _ = wait(list(running.keys()), timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                (job, started) = running.pop(future)
+
+                try:
+                    reports = future.result()
+                except Exception:
+                    self._logger.error('{} raised an exception'.format(job), exc_info=True)
+                    continue
+
+                self._logger.info('{} returned {} reports in {:.2f} sec'.format(
+                    job, len(reports), time.time() - started))
+
+                yield reports
+
+            # abandon jobs that take too long
+            now = time.time()
+
+            for future, (job, started) in list(running.items()):
+                if now - started >= self._timeout:
+                    self._logger.error('{} timed out after {:.2f} sec, its reports are dropped'.format(
+                        job, now - started))
+
+                    self._abandon(future)
+                    del running[future]
+                    self._timed_out.append(job)
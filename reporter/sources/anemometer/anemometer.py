@@ -38,8 +38,16 @@ h5. Raw stats
 {{code}}
 """
 
+    def __init__(self, corpus=None):
+        """
+        :type corpus reporter.sources.corpus.CorpusStore
+        :arg corpus: record queries returned by Anemometer or replay the recorded ones
+        """
+        super(AnemometerSource, self).__init__()
+        self._corpus = corpus
+
     def _get_entries(self, query=''):
-        return AnemometerClient(self.ANEMOMETER_URL).get_queries()
+        return AnemometerClient(self.ANEMOMETER_URL, corpus=self._corpus).get_queries()
 
     def _filter(self, entry):
         if entry.get('Fingerprint') == 'mysqldump':
@@ -61,7 +69,8 @@ h5. Raw stats
     def _get_report(self, entry):
         stats = {k: v for k, v in entry.items() if '_avg' in k or '_sum' in k or '_median' in k}
 
-        url = '{}/index.php?action=show_query&datasource=localhost&checksum={}'.format(self.ANEMOMETER_URL, entry.get('checksum'))
+        url = '{}/index.php?action=show_query&datasource=localhost&checksum={}'.format(
+            self.ANEMOMETER_URL, entry.get('checksum'))
 
         report = Report(
             summary='[Anemometer] {} can be optimized'.format(entry.get('snippet')),
@@ -32,10 +32,19 @@ class AnemometerClient(object):
         'Fingerprint',
     ]
 
-    def __init__(self, root_url):
+    # name the corpora are recorded under
+    CORPUS_NAME = 'Anemometer'
+
+    def __init__(self, root_url, corpus=None):
+        """
+        :type root_url str
+        :type corpus reporter.sources.corpus.CorpusStore
+        :arg corpus: record queries returned by Anemometer or replay the recorded ones
+        """
         self._http = None
         self._logger = logging.getLogger(self.__class__.__name__)
         self._root_url = root_url
+        self._corpus = corpus
 
     @property
     def http(self):
@@ -56,8 +65,7 @@ class AnemometerClient(object):
         limit = limit or 150
         group = group or 'checksum'
 
-        # format the URL
-        url = self._get_full_url(params={
+        params = {
             'action': 'api',
             'output': 'json',
             'datasource': 'localhost',
@@ -65,7 +73,13 @@ class AnemometerClient(object):
             'fact-order': order,
             'fact-limit': limit,
             'table_fields[]': fields
-        })
+        }
+
+        if self._corpus is not None and self._corpus.is_replaying():
+            return list(self._corpus.replay(self.CORPUS_NAME, params))
+
+        # format the URL
+        url = self._get_full_url(params=params)
 
         self._logger.info('Fetching <{}>'.format(url))
 
@@ -74,6 +88,10 @@ class AnemometerClient(object):
             queries = resp.get('result', [])
 
             self._logger.info('Got {} queries'.format(len(queries)))
+
+            if self._corpus is not None:
+                queries = list(self._corpus.record(self.CORPUS_NAME, params, queries))
+
             return queries
         except RequestException as e:
             self._logger.error('HTTP request failed', exc_info=True)
@@ -32,6 +32,8 @@ h3. The Camel says "{{{{{full_message}}}}}"
 
     REPORT_LABEL = 'BackendErrors'
 
+    FIELDS = ['@source_host', '@message', '@fields.script_name', '@context.error']
+
     def _get_entries(self, query):
         return self._kibana.query_by_string(query=self.ELASTICSEARCH_QUERY, limit=self.LIMIT)
 
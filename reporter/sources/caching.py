@@ -2,7 +2,7 @@
 Report caching related problems
 """
 
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
 from reporter.sources.common import KibanaSource
 
@@ -11,6 +11,9 @@ class NotCachedWikiaApiResponsesSource(KibanaSource):
     """ Get wikia.php API responses that are not cached """
     REPORT_LABEL = 'APIResponsesNotCached'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@context.controller', '@context.method']
+    AGGREGATION_FIELDS = FIELDS
+
     FULL_MESSAGE_TEMPLATE = """
 The following wikia.php API response can probably be cached on CDN layer (and invalidated when required)
 to decrease the load on the backend servers.
@@ -31,6 +31,9 @@ h3. Details
 
     REPORT_LABEL = 'CeleryWorkersError'
 
+    # entries are not grouped in elasticsearch, long tracebacks are not indexed as keywords (see AGGREGATION_FIELDS)
+    FIELDS = ['exception', 'kubernetes.container_name']
+
     ELASTICSEARCH_INDEX_PREFIX = 'logstash-celery'
 
     def _get_entries(self, query):
@@ -23,12 +23,18 @@ h3. {full_message}
 
     REPORT_LABEL = 'ChatServerErrors'
 
+    FIELDS = ['@message', '@source_host', '@fields.environment']
+
+    def _get_query_string(self, query):
+        return '@fields.app_name:chat AND severity:error AND @source_host:chat-s* AND @message:*{}*'.format(query)
+
     def _get_entries(self, query):
         """ Return entries matching given query """
-        return self._kibana.query_by_string(
-            query='@fields.app_name:chat AND severity:error AND @source_host:chat-s* AND @message:*{}*'.format(query),
-            limit=self.LIMIT
-        )
+        return self._kibana.query_by_string(query=self._get_query_string(query), limit=self.LIMIT)
+
+    def _match(self, entry, query):
+        # wildcard queries on analyzed fields are case-insensitive
+        return query.lower() in entry.get('@message', '').lower()
 
     def _filter(self, entry):
         return True
@@ -0,0 +1,170 @@
+"""
+Persistent per-source checkpoints for incremental fetching of log entries
+"""
+import calendar
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from functools import lru_cache
+
+from .kibana import KibanaRow
+
+
+@lru_cache(maxsize=1024)
+def _parse_hour(value):
+    """
+    :type value str
+    :arg value: e.g. 2020-01-01T12
+    :rtype: int
+    """
+    return calendar.timegm(time.strptime(value, '%Y-%m-%dT%H'))
+
+
+class CheckpointStore(object):
+    """
+    Keeps the upper time boundary of the last fetch and grouped entries counts for each source query
+
+    Entries are counted in buckets by their @timestamp (see BUCKET_SIZE). Counts over the rolling window
+    are calculated by summing the buckets that start within it. The bucket the window starts in is not counted,
+    so up to BUCKET_SIZE seconds at the beginning of the window can be missed, but no entries older than the window
+    are ever counted.
+    """
+    # [sec] how long is the time range of a single bucket
+    BUCKET_SIZE = 3600
+
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS checkpoints (source TEXT PRIMARY KEY, timestamp INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS buckets (source TEXT NOT NULL, key TEXT NOT NULL, bucket INTEGER NOT NULL, '
+        'cnt INTEGER NOT NULL, entry TEXT NOT NULL, has_all_required_fields INTEGER NOT NULL, '
+        'entry_index TEXT, entry_id TEXT, PRIMARY KEY (source, key, bucket))',
+    ]
+
+    # the bucket can be continued by the next run, counts are summed then
+    # the most recent entry is kept, unless only the stored one has all required fields
+    UPSERT = 'INSERT INTO buckets VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (source, key, bucket) DO UPDATE SET ' \
+        'cnt = cnt + excluded.cnt, ' \
+        'entry = CASE WHEN excluded.has_all_required_fields >= has_all_required_fields ' \
+        'THEN excluded.entry ELSE entry END, ' \
+        'entry_index = CASE WHEN excluded.has_all_required_fields >= has_all_required_fields ' \
+        'THEN excluded.entry_index ELSE entry_index END, ' \
+        'entry_id = CASE WHEN excluded.has_all_required_fields >= has_all_required_fields ' \
+        'THEN excluded.entry_id ELSE entry_id END, ' \
+        'has_all_required_fields = MAX(has_all_required_fields, excluded.has_all_required_fields)'
+
+    def __init__(self, path):
+        """
+        :type path str
+        :arg path: SQLite database file
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+        with self._lock, self._db:
+            for statement in self.SCHEMA:
+                self._db.execute(statement)
+
+            # counts were stored for each run as a whole before, fetch the entire period again
+            if self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'groups'").fetchone():
+                self._logger.info('Dropping groups stored by the previous version')
+                self._db.execute('DROP TABLE groups')
+                self._db.execute('DELETE FROM checkpoints')
+
+    @classmethod
+    def get_bucket(cls, timestamp):
+        """
+        Return the start of the bucket for a given elasticsearch timestamp (None if it can not be parsed)
+
+        :type timestamp str|None
+        :arg timestamp: e.g. 2020-01-01T12:34:56.789Z
+        :rtype: int|None
+        """
+        try:
+            timestamp = _parse_hour(timestamp[:13]) + int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+        except (TypeError, ValueError):
+            return None
+
+        return timestamp - timestamp % cls.BUCKET_SIZE
+
+    def get_checkpoint(self, source):
+        """
+        Return the upper time boundary of the last fetch for a given source (None if there's no checkpoint)
+
+        :type source str
+        :rtype: int|None
+        """
+        with self._lock:
+            row = self._db.execute('SELECT timestamp FROM checkpoints WHERE source = ?', (source,)).fetchone()
+
+        return row[0] if row else None
+
+    def save(self, source, timestamp, buckets):
+        """
+        Store grouped entries fetched up to a given timestamp and move the source checkpoint
+
+        :type source str
+        :type timestamp int
+        :type buckets dict[int, dict]
+        :arg buckets: grouped entries for each bucket (see get_bucket)
+        """
+        rows = [
+            (source, key, bucket, item['cnt'], json.dumps(item['entry'], default=str),
+             int(item['has_all_required_fields']),
+             getattr(item['entry'], 'index', None), getattr(item['entry'], 'doc_id', None))
+            for bucket, items in buckets.items() for key, item in items.items()
+        ]
+
+        with self._lock, self._db:
+            self._db.executemany(self.UPSERT, rows)
+            self._db.execute('INSERT OR REPLACE INTO checkpoints VALUES (?, ?)', (source, timestamp))
+
+        self._logger.info('{}: stored {} groups in {} buckets up to {}'.format(
+            source, len(rows), len(buckets), timestamp))
+
+    def prune(self, source, since):
+        """
+        Remove buckets that start before a given timestamp
+
+        :type source str
+        :type since int
+        """
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM buckets WHERE source = ? AND bucket < ?', (source, since))
+
+    def get_groups(self, source, since):
+        """
+        Return grouped entries from buckets starting since a given timestamp with their counts summed
+
+        The most recent entry is used, unless an older one has all required fields.
+
+        :type source str
+        :type since int
+        :rtype: dict
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT key, cnt, entry, has_all_required_fields, entry_index, entry_id FROM buckets '
+                'WHERE source = ? AND bucket >= ? ORDER BY bucket DESC', (source, since)).fetchall()
+
+        groups = dict()
+
+        for (key, cnt, entry, has_all_required_fields, entry_index, entry_id) in rows:
+            has_all_required_fields = bool(has_all_required_fields)
+
+            if key not in groups:
+                groups[key] = {
+                    'cnt': 0,
+                    'entry': KibanaRow(json.loads(entry), entry_index, entry_id),
+                    'has_all_required_fields': has_all_required_fields
+                }
+            elif has_all_required_fields and not groups[key]['has_all_required_fields']:
+                groups[key]['entry'] = KibanaRow(json.loads(entry), entry_index, entry_id)
+                groups[key]['has_all_required_fields'] = True
+
+            groups[key]['cnt'] += cnt
+
+        return groups
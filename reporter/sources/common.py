@@ -7,13 +7,29 @@ import logging
 import re
 import urllib.request, urllib.parse, urllib.error
 
-from wikia_common_kibana import Kibana
+from collections import OrderedDict
+
+from .checkpoints import CheckpointStore
+from .kibana import KibanaRow, PaginatedKibana
 
 
 class Source(object):
     """ An abstract class for data providers to inherit from """
+
+    # fields read by _normalize method (dot-separated for nested ones), entries with the same values
+    # of these fields are normalized only once (None means that every entry is normalized)
+    NORMALIZE_FIELDS = None
+
+    # how many normalized keys to keep (see NORMALIZE_FIELDS), the least recently used ones are removed
+    NORMALIZED_KEYS_CACHE_SIZE = 10000
+
+    # marks fields that are not present in the entry
+    _MISSING = object()
+
     def __init__(self):
         self._logger = logging.getLogger(self.__class__.__name__)
+        self._filtered_entries = 0
+        self._normalized_keys = OrderedDict()  # raw key -> key returned by _normalize
 
     def query(self, query='', threshold=50):
         """
@@ -24,22 +40,130 @@ class Source(object):
         - filtered entries are normalized using _normalize_entries method
         - reports are grouped (using the key returned by _normalize_entries)
         - each report is than formatted
+
+        Entries are streamed through filter -> normalize -> group stages one by one,
+        only the per-group state is kept in memory.
         """
 
         if query != '':
             self._logger.info("Query: '{}'".format(query))
 
-        # filter the entries
+        # filter and group the entries
         try:
-            entries = [entry for entry in self._get_entries(query) if self._filter(entry)]
+            normalized = self._get_normalized_entries(query)
         except:
             self._logger.error('self._get_entries raised an exception', exc_info=True)
             return []
 
-        self._logger.info("Got {} entries after filtering".format(len(entries)))
+        self._logger.info("Got {} entries after filtering (grouped into {} items)".format(
+            self._filtered_entries, len(normalized)))
+
+        return self._get_reports(normalized, threshold)
+
+    def query_many(self, queries):
+        """
+        Run multiple queries using a single _get_entries_many call
+
+        Entries are routed to every query they match (see _match) and grouped separately,
+        each query has its own threshold applied. When the source is not able to get entries
+        for multiple queries at once, queries are run one by one.
+
+        :type queries list[tuple[str, int]]
+        :arg queries: list of (query, threshold) tuples
+        :rtype: list[reporter.reports.Report]
+        """
+        try:
+            entries = self._get_entries_many([query for (query, _) in queries])
+        except NotImplementedError:
+            return [report for (query, threshold) in queries for report in self.query(query, threshold)]
+
+        self._logger.info("Queries: {}".format(', '.join("'{}'".format(query) for (query, _) in queries)))
+
+        # filter the entries and group them for each query they match
+        normalized = [dict() for _ in queries]
+        filtered = [0] * len(queries)
+
+        try:
+            for entry in entries:
+                if not self._filter(entry):
+                    continue
+
+                cnt = self._get_entry_count(entry)
+
+                for idx, (query, _) in enumerate(queries):
+                    if self._match(entry, query):
+                        filtered[idx] += cnt
+                        self._normalize_entry(normalized[idx], entry, cnt=cnt)
+        except:
+            self._logger.error('self._get_entries_many raised an exception', exc_info=True)
+            return []
+
+        reports = []
+
+        for idx, (query, threshold) in enumerate(queries):
+            self._logger.info("Query: '{}' - got {} entries after filtering (grouped into {} items)".format(
+                query, filtered[idx], len(normalized[idx])))
+
+            reports += self._get_reports(normalized[idx], threshold)
 
-        # group them
-        normalized = self._normalize_entries(entries)
+        return reports
+
+    def match(self, entry, query):
+        """
+        Tell if given entry matches the query (see _match)
+
+        Used when entries are fetched for multiple queries (or sources) at once.
+
+        :type entry dict
+        :type query str
+        :rtype: bool
+        """
+        return self._match(entry, query)
+
+    def add_entry(self, entry, groups):
+        """
+        Filter given entry and add it to each of given groups of normalized entries
+
+        Returns how many occurrences the entry represents (0 when it was filtered out).
+
+        :type entry dict
+        :type groups list[dict]
+        :rtype: int
+        """
+        if not self._filter(entry):
+            return 0
+
+        cnt = self._get_entry_count(entry)
+
+        for normalized in groups:
+            self._normalize_entry(normalized, entry, cnt=cnt)
+
+        return cnt
+
+    def get_reports(self, normalized, threshold):
+        """
+        Generate reports for groups of normalized entries collected by add_entry
+
+        :type normalized dict
+        :type threshold int
+        :rtype: list[reporter.reports.Report]
+        """
+        return self._get_reports(normalized, threshold)
+
+    def _get_reports(self, normalized, threshold):
+        """
+        Generate reports for grouped entries that reached the threshold
+
+        :type normalized dict
+        :type threshold int
+        :rtype: list[reporter.reports.Report]
+        """
+        # get the rest of the data for the entries that will be reported
+        try:
+            self._complete_entries(normalized, threshold)
+        except:
+            self._logger.error('self._complete_entries raised an exception', exc_info=True)
+            return []
 
         # generate reports
         reports = self._generate_reports(normalized, threshold)
@@ -55,54 +179,151 @@ class Source(object):
 
         return reports
 
+    def _get_normalized_entries(self, query):
+        """ Get the entries, filter them and return them grouped by the normalized key """
+        return self._normalize_entries(self._filter_entries(self._get_entries(query)))
+
+    def _filter_entries(self, entries):
+        """ Yield entries that pass the _filter method and count them """
+        self._filtered_entries = 0
+
+        for entry in entries:
+            if self._filter(entry):
+                self._filtered_entries += self._get_entry_count(entry)
+                yield entry
+
     def _normalize_entries(self, entries):
         """ Run all entries through _normalize method """
         normalized = dict()
 
         for entry in entries:
-            try:
-                key = self._normalize(entry)
+            self._normalize_entry(normalized, entry, cnt=self._get_entry_count(entry))
+
+        return normalized
+
+    def _normalize_entry(self, normalized, entry, cnt=1):
+        """
+        Normalize a single entry and add it to the normalized entries group
 
-                # extra normalization
-                if key is not None:
-                    key = key.lower().replace(' ', '')
+        :type normalized dict
+        :type entry dict
+        :type cnt int
+        :arg cnt: how many occurrences given entry represents
+        """
+        raw_key = self._get_raw_key(entry)
+
+        if raw_key is not None and raw_key in self._normalized_keys:
+            # an entry with the same values was normalized already
+            key = self._normalized_keys[raw_key]
+            self._normalized_keys.move_to_end(raw_key)
+            is_normalized = False
+        else:
+            try:
+                key = self._get_normalized_key(entry)
             except UnicodeError:
                 # ignore UTF parsing errors
                 self._logger.error('Entry parsing error', exc_info=True)
-                continue
+                return
 
-            # all entries will be grouped
-            # using the key return by _normalize method
-            if key is not None:
-                has_all_required_fields = self._has_all_required_fields(entry)
-
-                if key not in normalized:
-                    normalized[key] = {
-                        'cnt': 1,
-                        'entry': entry,
-                        'has_all_required_fields': has_all_required_fields
-                    }
-                else:
-                    normalized[key]['cnt'] += 1
-
-                    # update the normalized entry if we finally got the full context
-                    # @see PLATFORM-1162
-                    if has_all_required_fields and not normalized[key]['has_all_required_fields']:
-                        normalized[key]['entry'] = entry
-                        normalized[key]['has_all_required_fields'] = True
+            is_normalized = True
 
+            if raw_key is not None:
+                self._normalized_keys[raw_key] = key
+
+                if len(self._normalized_keys) > self.NORMALIZED_KEYS_CACHE_SIZE:
+                    self._normalized_keys.popitem(last=False)
+
+        # all entries will be grouped
+        # using the key return by _normalize method
+        if key is not None:
+            has_all_required_fields = self._has_all_required_fields(entry)
+
+            if key not in normalized:
+                if not is_normalized:
+                    self._normalize(entry)  # _normalize can update the entry that will be reported
+
+                normalized[key] = {
+                    'cnt': cnt,
+                    'entry': entry,
+                    'has_all_required_fields': has_all_required_fields
+                }
             else:
-                self._logger.debug('Entry not normalized: {}'.format(entry))
+                normalized[key]['cnt'] += cnt
 
-        return normalized
+                # update the normalized entry if we finally got the full context
+                # @see PLATFORM-1162
+                if has_all_required_fields and not normalized[key]['has_all_required_fields']:
+                    if not is_normalized:
+                        self._normalize(entry)
+
+                    normalized[key]['entry'] = entry
+                    normalized[key]['has_all_required_fields'] = True
+
+        else:
+            self._logger.debug('Entry not normalized: {}'.format(entry))
+
+    def _get_normalized_key(self, entry):
+        """ Return the key entries are grouped by (or None if the entry should be skipped) """
+        key = self._normalize(entry)
+
+        # extra normalization
+        if key is not None:
+            key = key.lower().replace(' ', '')
+
+        return key
+
+    def _get_raw_key(self, entry):
+        """
+        Return values of NORMALIZE_FIELDS for a given entry (or None if they're not set)
+
+        :type entry dict
+        :rtype: tuple|str|None
+        """
+        if self.NORMALIZE_FIELDS is None:
+            return None
+
+        values = []
+
+        for field in self.NORMALIZE_FIELDS:
+            value = entry
+
+            for name in field.split('.'):
+                value = value.get(name, self._MISSING) if isinstance(value, dict) else self._MISSING
+
+            # 1 and True are equal, but not when formatted
+            values.append((type(value), value))
+
+        values = tuple(values)
+
+        try:
+            hash(values)
+        except TypeError:
+            # lists or dicts were found
+            values = repr(values)
+
+        return values
+
+    def _complete_entries(self, items, threshold):
+        """
+        Allow sources to get the data that is needed by the report only,
+        for grouped entries that will be reported (i.e. reached the threshold)
+        """
+        pass
 
     def _generate_reports(self, items, threshold):
         """
         Turn grouped entries from the log into Report instances
         """
         reports = list()
+        skipped = 0
 
         for key, item in items.items():
+            # do not format reports that will not be returned
+            if item['cnt'] < threshold:
+                self._logger.debug('Skipped "{}" ({} occurrences)'.format(key, item['cnt']))
+                skipped += 1
+                continue
+
             try:
                 report = self._get_report(item['entry'])
 
@@ -113,10 +334,6 @@ class Source(object):
                 self._logger.error('get_report raised an exception', exc_info=True)
                 continue
 
-            if item['cnt'] < threshold:
-                self._logger.info('Skipped "{}" ({} occurrences)'.format(report.get_summary(), item['cnt']))
-                continue
-
             # update the report with the "hash" generated previously via _normalize
             # also allow to override unique_id implementation by eg. Source classes
             if not report.get_unique_id():
@@ -127,8 +344,19 @@ class Source(object):
             report.set_counter(item['cnt'])
             reports.append(report)
 
+        if skipped:
+            self._logger.info('Skipped {} of {} items below the threshold of {} occurrences'.format(
+                skipped, len(items), threshold))
+
         return reports
 
+    @staticmethod
+    def _get_entry_count(entry):
+        """
+        Return how many occurrences given entry represents (entries can be grouped by the source already)
+        """
+        return 1
+
     @staticmethod
     def _has_all_required_fields(entry):
         """
@@ -138,9 +366,25 @@ class Source(object):
         return True
 
     def _get_entries(self, query):
-        """ This method will query the source and return matching entries """
+        """
+        This method will query the source and return matching entries
+
+        It can (and should for large data sets) be a generator - entries are consumed one by one
+        """
         raise NotImplementedError("_get_entries() method needs to be overwritten in your class!")
 
+    def _get_entries_many(self, queries):
+        """
+        This method will query the source once and return entries matching any of given queries
+
+        Sources implementing it need to implement _match as well (see query_many)
+        """
+        raise NotImplementedError("_get_entries_many() method is not implemented")
+
+    def _match(self, entry, query):
+        """ Callback used to tell which query (see _get_entries_many) given entry matches """
+        raise NotImplementedError("_match() method needs to be overwritten in your class!")
+
     def _filter(self, entry):
         """ Callback used to filter entries """
         raise NotImplementedError("_filter() method needs to be overwritten in your class!")
@@ -171,6 +415,7 @@ class Source(object):
 class KibanaSource(Source):
     """ elasticsearch-powered data provider """
     LIMIT = 100000  # limit how many rows can be fetched from elasticsearch
+    PAGE_SIZE = 1000  # how many rows are fetched from elasticsearch in a single request
 
     # TODO: move to a separate class
     ENV_PREVIEW = 'Preview'
@@ -180,18 +425,200 @@ class KibanaSource(Source):
 
     PREVIEW_HOST = 'staging-s1'
 
+    # fields read by _get_env_from_entry method
+    ENV_FIELDS = ['@source_host', '@fields.environment']
+
     KIBANA_URL = "https://kibana.wikia-inc.com/app/kibana#/discover?_g=(time:(from:now-6h,mode:quick,to:now))&_a=(columns:!({columns}),index:'{index}-*',query:(query_string:(analyze_wildcard:!t,query:'{query}')),sort:!('@timestamp',desc))"
 
     ELASTICSEARCH_INDEX_PREFIX = 'logstash-other'
 
-    def __init__(self, period=3600):
+    # fields that _filter, _normalize and _has_all_required_fields methods need (None means the entire document)
+    FIELDS = None
+
+    # fields that _get_report and _update_report methods need (None means the entire document)
+    # they're fetched only for the entries that will be reported
+    REPORT_FIELDS = None
+
+    # fields that _has_all_required_fields method needs to know the presence of only (see _has_field)
+    # elasticsearch checks them using exists queries, so that large values are not fetched for every entry
+    EXISTS_FIELDS = None
+
+    # group entries in elasticsearch using these (keyword) fields and fetch a single entry for each group
+    # (all fields read by _filter and _normalize methods need to be listed here)
+    #
+    # use short fields only - values longer than keyword's ignore_above limit (256 characters) are not indexed,
+    # such entries end up in a single group with no value and all but one of them are lost
+    AGGREGATION_FIELDS = None
+
+    def __init__(self, period=3600, page_size=None, checkpoints=None, corpus=None, es_host=None):
+        """
+        :type period int
+        :type page_size int
+        :type checkpoints str
+        :type corpus reporter.sources.corpus.CorpusStore
+        :type es_host str
+        :arg checkpoints: SQLite file to keep checkpoints in (only new entries are fetched on each run then)
+        :arg corpus: record entries returned by elasticsearch or replay the recorded ones
+        :arg es_host: elasticsearch to query instead of the default one (e.g. reporter.fakes.elasticsearch_server)
+        """
         super(KibanaSource, self).__init__()
-        self._kibana = Kibana(period=period, index_prefix=self.ELASTICSEARCH_INDEX_PREFIX)
+        self._checkpoints = CheckpointStore(checkpoints) if checkpoints else None
+
+        # entries are counted by their timestamps when checkpoints are used, hence they can not be grouped
+        if self._checkpoints is None:
+            (fields, aggregate_by) = (self.FIELDS, self.AGGREGATION_FIELDS)
+        else:
+            (fields, aggregate_by) = (self.FIELDS + ['@timestamp'] if self.FIELDS is not None else None, None)
+
+        self._kibana = PaginatedKibana(
+            period=period,
+            index_prefix=self.ELASTICSEARCH_INDEX_PREFIX,
+            batch_size=page_size or self.PAGE_SIZE,
+            fields=fields,
+            aggregate_by=aggregate_by,
+            exists_fields=self.EXISTS_FIELDS,
+            corpus=corpus,
+            corpus_name=self.__class__.__name__,
+            es_host=es_host
+        )
 
     def _get_entries(self, query):
-        """ Send the query to elasticsearch """
+        """ Send the query to elasticsearch (entries are yielded page by page) """
         return self._kibana.get_rows(query, limit=self.LIMIT)
 
+    def _get_normalized_entries(self, query):
+        """
+        When checkpoints are enabled fetch only the entries logged since the previous run
+        and merge their counts with the ones stored for the rest of the period
+
+        Entries are counted in buckets by their timestamps, only the buckets that start within
+        the period are summed (see CheckpointStore).
+        """
+        if self._checkpoints is None:
+            return super(KibanaSource, self)._get_normalized_entries(query)
+
+        source = '{}:{}'.format(self.__class__.__name__, query)
+        (since, to) = self._kibana.get_time_range()
+
+        # the time range excludes its upper boundary, continue from there
+        checkpoint = self._checkpoints.get_checkpoint(source)
+
+        if checkpoint is not None and since < checkpoint < to:
+            self._logger.info('Continuing from the checkpoint ({} seconds ago)'.format(to - checkpoint))
+            self._kibana.set_since(checkpoint)
+
+        # bucket -> grouped entries
+        buckets = dict()
+        fallback_bucket = self._checkpoints.get_bucket(self._kibana.format_timestamp(to - 1))
+
+        for entry in self._filter_entries(self._get_entries(query)):
+            bucket = self._checkpoints.get_bucket(entry.get('@timestamp'))
+
+            self._normalize_entry(
+                buckets.setdefault(fallback_bucket if bucket is None else bucket, dict()),
+                entry, cnt=self._get_entry_count(entry))
+
+        self._checkpoints.save(source, to, buckets)
+        self._checkpoints.prune(source, since)
+
+        return self._checkpoints.get_groups(source, since)
+
+    def get_query_string(self, query):
+        """
+        Return elasticsearch query string for a given query (see _get_query_string)
+
+        :type query str
+        :rtype: str
+        """
+        return self._get_query_string(query)
+
+    def _get_query_string(self, query):
+        """
+        Return elasticsearch query string for a given query
+
+        Sources implementing it can be queried for multiple queries at once (see Source.query_many)
+        """
+        raise NotImplementedError("_get_query_string() method is not implemented")
+
+    def _get_entries_many(self, queries):
+        """ Send a single query matching any of given queries to elasticsearch """
+        if self._checkpoints is not None:
+            # checkpoints are kept for each query separately
+            raise NotImplementedError("_get_entries_many() can not be used with checkpoints")
+
+        query = ' OR '.join('({})'.format(self._get_query_string(query)) for query in queries)
+        return self._kibana.query_by_string(query=query, limit=self.LIMIT * len(queries))
+
+    @staticmethod
+    def _has_field(entry, field):
+        """
+        Check if the entry has a given (dot-separated) field, either fetched or listed in EXISTS_FIELDS
+
+        :type entry dict
+        :type field str
+        :rtype: bool
+        """
+        if isinstance(entry, KibanaRow) and field in entry.existing_fields:
+            return True
+
+        value = entry
+
+        for key in field.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+
+        return value is not None
+
+    @staticmethod
+    def _get_entry_count(entry):
+        """
+        Rows returned by elasticsearch aggregations represent the whole group of entries
+        """
+        return entry.count if isinstance(entry, KibanaRow) else 1
+
+    def _complete_entries(self, items, threshold):
+        """
+        Fetch fields not returned by elasticsearch when the entries were queried (see FIELDS)
+        """
+        if self.FIELDS is None:
+            return
+
+        if self.REPORT_FIELDS is not None and set(self.REPORT_FIELDS) <= set(self.FIELDS):
+            return
+
+        items = [item for item in items.values() if item['cnt'] >= threshold and
+                 isinstance(item['entry'], KibanaRow) and item['entry'].doc_id is not None]
+
+        if not items:
+            return
+
+        documents = self._kibana.get_documents(
+            rows=[item['entry'] for item in items],
+            fields=self.REPORT_FIELDS
+        )
+
+        for item, document in zip(items, documents):
+            if document is not None:
+                item['entry'] = self._merge_entries(document, item['entry'])
+
+    @classmethod
+    def _merge_entries(cls, document, entry):
+        """
+        Merge the entry (possibly modified by _filter and _normalize) into the full document
+
+        :type document dict
+        :type entry dict
+        :rtype: dict
+        """
+        merged = dict(document)
+
+        for key, value in entry.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = cls._merge_entries(merged[key], value)
+            else:
+                merged[key] = value
+
+        return merged
+
     # helper methods
     def _get_url_from_entry(self, entry):
         """
@@ -263,26 +690,44 @@ class KibanaSource(Source):
         """
         return None
 
-    def _update_report(self, report, entry):
+    def _get_kibana_links(self, entry):
         """
-        Add generic links to error specific Kibana dashboard and request trace (by request_id)
+        Return links to error specific Kibana dashboard and request trace (by request_id) for the report description
+
+        :type entry dict
+        :rtype: str
         """
+        links = ''
+
         # call self._get_kibana_url and update the report description if there's a link to custom dashboard
-        kibana_url = self._get_kibana_url(entry)
+        try:
+            kibana_url = self._get_kibana_url(entry)
+        except Exception:
+            self._logger.error('_get_kibana_url raised an exception', exc_info=True)
+            kibana_url = None
 
         if kibana_url is not None:
-            report.append_to_description('\n\n*Still valid?* Check [Kibana dashboard|{url}]'.format(url=kibana_url))
+            links += '\n\n*Still valid?* Check [Kibana dashboard|{url}]'.format(url=kibana_url)
 
         # add a link to request trace using @fields.trace_id (introduced by PLATFORM-1949)
         trace_id = entry.get('@fields', {}).get('trace_id')
 
         if trace_id:
-            report.append_to_description('\n\n*[Request trace for {trace_id}|{url}]*'.format(
+            links += '\n\n*[Request trace for {trace_id}|{url}]*'.format(
                 trace_id=trace_id,
                 url=self.format_kibana_url(
                     query='"{}"'.format(trace_id)
                 )
-            ))
+            )
+
+        return links
+
+    def _update_report(self, report, entry):
+        """
+        Add generic links to error specific Kibana dashboard and request trace (by request_id)
+        """
+        # links are added when the report description is needed (see Report.get_description)
+        report.append_to_description(lambda: self._get_kibana_links(entry))
 
         # set JIRA URL field
         report.set_url(self._get_url_from_entry(entry))
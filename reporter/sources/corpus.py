@@ -0,0 +1,221 @@
+"""
+Record and replay of the data sources responses (log corpora)
+
+Entries returned by elasticsearch and Anemometer are stored in gzipped NDJSON files,
+so that sources can be run offline and repeatably over the same (real) data.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from .kibana import KibanaRow
+
+
+class CorpusError(Exception):
+    """ Raised when there's no corpus recorded for a given query """
+
+
+class CorpusStore(object):
+    """
+    Keeps corpora in a directory - a single file for each source, query and time window
+
+    The first line of each file is a header with the query and the time range it was recorded for,
+    the rest are the entries (one JSON per line). Documents fetched later on (see PaginatedKibana.get_documents)
+    are kept in a separate file for each source.
+
+    When replaying, the time range of the recorded window is used instead of the current one ("frozen clock").
+    """
+    MODE_RECORD = 'record'
+    MODE_REPLAY = 'replay'
+
+    EXTENSION = '.ndjson.gz'
+
+    def __init__(self, path, mode=MODE_REPLAY):
+        """
+        :type path str
+        :type mode str
+        :arg path: directory to keep the corpora in
+        """
+        assert mode in (self.MODE_RECORD, self.MODE_REPLAY), 'Unsupported corpus mode: {}'.format(mode)
+
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._path = path
+        self._mode = mode
+        self._lock = threading.Lock()
+        self._documents = dict()  # source -> {(index, doc_id): document}
+
+        if mode == self.MODE_RECORD and not os.path.isdir(path):
+            os.makedirs(path)
+
+    def is_replaying(self):
+        """
+        :rtype: bool
+        """
+        return self._mode == self.MODE_REPLAY
+
+    def get_path(self, source, query, window=None):
+        """
+        Return the corpus file for a given source, query and time window length
+
+        :type source str
+        :type query object
+        :type window int|None
+        :rtype: str
+        """
+        key = json.dumps([query, window], sort_keys=True)
+
+        return os.path.join(self._path, '{}-{}{}'.format(
+            source, hashlib.md5(key.encode('utf-8')).hexdigest()[:12], self.EXTENSION))
+
+    @staticmethod
+    def _encode_entry(entry):
+        """
+        :type entry dict
+        :rtype: str
+        """
+        if isinstance(entry, KibanaRow):
+            line = {'_source': entry, '_index': entry.index, '_id': entry.doc_id, 'count': entry.count,
+                    'existing_fields': entry.existing_fields}
+        else:
+            line = {'_source': entry}
+
+        return json.dumps(line, default=str)
+
+    @staticmethod
+    def _decode_entry(line):
+        """
+        :type line str
+        :rtype: dict
+        """
+        line = json.loads(line)
+
+        if '_id' in line:
+            return KibanaRow(line['_source'], line['_index'], line['_id'], count=line['count'],
+                             existing_fields=line.get('existing_fields'))
+
+        return line['_source']
+
+    def record(self, source, query, entries, window=None, time_range=None):
+        """
+        Yield given entries and store them in the corpus as they're consumed
+
+        The corpus file is written only when all entries were consumed.
+
+        :type source str
+        :type query object
+        :type entries collections.Iterable[dict]
+        :type window int|None
+        :type time_range tuple[int, int]|None
+        :rtype: collections.Iterable[dict]
+        """
+        path = self.get_path(source, query, window)
+        tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+        recorded = 0
+
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as corpus:
+                corpus.write(json.dumps({
+                    'source': source,
+                    'query': query,
+                    'window': window,
+                    'time_range': time_range,
+                    'recorded_at': int(time.time()),
+                }) + '\n')
+
+                for entry in entries:
+                    corpus.write(self._encode_entry(entry) + '\n')
+                    recorded += 1
+
+                    yield entry
+
+            os.rename(tmp_path, path)
+            self._logger.info('{}: {} entries recorded in {}'.format(source, recorded, path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def get_header(self, source, query, window=None):
+        """
+        Return the header of a recorded corpus (with the time range it was recorded for)
+
+        :type source str
+        :type query object
+        :type window int|None
+        :rtype: dict
+        """
+        path = self.get_path(source, query, window)
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as corpus:
+                return json.loads(corpus.readline())
+        except IOError:
+            raise CorpusError('{}: no corpus recorded for {} query ({} not found)'.format(
+                source, json.dumps(query), path))
+
+    def replay(self, source, query, window=None):
+        """
+        Yield entries recorded for a given query
+
+        :type source str
+        :type query object
+        :type window int|None
+        :rtype: collections.Iterable[dict]
+        """
+        path = self.get_path(source, query, window)
+        self.get_header(source, query, window)
+
+        self._logger.info('{}: replaying entries from {}'.format(source, path))
+
+        with gzip.open(path, 'rt', encoding='utf-8') as corpus:
+            corpus.readline()  # skip the header
+
+            for line in corpus:
+                yield self._decode_entry(line)
+
+    def _get_documents_path(self, source):
+        """
+        :type source str
+        :rtype: str
+        """
+        return os.path.join(self._path, '{}-documents{}'.format(source, self.EXTENSION))
+
+    def record_documents(self, source, rows, documents):
+        """
+        Store documents fetched for given rows (gzip members are appended to the existing file)
+
+        :type source str
+        :type rows list[KibanaRow]
+        :type documents list[dict|None]
+        """
+        with self._lock, gzip.open(self._get_documents_path(source), 'at', encoding='utf-8') as corpus:
+            for row, document in zip(rows, documents):
+                if document is not None:
+                    corpus.write(json.dumps({'_index': row.index, '_id': row.doc_id, '_source': document},
+                                            default=str) + '\n')
+
+    def replay_documents(self, source, rows):
+        """
+        Return documents recorded for given rows (None for the ones that were not recorded)
+
+        :type source str
+        :type rows list[KibanaRow]
+        :rtype: list[dict|None]
+        """
+        with self._lock:
+            if source not in self._documents:
+                self._documents[source] = dict()
+                path = self._get_documents_path(source)
+
+                if os.path.exists(path):
+                    with gzip.open(path, 'rt', encoding='utf-8') as corpus:
+                        for line in corpus:
+                            line = json.loads(line)
+                            self._documents[source][(line['_index'], line['_id'])] = line['_source']
+
+            documents = self._documents[source]
+
+        return [documents.get((row.index, row.doc_id)) for row in rows]
@@ -6,7 +6,7 @@ Report issues from Helios service
 import json
 
 from reporter.reports import Report
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.sources.common import KibanaSource
 
 
@@ -23,6 +23,8 @@ h3. {message}
 
     LIMIT = 10000
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@message']
+
     # use Helios-specific index
     ELASTICSEARCH_INDEX_PREFIX = 'logstash-helios'
 
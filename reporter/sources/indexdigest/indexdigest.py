@@ -40,6 +40,9 @@ h6. Reported by {version} - https://github.com/macbre/index-digest#checks
 
     REPORT_LABEL = 'index-digest'
 
+    # entries are not grouped in elasticsearch, long messages are not indexed as keywords (see AGGREGATION_FIELDS)
+    FIELDS = ['meta.database_name', 'report.type', 'report.table', 'report.message']
+
     def _get_entries(self, query):
         return self._kibana.query_by_string(query=self.ELASTICSEARCH_QUERY, limit=self.LIMIT)
 
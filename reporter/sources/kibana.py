@@ -0,0 +1,422 @@
+"""
+Paginated access to Kibana's elasticsearch
+"""
+import json
+import queue
+import threading
+import time
+
+from wikia_common_kibana import Kibana
+
+
+class KibanaRow(dict):
+    """
+    A row returned by elasticsearch
+
+    It's a dict with the document source that also knows where it comes from,
+    so that we can fetch the rest of the document later on
+    """
+    def __init__(self, source, index=None, doc_id=None, count=1, existing_fields=None):
+        """
+        :type source dict
+        :type index str
+        :type doc_id str
+        :type count int
+        :type existing_fields list[str]
+        :arg count: how many documents this row represents (see PaginatedKibana aggregations)
+        :arg existing_fields: fields checked by elasticsearch to be present in the document (see exists_fields)
+        """
+        super(KibanaRow, self).__init__(source)
+        self.index = index
+        self.doc_id = doc_id
+        self.count = count
+        self.existing_fields = existing_fields or []
+
+
+class PaginatedKibana(Kibana):
+    """
+    Kibana client that yields rows page by page instead of returning a single list
+
+    The next page is fetched in the background while the current one is being processed
+    (up to prefetch_pages are buffered), so the memory usage does not depend on the number of rows fetched.
+    """
+    # how long elasticsearch should keep the scroll context alive between pages
+    SCROLL_TIMEOUT = '5m'
+
+    # log the progress every N pages
+    PROGRESS_EVERY = 10
+
+    # strip the envelope metadata that we do not use from elasticsearch responses, see
+    # https://www.elastic.co/guide/en/elasticsearch/reference/6.8/common-options.html#common-options-response-filtering
+    FILTER_PATH = '_scroll_id,hits.total,hits.hits._index,hits.hits._id,hits.hits._source,hits.hits.matched_queries'
+
+    # how many documents to get in a single multi-get request
+    MGET_BATCH_SIZE = 100
+
+    # text fields are indexed with "keyword" sub-field by logstash index template, we need it for aggregations
+    KEYWORD_SUFFIX = '.keyword'
+
+    def __init__(self, prefetch_pages=1, fields=None, aggregate_by=None, corpus=None, corpus_name=None,
+                 exists_fields=None, **kwargs):
+        """
+        :type prefetch_pages int
+        :type fields list[str] or None
+        :type aggregate_by list[str] or None
+        :type corpus reporter.sources.corpus.CorpusStore
+        :type corpus_name str
+        :type exists_fields list[str] or None
+        :arg prefetch_pages: how many pages can be buffered while the current one is processed
+        :arg fields: fields to be returned when not specified by get_rows() / query_by_string() call
+        :arg aggregate_by: group documents by these fields in elasticsearch and return one row per group
+        :arg corpus: record rows returned by elasticsearch or replay the recorded ones
+        :arg corpus_name: name the corpora are recorded under (e.g. the source class name)
+        :arg exists_fields: check if documents have these fields without fetching them (see KibanaRow.existing_fields)
+        :arg kwargs: passed to wikia_common_kibana.Kibana (the page size is set by batch_size)
+        """
+        super(PaginatedKibana, self).__init__(**kwargs)
+        self._prefetch_pages = prefetch_pages
+        self._fields = fields
+        self._aggregate_by = aggregate_by
+        self._exists_fields = exists_fields
+        self._corpus = corpus
+        self._corpus_name = corpus_name or kwargs.get('index_prefix', 'kibana')
+        self._pages = []
+
+    def get_pages_stats(self):
+        """
+        Return rows count and fetch time (in seconds) of every page fetched so far
+
+        :rtype: list[dict]
+        """
+        return self._pages
+
+    def get_time_range(self):
+        """
+        Return UNIX timestamps of the time range the documents are queried for
+
+        :rtype: tuple[int, int]
+        """
+        return self._since, self._to
+
+    def set_since(self, since):
+        """
+        Move the lower boundary of the time range (e.g. to continue from the previous fetch)
+
+        :type since int
+        """
+        self._since = since
+        self._logger.info("Querying for messages from between %s and %s",
+                          self.format_timestamp(self._since), self.format_timestamp(self._to))
+
+    def _get_timestamp_filer(self):
+        """
+        Query for the time range excluding its upper boundary, the next fetch starts there (see set_since)
+
+        :rtype: dict
+        """
+        return {
+            "range": {
+                "@timestamp": {
+                    "gte": self.format_timestamp(self._since),
+                    "lt": self.format_timestamp(self._to)
+                }
+            }
+        }
+
+    def _get_search_body(self, query, fields=None, sampling=None):
+        """
+        :type query object
+        :type fields list[str] or None
+        :type sampling int or None
+        :rtype: dict
+        """
+        body = {
+            "query": {
+                "bool": {
+                    "must": [
+                        query,
+                        self._get_timestamp_filer(),
+                    ]
+                }
+            }
+        }
+
+        # @see https://www.elastic.co/guide/en/elasticsearch/reference/current/search-request-source-filtering.html
+        if fields:
+            body['_source'] = {
+                "includes": fields
+            }
+
+        # named queries are reported back in matched_queries of each hit, they do not filter the results
+        # @see https://www.elastic.co/guide/en/elasticsearch/reference/6.8/search-request-named-queries-and-filters.html
+        if self._exists_fields:
+            body['query']['bool']['should'] = [
+                {'exists': {'field': field, '_name': field}} for field in self._exists_fields
+            ]
+
+        # sample the results if needed
+        if sampling is not None:
+            body['query']['bool']['must'].append({
+                'script': {
+                    'script': {
+                        'lang': 'painless',
+                        'source': "Math.abs(doc['_id'].value.hashCode()) % 100 < params.sampling",
+                        'params': {
+                            'sampling': sampling
+                        }
+                    }
+                }
+            })
+
+        return body
+
+    def _get_pages(self, body, limit):
+        """
+        Use Scroll API to fetch the results page by page
+
+        :type body dict
+        :type limit int
+        :rtype: collections.Iterable[list]
+        """
+        fetched = 0
+        started = time.time()
+
+        # return the next batch of results from every shard that still has results to return
+        resp = self._es.search(
+            index=self._index, body=body, scroll=self.SCROLL_TIMEOUT, size=self._batch_size, sort='_doc',
+            filter_path=self.FILTER_PATH)
+
+        while True:
+            # filter_path removes "hits" entry when there are no results
+            hits = resp.get('hits', {}).get('hits', [])
+            total = resp.get('hits', {}).get('total', 0)
+
+            # ES 7.x returns an object here (with a lower bound only for large result sets)
+            if isinstance(total, dict):
+                total = total.get('value') if total.get('relation') == 'eq' else limit
+
+            total = min(total, limit)
+
+            page = [KibanaRow(hit['_source'], hit.get('_index'), hit.get('_id'),
+                              existing_fields=hit.get('matched_queries')) for hit in hits[:limit - fetched]]
+            fetched += len(page)
+
+            self._pages.append({'rows': len(page), 'time': time.time() - started})
+            self._logger.debug('Page #{:d}: {:d} rows fetched in {:.3f} sec'.format(
+                len(self._pages), len(page), self._pages[-1]['time']))
+
+            if len(self._pages) % self.PROGRESS_EVERY == 0:
+                self._logger.info('{:d} of {:d} rows fetched ({:d} pages so far)'.format(
+                    fetched, total, len(self._pages)))
+
+            if page:
+                yield page
+
+            if not hits or fetched >= total or not resp.get('_scroll_id'):
+                break
+
+            # clear_scroll is not called as it causes "403 Forbidden: You don't have access to this resource"
+            started = time.time()
+            resp = self._es.scroll(
+                scroll_id=resp['_scroll_id'], scroll=self.SCROLL_TIMEOUT, filter_path=self.FILTER_PATH)
+
+        self._logger.info("{:d} rows returned".format(fetched))
+
+    def _get_aggregation_pages(self, body, limit):
+        """
+        Use composite aggregation to group matching documents by self._aggregate_by fields
+
+        A single row is returned for each group - the representative document (fetched using top_hits)
+        with the number of documents in the group.
+
+        @see
+        https://www.elastic.co/guide/en/elasticsearch/reference/6.8/search-aggregations-bucket-composite-aggregation.html
+
+        :type body dict
+        :type limit int
+        :rtype: collections.Iterable[list]
+        """
+        top_hits = {'size': 1}
+
+        if '_source' in body:
+            top_hits['_source'] = body.pop('_source')
+
+        body['size'] = 0
+        body['aggregations'] = {
+            'groups': {
+                'composite': {
+                    'size': self._batch_size,
+                    'sources': [
+                        # include documents without the field as well (ES 6.4+)
+                        {field: {'terms': {'field': field + self.KEYWORD_SUFFIX, 'missing_bucket': True}}}
+                        for field in self._aggregate_by
+                    ]
+                },
+                'aggregations': {
+                    'entry': {
+                        'top_hits': top_hits
+                    }
+                }
+            }
+        }
+
+        fetched = 0
+        documents = 0
+
+        while fetched < limit:
+            started = time.time()
+            resp = self._es.search(index=self._index, body=body)
+
+            aggregation = resp['aggregations']['groups']
+            page = []
+
+            for bucket in aggregation['buckets'][:limit - fetched]:
+                hit = bucket['entry']['hits']['hits'][0]
+                page.append(KibanaRow(hit['_source'], hit.get('_index'), hit.get('_id'), count=bucket['doc_count'],
+                                      existing_fields=hit.get('matched_queries')))
+
+            fetched += len(page)
+            documents += sum(row.count for row in page)
+
+            self._pages.append({'rows': len(page), 'time': time.time() - started})
+            self._logger.debug('Page #{:d}: {:d} groups fetched in {:.3f} sec'.format(
+                len(self._pages), len(page), self._pages[-1]['time']))
+
+            if page:
+                yield page
+
+            if not aggregation.get('after_key') or len(aggregation['buckets']) < self._batch_size:
+                break
+
+            body['aggregations']['groups']['composite']['after'] = aggregation['after_key']
+
+        self._logger.info("{:d} groups returned (for {:d} documents)".format(fetched, documents))
+
+    def _search(self, query, fields=None, limit=50000, sampling=None):
+        """
+        Perform the search and return an iterator over raw rows
+
+        When the corpus is set, rows are recorded or replayed (with the recorded time range set) instead.
+
+        :type query object
+        :type fields list[str] or None
+        :type limit int
+        :type sampling int or None
+        :rtype: collections.Iterable[KibanaRow]
+        """
+        if self._corpus is None:
+            return self._search_rows(query, fields, limit, sampling)
+
+        corpus_query = {
+            'query': query,
+            'fields': fields or self._fields,
+            'aggregate_by': self._aggregate_by,
+            'limit': limit,
+            'sampling': sampling,
+        }
+        window = self._to - self._since
+
+        # keep corpora recorded without it valid
+        if self._exists_fields:
+            corpus_query['exists_fields'] = self._exists_fields
+
+        if self._corpus.is_replaying():
+            (self._since, self._to) = self._corpus.get_header(self._corpus_name, corpus_query, window)['time_range']
+            return self._corpus.replay(self._corpus_name, corpus_query, window)
+
+        return self._corpus.record(self._corpus_name, corpus_query, self._search_rows(query, fields, limit, sampling),
+                                   window=window, time_range=(self._since, self._to))
+
+    def _search_rows(self, query, fields=None, limit=50000, sampling=None):
+        """
+        Perform the search and yield raw rows
+
+        :type query object
+        :type fields list[str] or None
+        :type limit int
+        :type sampling int or None
+
+        :arg sampling: Percentage of results to be returned (0,100)
+
+        :rtype: collections.Iterable[KibanaRow]
+        """
+        body = self._get_search_body(query, fields or self._fields, sampling)
+        self._logger.debug("Running {} query (limit set to {:d})".format(json.dumps(body), limit))
+
+        if self._aggregate_by:
+            pages_iterator = self._get_aggregation_pages(body, limit)
+        else:
+            pages_iterator = self._get_pages(body, limit)
+
+        pages = queue.Queue(maxsize=self._prefetch_pages)
+        stop = threading.Event()
+
+        def _put(item):
+            # wait for the free slot in the buffer unless the consumer is gone
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    pass
+
+            return False
+
+        def _producer():
+            try:
+                for page in pages_iterator:
+                    if not _put(page):
+                        return
+
+                _put(None)
+            except Exception as ex:  # pass it to the consumer
+                _put(ex)
+
+        thread = threading.Thread(target=_producer, name='kibana-pages', daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                page = pages.get()
+
+                if page is None:
+                    break
+                elif isinstance(page, Exception):
+                    raise page
+
+                for row in page:
+                    yield row
+        finally:
+            stop.set()
+
+    def get_documents(self, rows, fields=None):
+        """
+        Fetch (selected fields of) documents for given rows using multi-get API
+
+        Returns a list of documents sources (None if the document is no longer there) in the same order.
+
+        :type rows list[KibanaRow]
+        :type fields list[str] or None
+        :rtype: list[dict|None]
+        """
+        if self._corpus is not None and self._corpus.is_replaying():
+            return self._corpus.replay_documents(self._corpus_name, rows)
+
+        documents = []
+        source = {'includes': fields} if fields else True
+
+        for offset in range(0, len(rows), self.MGET_BATCH_SIZE):
+            batch = rows[offset:offset + self.MGET_BATCH_SIZE]
+
+            resp = self._es.mget(body={
+                'docs': [{'_index': row.index, '_id': row.doc_id, '_source': source} for row in batch]
+            })
+
+            documents += [doc.get('_source') if doc.get('found') else None for doc in resp['docs']]
+
+        self._logger.info("{:d} documents fetched".format(len(documents)))
+
+        if self._corpus is not None:
+            self._corpus.record_documents(self._corpus_name, rows, documents)
+
+        return documents
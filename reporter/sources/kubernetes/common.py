@@ -29,6 +29,9 @@ h3. Details
 
     EVENT_MESSAGE = False
 
+    FIELDS = ['involvedObject.name']
+    AGGREGATION_FIELDS = FIELDS
+
     def _get_entries(self, query):
         """ Return entries matching given query """
         assert self.EVENT_MESSAGE is not False, 'You need to specif EVENT_MESSAGE in your class'
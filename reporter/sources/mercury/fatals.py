@@ -8,12 +8,17 @@ class MercurySource(MercuryLogsSource):
     """ Get Mercury errors (of the specified severity) from elasticsearch """
     REPORT_LABEL = 'MercuryErrors'
 
+    FIELDS = ['namespace', 'msg', 'severity', '@source_host', '@fields.environment']
+
+    def _get_query_string(self, query):
+        return '@message:* AND severity: "{}" AND @source_host: /[sr].*/'.format(query)
+
     def _get_entries(self, query):
         """ Return entries matching given severity """
-        return self._kibana.query_by_string(
-            query='@message:* AND severity: "{}" AND @source_host: /[sr].*/'.format(query),
-            limit=self.LIMIT
-        )
+        return self._kibana.query_by_string(query=self._get_query_string(query), limit=self.LIMIT)
+
+    def _match(self, entry, query):
+        return entry.get('severity') == query
 
     def _filter(self, entry):
         return True
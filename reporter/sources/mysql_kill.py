@@ -43,14 +43,14 @@ This query is dead. This query is no more.
     LIMIT = 1000
 
     FIELDS = ['@source_host', 'query', 'query_class', 'query_client', 'query_time', 'db', 'client']
+    REPORT_FIELDS = FIELDS
 
     def _get_entries(self, query):
         """ mysql-kill log """
         # @see https://kibana.wikia-inc.com/#/dashboard/elasticsearch/drozdo.pt-kill
         return self._kibana.query_by_string(
             query='program:"mysql-killer" AND query:*',
-            limit=self.LIMIT,
-            fields=self.FIELDS
+            limit=self.LIMIT
         )
 
     def _filter(self, entry):
@@ -0,0 +1,87 @@
+"""
+Normalization rules compiled once (when a source class is loaded) and applied to log messages
+"""
+import re
+
+
+class NormalizationRules(object):
+    """
+    A list of regular expressions based replacements applied to a message one after another
+
+    Each step is a list of (pattern, replacement[, flags]) rules. Rules of a single step are fused
+    into one alternation pattern and applied in a single pass over the message, so put rules into
+    the same step only when they do not depend on each other's results (i.e. they do not overlap).
+    When rules match at the same position, the first one wins.
+
+    rules = NormalizationRules(
+        [
+            (r'\\d+ bytes', 'N bytes'),
+            (r'offset \\d+', 'offset N'),
+        ],
+        [
+            (r'Stack trace:(.*)', '', re.MULTILINE),
+        ],
+    )
+
+    rules.apply('Failed to read 42 bytes at offset 1024')  # Failed to read N bytes at offset N
+    """
+    # flags that can be scoped to a part of a fused pattern
+    # @see https://docs.python.org/3/library/re.html#regular-expression-syntax "(?aiLmsux-imsx:...)"
+    SCOPED_FLAGS = (
+        (re.IGNORECASE, 'i'),
+        (re.MULTILINE, 'm'),
+        (re.DOTALL, 's'),
+        (re.VERBOSE, 'x'),
+    )
+
+    def __init__(self, *steps):
+        """
+        :type steps list[tuple]
+        """
+        self._steps = [self._compile_step(rules) for rules in steps]
+
+    @classmethod
+    def _compile_step(cls, rules):
+        """
+        :type rules list[tuple]
+        :rtype: tuple
+        """
+        rules = [(rule[0], rule[1], rule[2] if len(rule) > 2 else 0) for rule in rules]
+
+        # a single rule is applied using the replacement template
+        if len(rules) == 1:
+            (pattern, replacement, flags) = rules[0]
+            return re.compile(pattern, flags), replacement
+
+        # fused rules replace matches with the literal text
+        patterns = []
+        replacements = dict()
+
+        for idx, (pattern, replacement, flags) in enumerate(rules):
+            assert '\\' not in replacement, 'Fused rules can not use backreferences: {}'.format(replacement)
+
+            scoped_flags = ''.join(flag for (value, flag) in cls.SCOPED_FLAGS if flags & value)
+            assert flags & ~sum(value for (value, _) in cls.SCOPED_FLAGS) == 0, \
+                'Unsupported flags for fused rule: {}'.format(pattern)
+
+            if scoped_flags:
+                pattern = '(?{}:{})'.format(scoped_flags, pattern)
+
+            name = 'rule{}'.format(idx)
+            patterns.append('(?P<{}>{})'.format(name, pattern))
+            replacements[name] = replacement
+
+        # the outer named group is the last one closed when a rule matches
+        return re.compile('|'.join(patterns)), lambda match: replacements[match.lastgroup]
+
+    def apply(self, message):
+        """
+        Return the message with all the rules applied
+
+        :type message str
+        :rtype: str
+        """
+        for (pattern, replacement) in self._steps:
+            message = pattern.sub(replacement, message)
+
+        return message
@@ -1,6 +1,5 @@
-import re
-
 from reporter.reports import Report
+from reporter.sources.normalization import NormalizationRules
 from reporter.sources.pandora.common import PandoraLogsSource
 
 
@@ -8,6 +7,27 @@ class PandoraErrorsSource(PandoraLogsSource):
     """ Get Pandora errors from elasticsearch """
     REPORT_LABEL = 'PandoraErrors'
 
+    FIELDS = ['rawLevel', 'rawMessage', 'appname', 'logger_name']
+
+    NORMALIZE_FIELDS = ['rawMessage', 'logger_name', 'appname']
+
+    # each rule depends on the result of the previous one
+    NORMALIZE_RULES = NormalizationRules(
+        # normalize hashes
+        [(r'[a-f0-9-]{4,}', 'HASH')],
+
+        # normalize numeric values
+        [(r'\d+', 'N')],
+
+        # normalize URLs
+        # Exception purging https://services.fandom.com/user-attribute/user/5430694
+        [(r'https?://[^\s]+', '<URL>')],
+
+        # remove JSON
+        # error while sending: {"args":{"prevRevision":false
+        [(r'{.*}$', '{json here}')],
+    )
+
     def _get_entries(self, query):
         """ Return matching entries by given prefix """
         return self._kibana.query_by_string(
@@ -56,19 +76,7 @@ class PandoraErrorsSource(PandoraLogsSource):
         logger_name = entry.get('logger_name')
         app_name = entry.get('appname')
 
-        # normalize hashes
-        message = re.sub(r'[a-f0-9-]{4,}', 'HASH', message)
-
-        # normalize numeric values
-        message = re.sub(r'\d+', 'N', message)
-
-        # normalize URLs
-        # Exception purging https://services.fandom.com/user-attribute/user/5430694
-        message = re.sub(r'https?://[^\s]+', '<URL>', message)
-
-        # remove JSON
-        # error while sending: {"args":{"prevRevision":false
-        message = re.sub(r'{.*}$', '{json here}', message)
+        message = self.NORMALIZE_RULES.apply(message)
 
         return 'Pandora-{}-{}-{}'.format(message, logger_name, app_name)
 
@@ -1,5 +1,6 @@
 # expose all PHP-related sources
 from .assertions import PHPAssertionsSource
+from .coordinator import PHPLogsCoordinator
 from .db import DBQueryErrorsSource, DBQueryNoLimitSource
 from .errors import PHPErrorsSource
 from .exceptions import PHPExceptionsSource, PHPTypeErrorsSource
@@ -1,8 +1,8 @@
 import json
-import re
 
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
+from reporter.sources.normalization import NormalizationRules
 from reporter.sources.php.common import PHPLogsSource
 
 
@@ -12,6 +12,45 @@ class PHPAssertionsSource(PHPLogsSource):
     """
     REPORT_LABEL = 'PHPAssertion'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@exception.class', '@exception.message']
+
+    NORMALIZE_FIELDS = ['@exception.class', '@exception.message']
+
+    EXCEPTION_CLASS = 'Wikia\\Util\\AssertionException'
+
+    NORMALIZE_RULES = NormalizationRules(
+        [
+            # remove PHP-encoded data
+            # a:26:{s:3:"url";...s:10:"local_port";i:0;}
+            (r'a:\d+:{.*;}', ''),
+        ],
+        [
+            # normalize services timeout errors
+            (r'API call to /[^ ]+ timed out', 'API call to /X timed out'),
+        ],
+        [
+            (r'after \d+ milliseconds with \d+ bytes', 'after N milliseconds with N bytes'),
+        ],
+        [
+            # normalize user attributes URLs
+            (r'/attr/\w+', '/attr/X'),
+        ],
+        [
+            # {"title":"Attribute UserProfilePagesV3_birthday not found for user 26816594","status":404}
+            (r'Attribute [^\s]+ not found for user \d+', 'Attribute X not found for user N'),
+        ],
+        [
+            # [404] Error connecting to the API (10.8.74.17:31440/user/28883525/attr/UserProfilePagesV3_birthday)
+            (r'\d+.\d+.\d+.\d+:\d+', 'N.N.N.N:N'),  # normalize IP addresses
+        ],
+        [
+            (r'/\d+', '/N'),  # normalize user ID
+
+            # SASS compilation failed. Check PHP error log for more information. Error ID: qjiyzrao131pe600
+            (r'Error ID: [0-9a-z]+', 'Error ID: X'),  # normalize error hash
+        ],
+    )
+
     FULL_MESSAGE_TEMPLATE = """
 h1. {assertion}
 
@@ -24,7 +63,13 @@ h5. Backtrace
     def _get_entries(self, query):
         """ Return failed assertions logs """
         # @see http://www.solrtutorial.com/solr-query-syntax.html
-        return self._kibana.get_rows(match={"@exception.class": "Wikia\\Util\\AssertionException"}, limit=self.LIMIT)
+        return self._kibana.get_rows(match={"@exception.class": self.EXCEPTION_CLASS}, limit=self.LIMIT)
+
+    def _get_query_string(self, query):
+        return self._get_exception_class_query_string(self.EXCEPTION_CLASS)
+
+    def _match(self, entry, query):
+        return self._get_exception_class(entry) == self.EXCEPTION_CLASS
 
     def _filter(self, entry):
         return is_from_production_host(entry)
@@ -32,30 +77,7 @@ h5. Backtrace
     def _normalize(self, entry):
         """ Normalize using the assertion class and message """
         exception = entry.get('@exception', {})
-        message = exception.get('message')
-
-        # remove PHP-encoded data
-        # a:26:{s:3:"url";...s:10:"local_port";i:0;}
-        message = re.sub(r'a:\d+:{.*;}', '', message)
-
-        # normalize services timeout errors
-        message = re.sub(r'API call to /[^ ]+ timed out', 'API call to /X timed out', message)
-        message = re.sub(r'after \d+ milliseconds with \d+ bytes', 'after N milliseconds with N bytes', message)
-
-        # normalize user attributes URLs
-        message = re.sub(r'/attr/\w+', '/attr/X', message)
-
-        # {"title":"Attribute UserProfilePagesV3_birthday not found for user 26816594","status":404}
-        message = re.sub(r'Attribute [^\s]+ not found for user \d+', 'Attribute X not found for user N', message)
-
-        # [404] Error connecting to the API (10.8.74.17:31440/user/28883525/attr/UserProfilePagesV3_birthday)
-        message = re.sub(r'\d+.\d+.\d+.\d+:\d+', 'N.N.N.N:N', message)  # normalize IP addresses
-        message = re.sub(r'/\d+', '/N', message)  # normalize user ID
-
-        # SASS compilation failed. Check PHP error log for more information. Error ID: qjiyzrao131pe600
-        message = re.sub(r'Error ID: [0-9a-z]+', 'Error ID: X', message)  # normalize error hash
-
-        message = message.strip(': ')
+        message = self.NORMALIZE_RULES.apply(exception.get('message')).strip(': ')
 
         return '{}-{}'.format(exception.get('class'), message)
 
@@ -68,7 +90,8 @@ h5. Backtrace
         exception = entry.get('@exception', {})
 
         return self.format_kibana_url(
-            query='@exception.class: "Wikia\\Util\AssertionException" AND @exception.message:"{}"'.format(exception.get('message')),
+            query='@exception.class: "Wikia\\Util\AssertionException" AND @exception.message:"{}"'.format(
+                exception.get('message')),
             columns=['@timestamp', '@source_host', '@fields.http_url']
         )
 
@@ -24,6 +24,17 @@ class PHPLogsSource(KibanaSource):
     # use MediaWiki-specific index
     ELASTICSEARCH_INDEX_PREFIX = 'logstash-mediawiki'
 
+    @staticmethod
+    def _get_exception_class_query_string(exception_class):
+        """ Match entries with a given exception class (backslashes in namespaced classes need to be escaped) """
+        return '@exception.class: "{}"'.format(exception_class.replace('\\', '\\\\'))
+
+    @staticmethod
+    def _get_exception_class(entry):
+        """ Return the class of an exception logged with a given entry """
+        exception = entry.get('@exception')
+        return exception.get('class') if isinstance(exception, dict) else None
+
     @staticmethod
     def _normalize_trace(trace):
         """
@@ -0,0 +1,148 @@
+"""
+Fetches logstash-mediawiki entries once for multiple PHP logs sources
+"""
+import copy
+
+from .common import PHPLogsSource
+
+
+class PHPLogsCoordinator(PHPLogsSource):
+    """
+    Runs a single elasticsearch scan for the union of given sources queries
+
+    Each entry is then routed to every source (and query) it matches (see Source.match)
+    and passes through that source's filter and normalize stages (see Source.add_entry).
+    Reports are generated by each source with its own threshold applied.
+
+    All sources are queried for the same period.
+    """
+    def __init__(self, sources, period=3600, page_size=None, corpus=None, es_host=None):
+        """
+        :type sources list[tuple[type, list[tuple[str, int]]]]
+        :type period int
+        :type page_size int
+        :type corpus reporter.sources.corpus.CorpusStore
+        :type es_host str
+        :arg sources: list of (source class, [(query, threshold), ...]) tuples
+        """
+        self._sources = [
+            (source_class(period=period, page_size=page_size, corpus=corpus, es_host=es_host), queries)
+            for (source_class, queries) in sources
+        ]
+
+        # fetch fields needed by all sources
+        fields = [source.FIELDS for (source, _) in self._sources]
+        self.FIELDS = None if None in fields else sorted(set(sum(fields, [])))
+
+        exists_fields = [source.EXISTS_FIELDS or [] for (source, _) in self._sources]
+        self.EXISTS_FIELDS = sorted(set(sum(exists_fields, []))) or None
+
+        super(PHPLogsCoordinator, self).__init__(period=period, page_size=page_size, corpus=corpus, es_host=es_host)
+
+    def _get_entries(self, query):
+        """
+        Send a query matching any of the sources queries to elasticsearch
+
+        At most as many entries are fetched as all sources would fetch when run one by one.
+        """
+        query_strings = [
+            '({})'.format(source.get_query_string(source_query))
+            for (source, queries) in self._sources for (source_query, _) in queries
+        ]
+
+        limit = sum(source.LIMIT * len(queries) for (source, queries) in self._sources)
+
+        return self._kibana.query_by_string(query=' OR '.join(query_strings), limit=limit)
+
+    def query(self, query='', threshold=50):
+        """
+        Fetch entries for all sources and return reports generated by each of them
+
+        Query and threshold are set for each source separately (see the constructor).
+        A source that raised an exception is skipped, the rest of them are not affected.
+        """
+        self._logger.info("Sources: {}".format(', '.join(
+            "{}({})".format(source.__class__.__name__, ', '.join("'{}'".format(q) for (q, _) in queries))
+            for (source, queries) in self._sources
+        )))
+
+        # matched entries, normalized entries and filtered entries count for each source query
+        matched = [[0] * len(queries) for (_, queries) in self._sources]
+        normalized = [[dict() for _ in queries] for (_, queries) in self._sources]
+        filtered = [[0] * len(queries) for (_, queries) in self._sources]
+
+        # sources that raised an exception
+        failed = set()
+
+        try:
+            for entry in self._get_entries(query):
+                self._route_entry(entry, matched, normalized, filtered, failed)
+
+                # stop when every query got as many entries as its source would fetch
+                if all(cnt >= source.LIMIT for (source, _), counts in zip(self._sources, matched) for cnt in counts):
+                    self._logger.info('All queries reached their limits')
+                    break
+        except Exception:
+            self._logger.error('self._get_entries raised an exception', exc_info=True)
+            return []
+
+        reports = []
+
+        for idx, (source, queries) in enumerate(self._sources):
+            if idx in failed:
+                continue
+
+            for query_idx, (source_query, source_threshold) in enumerate(queries):
+                self._logger.info("{}: query '{}' - got {} entries after filtering (grouped into {} items)".format(
+                    source.__class__.__name__, source_query, filtered[idx][query_idx], len(normalized[idx][query_idx])))
+
+                try:
+                    reports += source.get_reports(normalized[idx][query_idx], source_threshold)
+                except Exception:
+                    self._logger.error('{}: get_reports raised an exception'.format(
+                        source.__class__.__name__), exc_info=True)
+
+        return reports
+
+    def _route_entry(self, entry, matched, normalized, filtered, failed):
+        """
+        Pass the entry to all sources that match it
+
+        Sources can modify the entry when filtering and normalizing it, hence each one gets its own copy.
+        Each source query gets at most LIMIT entries, so that a noisy query does not take over the rest of them.
+
+        :type entry dict
+        :type matched list[list[int]]
+        :type normalized list[list[dict]]
+        :type filtered list[list[int]]
+        :type failed set[int]
+        """
+        matches = []
+
+        for idx, (source, queries) in enumerate(self._sources):
+            if idx in failed:
+                continue
+
+            matching = [query_idx for query_idx, (source_query, _) in enumerate(queries)
+                        if matched[idx][query_idx] < source.LIMIT and source.match(entry, source_query)]
+
+            if matching:
+                matches.append((idx, matching))
+
+        for match_idx, (idx, matching) in enumerate(matches):
+            source = self._sources[idx][0]
+            source_entry = entry if match_idx == len(matches) - 1 else copy.deepcopy(entry)
+
+            for query_idx in matching:
+                matched[idx][query_idx] += 1
+
+            try:
+                cnt = source.add_entry(source_entry, [normalized[idx][query_idx] for query_idx in matching])
+            except Exception:
+                self._logger.error('{}: failed to process the entry, skipping this source'.format(
+                    source.__class__.__name__), exc_info=True)
+                failed.add(idx)
+                continue
+
+            for query_idx in matching:
+                filtered[idx][query_idx] += cnt
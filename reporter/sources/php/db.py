@@ -1,7 +1,7 @@
 import json
 import re
 
-from reporter.helpers import generalize_sql, is_from_production_host
+from reporter.helpers import generalize_sql, is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
 from reporter.sources.php.common import PHPLogsSource
 
@@ -10,6 +10,10 @@ class DBQueryErrorsSource(PHPLogsSource):
     """ Get DB errors triggered by PHP application from elasticsearch """
     REPORT_LABEL = 'DBQueryErrors'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@exception.class', '@exception.message', '@context.errno', '@context.err']
+
+    EXCEPTION_CLASS = 'DBQueryError'
+
     FULL_MESSAGE_TEMPLATE = """
 *Function*: {function}
 *DB server*: {server}
@@ -39,7 +43,13 @@ h3. Backtrace
 
     def _get_entries(self, query):
         """ Return matching exception logs """
-        return self._kibana.get_rows(match={"@exception.class": 'DBQueryError'}, limit=self.LIMIT)
+        return self._kibana.get_rows(match={"@exception.class": self.EXCEPTION_CLASS}, limit=self.LIMIT)
+
+    def _get_query_string(self, query):
+        return self._get_exception_class_query_string(self.EXCEPTION_CLASS)
+
+    def _match(self, entry, query):
+        return self._get_exception_class(entry) == self.EXCEPTION_CLASS
 
     def _filter(self, entry):
         """ Remove log entries that are not coming from production datacenters """
@@ -221,6 +231,8 @@ class DBQueryNoLimitSource(DBQueriesLogsSource):
     """ Get DB queries that return excessive number of rows """
     REPORT_LABEL = 'DBQueryNoLimit'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@message', '@context.num_rows', '@context.method']
+
     ROWS_THRESHOLD = 2000
 
     FULL_MESSAGE_TEMPLATE = """
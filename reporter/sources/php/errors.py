@@ -2,8 +2,9 @@ import json
 import re
 import urllib.request, urllib.parse, urllib.error
 
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
+from reporter.sources.normalization import NormalizationRules
 from reporter.sources.php.common import PHPLogsSource
 
 
@@ -11,9 +12,109 @@ class PHPErrorsSource(PHPLogsSource):
     """ Get PHP errors from elasticsearch """
     REPORT_LABEL = 'PHPErrors'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@message', '@source_host', '@fields.http_url']
+
+    NORMALIZE_FIELDS = ['@message'] + PHPLogsSource.ENV_FIELDS
+
+    NORMALIZE_RULES = NormalizationRules(
+        [
+            # remove exception prefix
+            # Exception from line 141 of /includes/wikia/nirvana/WikiaView.class.php:
+            (r'Exception from line \d+ of [^:]+:', 'Exception:'),
+        ],
+        [
+
+            # remove HTTP adresses
+            # Missing or invalid pubid from http://dragonball.wikia.com/__varnish_liftium/config in
+            # /var/www/liftium/delivery/config.php on line 17
+            (r'https?://[^\s]+', '<URL>'),
+        ],
+        [
+
+            # remove release-specific part
+            # /usr/wikia/slot1/3006/src
+            (r'/usr/wikia/slot1/\d+(/src)?', ''),
+            # /data/deploytools/build/wikia.foo/src
+            (r'/data/deploytools/build/wikia.[^/]+/src', ''),
+        ],
+        [
+
+            # remove DOMDocument::loadHTML() errors details
+            # Tag figure invalid in Entity, line: 286
+            # Unexpected end tag : p in Entity, line: 82
+            (r'DOMDocument::loadHTML\(\): [^,]+, line: \d+', 'DOMDocument::loadHTML(): X, line: N'),
+        ],
+        [
+            # remove popen() arguments
+            (r'popen\([^\)]+\)', 'popen(X)'),
+        ],
+        [
+            # remove exec arguments
+            (r'Unable to fork \[[^\]]+\]', 'Unable to fork [X]'),
+        ],
+        [
+
+            # normalize /tmp and /images paths
+            (r'/tmp/\w+', '/tmp/X'),
+            (r'\(/images/[^)]+\)', '(/images/X)'),
+        ],
+        [
+            # normalize swift paths
+            (r'mwstore://swift-backend/[^ ]+', 'mwstore://swift-backend/X'),
+        ],
+        [
+
+            # normalize preg_match() related warnings
+            (r'Unknown modifier \'\w+\'', 'Unknown modifier X'),
+            (r'Compilation failed: unmatched parentheses at offset \d+',
+             'Compilation failed: unmatched parentheses at offset N'),
+
+            # normalize "17956864 bytes" and "offset 65532
+            (r'\d+ bytes', 'N bytes'),
+            (r'offset \d+', 'offset N'),
+
+            # normalize fatals (PLATFORM-1463)
+            (r'PHP Fatal Error:\s+', 'PHP Fatal Error: ', re.IGNORECASE),
+            (r'PHP Notice:\s+', 'PHP Notice: '),
+        ],
+        [
+            # remove long backtraces from error message
+            (r'\s?Stack trace:(.*)\{main\}\s?', '', re.MULTILINE),
+        ],
+        [
+            # remove line number from simple_html_dom.php fatal errors
+            (r'simplehtmldom/simple_html_dom.php on line \d+', 'simplehtmldom/simple_html_dom.php'),
+
+            # remove index name / offset from notices
+            (r'Undefined index: [^\s]+ in', 'Undefined index: X in'),
+            (r'Undefined offset: \d+ in', 'Undefined offset: N in'),
+
+            # remove moving part of <!--LINK 0:459-->
+            (r'<!--LINK \d+:\d+-->', '<!--LINK N:N-->'),
+
+            # remove PID from "Error while sending QUERY packet." warnings
+            (r'Error while sending \w+ packet. PID=\d+', 'Error while sending X packet. PID=N'),
+
+            # FD_SETSIZE.It is set to 1024, but you have descriptors numbered at least as high as 2279.
+            (r'descriptors numbered at least as high as \d+', 'descriptors numbered at least as high as N'),
+            (r'--enable-fd-setsize=\d+', '--enable-fd-setsize=N'),
+        ],
+    )
+
+    def _get_query_string(self, query):
+        return '@message:"^{}"'.format(query)
+
     def _get_entries(self, query):
         """ Return matching entries by given prefix """
-        return self._kibana.query_by_string(query='@message:"^{}"'.format(query), limit=self.LIMIT)
+        return self._kibana.query_by_string(query=self._get_query_string(query), limit=self.LIMIT)
+
+    def _match(self, entry, query):
+        """ Match the phrase the way elasticsearch does it for the analyzed @message field """
+        return re.search(
+            r'\b' + r'\W+'.join(re.escape(word) for word in re.findall(r'\w+', query)) + r'\b',
+            entry.get('@message', ''),
+            flags=re.IGNORECASE
+        ) is not None
 
     def _filter(self, entry):
         """ Remove log entries that are not coming from main DC or lack key information """
@@ -51,7 +152,8 @@ class PHPErrorsSource(PHPLogsSource):
             host_regexp = 'ap-s*'
 
         # split the message
-        # PHP Warning: Invalid argument supplied for foreach() in /usr/wikia/slot1/3823/src/extensions/wikia/PhalanxII/templates/PhalanxSpecial_main.php on line 141
+        # PHP Warning: Invalid argument supplied for foreach() in
+        # /usr/wikia/slot1/3823/src/extensions/wikia/PhalanxII/templates/PhalanxSpecial_main.php on line 141
         matches = re.match(r'^(.*) in /usr/wikia/slot1/\d+(.*)$', message)
 
         if not matches:
@@ -72,7 +174,8 @@ class PHPErrorsSource(PHPLogsSource):
         Normalize given message by removing variables like server name
         to improve grouping of messages
 
-        PHP Fatal Error: Call to a member function getText() on a non-object in /usr/wikia/slot1/3006/src/includes/api/ApiParse.php on line 20
+        PHP Fatal Error: Call to a member function getText() on a non-object in
+        /usr/wikia/slot1/3006/src/includes/api/ApiParse.php on line 20
 
         will become:
 
@@ -80,71 +183,7 @@ class PHPErrorsSource(PHPLogsSource):
         """
         message = entry.get('@message')
         message = message.replace('\n', '')
-
-        # remove exception prefix
-        # Exception from line 141 of /includes/wikia/nirvana/WikiaView.class.php:
-        message = re.sub(r'Exception from line \d+ of [^:]+:', 'Exception:', message)
-
-        # remove HTTP adresses
-        # Missing or invalid pubid from http://dragonball.wikia.com/__varnish_liftium/config in /var/www/liftium/delivery/config.php on line 17
-        message = re.sub(r'https?://[^\s]+', '<URL>', message)
-
-        # remove release-specific part
-        # /usr/wikia/slot1/3006/src
-        message = re.sub(r'/usr/wikia/slot1/\d+(/src)?', '', message)
-        # /data/deploytools/build/wikia.foo/src
-        message = re.sub(r'/data/deploytools/build/wikia.[^/]+/src', '', message)
-
-        # remove DOMDocument::loadHTML() errors details
-        # Tag figure invalid in Entity, line: 286
-        # Unexpected end tag : p in Entity, line: 82
-        message = re.sub(r'DOMDocument::loadHTML\(\): [^,]+, line: \d+', 'DOMDocument::loadHTML(): X, line: N', message)
-
-        # remove popen() arguments
-        message = re.sub(r'popen\([^\)]+\)', 'popen(X)', message)
-
-        # remove exec arguments
-        message = re.sub(r'Unable to fork \[[^\]]+\]', 'Unable to fork [X]', message)
-
-        # normalize /tmp and /images paths
-        message = re.sub(r'/tmp/\w+', '/tmp/X', message)
-        message = re.sub(r'\(/images/[^)]+\)', '(/images/X)', message)
-
-        # normalize swift paths
-        message = re.sub(r'mwstore://swift-backend/[^ ]+', 'mwstore://swift-backend/X', message)
-
-        # normalize "17956864 bytes" and "offset 65532
-        message = re.sub(r'\d+ bytes', 'N bytes', message)
-        message = re.sub(r'offset \d+', 'offset N', message)
-
-        # normalize preg_match() related warnings
-        message = re.sub(r'Unknown modifier \'\w+\'', 'Unknown modifier X', message)
-        message = re.sub(r'Compilation failed: unmatched parentheses at offset \d+',
-                         'Compilation failed: unmatched parentheses at offset N', message)
-
-        # normalize fatals (PLATFORM-1463)
-        message = re.sub(r'PHP Fatal Error:\s+', 'PHP Fatal Error: ', message, flags=re.IGNORECASE)
-        message = re.sub(r'PHP Notice:\s+', 'PHP Notice: ', message)
-
-        # remove long backtraces from error message
-        message = re.sub(r'\s?Stack trace:(.*)\{main\}\s?', '', message, flags=re.MULTILINE)
-
-        # remove line number from simple_html_dom.php fatal errors
-        message = re.sub(r'simplehtmldom/simple_html_dom.php on line \d+', 'simplehtmldom/simple_html_dom.php', message)
-
-        # remove index name / offset from notices
-        message = re.sub(r'Undefined index: [^\s]+ in', 'Undefined index: X in', message)
-        message = re.sub(r'Undefined offset: \d+ in', 'Undefined offset: N in', message)
-
-        # remove moving part of <!--LINK 0:459-->
-        message = re.sub(r'<!--LINK \d+:\d+-->', '<!--LINK N:N-->', message)
-
-        # remove PID from "Error while sending QUERY packet." warnings
-        message = re.sub(r'Error while sending \w+ packet. PID=\d+', 'Error while sending X packet. PID=N', message)
-
-        # FD_SETSIZE.It is set to 1024, but you have descriptors numbered at least as high as 2279.
-        message = re.sub(r'descriptors numbered at least as high as \d+', 'descriptors numbered at least as high as N', message)
-        message = re.sub(r'--enable-fd-setsize=\d+', '--enable-fd-setsize=N', message)
+        message = self.NORMALIZE_RULES.apply(message)
 
         # update the entry
         entry['@message_normalized'] = message
@@ -160,9 +199,8 @@ class PHPErrorsSource(PHPLogsSource):
         # see PLATFORM-1162
         return entry.get('@fields', {}).get('http_url') is not None
 
-    def _get_report(self, entry):
-        """ Format the report to be sent to JIRA """
-        description = self.REPORT_TEMPLATE.format(
+    def _get_description(self, entry):
+        return self.REPORT_TEMPLATE.format(
             env=self._get_env_from_entry(entry),
             source_host=entry.get('@source_host', 'n/a'),
             context_formatted=json.dumps(entry.get('@context', {}), indent=True),
@@ -171,8 +209,11 @@ class PHPErrorsSource(PHPLogsSource):
             url=self._get_url_from_entry(entry) or 'n/a'
         ).strip()
 
+    def _get_report(self, entry):
+        """ Format the report to be sent to JIRA """
+        # the description is formatted only when the report is sent
         return Report(
             summary=entry.get('@message_normalized'),
-            description=description,
+            description=lambda: self._get_description(entry),
             label=self.REPORT_LABEL
         )
@@ -1,9 +1,11 @@
 import json
 import re
 
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
 
+from reporter.sources.normalization import NormalizationRules
+
 from .common import PHPLogsSource
 
 
@@ -13,6 +15,31 @@ class PHPExceptionsSource(PHPLogsSource):
     """
     REPORT_LABEL = 'PHPExceptions'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@message', '@source_host', 'severity', '@fields.app_name',
+                                       '@context.logGroup', '@exception.class', '@exception.message']
+
+    NORMALIZE_FIELDS = ['@message', '@exception.class', '@exception.message'] + PHPLogsSource.ENV_FIELDS
+
+    NORMALIZE_RULES = NormalizationRules(
+        [
+            # Server #3 (10.8.38.41) is excessively lagged (126 seconds)
+            (r'#\d+', '#X'),
+            (r'\d+ sec', 'X sec'),
+
+            # Remove release-specific part of a file path
+            (r'/usr/wikia/slot\d/\d+/src', ''),
+        ],
+        [
+            # master fallback on blobs20141/106563095
+            (r'blobs\d+/\d+', 'blobsX'),
+        ],
+        [
+            # master fallback on blobs20141/106563095
+            (r'WikiaDataAccess could not obtain lock to generate data for: [A-Za-z0-9:]+',
+             'WikiaDataAccess could not obtain lock to generate data for: XXX'),
+        ],
+    )
+
     FULL_MESSAGE_TEMPLATE = """
 h1. {exception}
 
@@ -22,18 +49,26 @@ h5. Backtrace
 {backtrace}
 """
 
+    def _get_query_string(self, query):
+        # DBQueryError exceptions are handled by DBQueryErrorsSource
+        # and skip wfDebugLog calls from WikiFactory
+        return '@fields.app_name: "mediawiki" AND severity: "{severity}" AND @exception.class: * AND '\
+               '-@exception.class: "DBQueryError" AND -@context.logGroup: "createwiki"'.format(severity=query)
+
     def _get_entries(self, query):
         """ Return errors and exceptions reported via WikiaLogger with error severity """
-        return self._kibana.query_by_string(
-            # DBQueryError exceptions are handled by DBQueryErrorsSource
-            # and skip wfDebugLog calls from WikiFactory
-            query='@fields.app_name: "mediawiki" AND severity: "{severity}" AND @exception.class: * AND '\
-                  '-@exception.class: "DBQueryError" AND -@context.logGroup: "createwiki"'.
-                  format(
-                    severity=query
-                  ),
-            limit=self.LIMIT
-        )
+        return self._kibana.query_by_string(query=self._get_query_string(query), limit=self.LIMIT)
+
+    def _match(self, entry, query):
+        """ Check all conditions of the query string, entries can come from a query shared with other sources """
+        if entry.get('severity') != query or entry.get('@fields', {}).get('app_name') != 'mediawiki':
+            return False
+
+        context = entry.get('@context')
+        if isinstance(context, dict) and context.get('logGroup') == 'createwiki':
+            return False
+
+        return self._get_exception_class(entry) not in (None, 'DBQueryError')
 
     def _filter(self, entry):
         if not is_from_production_host(entry):
@@ -65,20 +100,7 @@ h5. Backtrace
         if exception_class in ('WikiaException', 'Error'):
             message = exception.get('message')
 
-        # Server #3 (10.8.38.41) is excessively lagged (126 seconds)
-        message = re.sub(r'#\d+', '#X', message)
-        message = re.sub(r'\d+ sec', 'X sec', message)
-
-        # Remove release-specific part of a file path
-        message = re.sub(r'/usr/wikia/slot\d/\d+/src', '', message)
-
-        # master fallback on blobs20141/106563095
-        message = re.sub(r'blobs\d+/\d+', 'blobsX', message)
-
-        # master fallback on blobs20141/106563095
-        message = re.sub(
-            r'WikiaDataAccess could not obtain lock to generate data for: [A-Za-z0-9:]+',
-            'WikiaDataAccess could not obtain lock to generate data for: XXX', message)
+        message = self.NORMALIZE_RULES.apply(message)
 
         entry['@normalized_message'] = message
 
@@ -132,7 +154,7 @@ h5. Backtrace
                 exception=exception_class or 'Error',
                 message=message
             ),
-            description=self._get_description(entry),
+            description=lambda: self._get_description(entry),
             label=self.REPORT_LABEL
         )
 
@@ -149,10 +171,20 @@ class PHPTypeErrorsSource(PHPLogsSource):
     """
     REPORT_LABEL = 'PHPTypeError'
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@source_host', '@exception.class', '@exception.message']
+
+    NORMALIZE_FIELDS = ['@exception.class', '@exception.message'] + PHPLogsSource.ENV_FIELDS
+
     def _get_entries(self, query):
         """ Return errors and exceptions reported via WikiaLogger with error severity """
         # http://php.net/manual/en/class.typeerror.php
-        return self._kibana.query_by_string(query='@exception.class: "TypeError"', limit=self.LIMIT)
+        return self._kibana.query_by_string(query=self._get_query_string(query), limit=self.LIMIT)
+
+    def _get_query_string(self, query):
+        return self._get_exception_class_query_string('TypeError')
+
+    def _match(self, entry, query):
+        return self._get_exception_class(entry) == 'TypeError'
 
     def _filter(self, entry):
         return is_from_production_host(entry)
@@ -183,6 +215,16 @@ class PHPTypeErrorsSource(PHPLogsSource):
             columns=['@timestamp', '@source_host', '@exception.message']
         )
 
+    def _get_description(self, entry):
+        return self.REPORT_TEMPLATE.format(
+            env=self._get_env_from_entry(entry),
+            source_host=entry.get('@source_host', 'n/a'),
+            context_formatted=json.dumps(entry.get('@context', {}), indent=True),
+            fields_formatted=json.dumps(entry.get('@fields', {}), indent=True),
+            full_message=entry.get('@exception', {}).get('message'),
+            url=self._get_url_from_entry(entry) or 'n/a'
+        ).strip()
+
     def _get_report(self, entry):
         """ Format the report to be sent to JIRA """
         exception = entry.get('@exception', {})
@@ -193,17 +235,8 @@ class PHPTypeErrorsSource(PHPLogsSource):
         # , called in /foo/bar/class.php on line 140
         short_message = re.sub(r', called in (.*)$', '', message)
 
-        description = self.REPORT_TEMPLATE.format(
-            env=self._get_env_from_entry(entry),
-            source_host=entry.get('@source_host', 'n/a'),
-            context_formatted=json.dumps(entry.get('@context', {}), indent=True),
-            fields_formatted=json.dumps(entry.get('@fields', {}), indent=True),
-            full_message=message,
-            url=self._get_url_from_entry(entry) or 'n/a'
-        ).strip()
-
         return Report(
             summary=short_message,
-            description=description,
+            description=lambda: self._get_description(entry),
             label=self.REPORT_LABEL
         )
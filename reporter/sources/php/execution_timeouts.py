@@ -1,4 +1,4 @@
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
 from .common import PHPLogsSource
 
@@ -12,6 +12,8 @@ class PHPExecutionTimeoutSource(PHPLogsSource):
 
     REPORT_LABEL = "php-timeout"
 
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@fields.http_url']
+
     REPORT_TEMPLATE = """
 The below URL is taking too much time to render. This is usually caused by extremely large articles.
 
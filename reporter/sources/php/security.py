@@ -1,7 +1,8 @@
 import json
 
-from reporter.helpers import is_from_production_host
+from reporter.helpers import is_from_production_host, PRODUCTION_HOST_FIELDS
 from reporter.reports import Report
+from reporter.sources.kibana import KibanaRow
 
 from .common import PHPLogsSource
 
@@ -15,6 +16,9 @@ class PHPSecuritySource(PHPLogsSource):
     """
     REPORT_LABEL = 'CSRFDetector'
 
+    # the caller is taken from the backtrace, it's fetched for CSRFDetector entries only (see _get_trace)
+    FIELDS = PRODUCTION_HOST_FIELDS + ['@exception.class', '@exception.file']
+
     FULL_MESSAGE_TEMPLATE = """
 h2. {message}
 
@@ -30,6 +34,12 @@ h5. Backtrace
         """ Return failed security assertions logs """
         return self._kibana.get_rows(match={"@exception.class": self.EXCEPTION_CLASS}, limit=self.LIMIT)
 
+    def _get_query_string(self, query):
+        return self._get_exception_class_query_string(self.EXCEPTION_CLASS)
+
+    def _match(self, entry, query):
+        return self._get_exception_class(entry) == self.EXCEPTION_CLASS
+
     def _filter(self, entry):
         return is_from_production_host(entry)
 
@@ -37,21 +47,38 @@ h5. Backtrace
         """ Normalize using the assertion class and message """
         exception = entry.get('@exception', {})
         source = exception.get('file')
-        caller = self._get_wikia_caller_from_exception(exception)
 
         # @see PLATFORM-1540
-        if 'CSRFDetector' in source:
-            issue_type = 'CSRF'
-            message = 'CSRF detected in {}'.format(caller)
-        else:
+        if 'CSRFDetector' not in source:
             return None
 
+        if exception.get('trace') is None:
+            exception['trace'] = self._get_trace(entry)
+
+        caller = self._get_wikia_caller_from_exception(exception)
+
+        issue_type = 'CSRF'
+        message = 'CSRF detected in {}'.format(caller)
+
         entry['issue_type'] = issue_type
         entry['caller'] = caller
         entry['@message'] = message
 
         return '{}-{}-{}'.format(issue_type, issue_type, caller)
 
+    def _get_trace(self, entry):
+        """
+        Fetch the backtrace of a given entry, it's large and needed for the entries that are grouped by it only
+
+        :type entry dict
+        :rtype: list|None
+        """
+        if not isinstance(entry, KibanaRow) or entry.doc_id is None:
+            return None
+
+        (document,) = self._kibana.get_documents([entry], fields=['@exception.trace'])
+        return (document or {}).get('@exception', {}).get('trace')
+
     def _get_kibana_url(self, entry):
         """
         Get Kibana dashboard URL for a given entry
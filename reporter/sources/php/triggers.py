@@ -12,8 +12,19 @@ class PHPTriggeredSource(PHPLogsSource):
     """
     REPORT_LABEL = 'PHPTriggered'
 
+    FIELDS = ['@message', '@context.jira_reporter', '@context.tags']
+
+    def _get_query_string(self, query):
+        return '@context.jira_reporter: 1 AND @context.tags: *'
+
     def _get_entries(self, query):
-        return self._kibana.query_by_string(query='@context.jira_reporter: 1 AND @context.tags: *', limit=self.LIMIT)
+        return self._kibana.query_by_string(query=self._get_query_string(query), limit=self.LIMIT)
+
+    def _match(self, entry, query):
+        context = entry.get('@context')
+
+        return isinstance(context, dict) and str(context.get('jira_reporter')) in ('1', 'True') and \
+            bool(context.get('tags'))
 
     def _filter(self, entry):
         return True
@@ -24,6 +24,10 @@ class ReportsPipeSource(KibanaSource):
     # https://github.com/macbre/index-digest#syslog
     ELASTICSEARCH_QUERY = 'report.hash: *'
 
+    # entries are not grouped in elasticsearch, hashes with long paths are not indexed as keywords
+    # (see AGGREGATION_FIELDS)
+    FIELDS = ['report.hash']
+
     def _get_entries(self, query):
         return self._kibana.query_by_string(query=self.ELASTICSEARCH_QUERY, limit=self.LIMIT)
 
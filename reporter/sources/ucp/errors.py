@@ -4,6 +4,7 @@ import urllib.parse
 
 from reporter.reports import Report
 from reporter.sources.common import KibanaSource
+from reporter.sources.normalization import NormalizationRules
 
 """Reports PHP errors, fatals and uncaught exceptions from Unified Community Platform (UCP)"""
 class UCPErrorsSource(KibanaSource):
@@ -21,6 +22,36 @@ class UCPErrorsSource(KibanaSource):
     """
 
     ELASTICSEARCH_INDEX_PREFIX = 'logstash-mediawiki-unified-platform'
+    FIELDS = ['datacenter', '@message', 'kubernetes.labels.app', '@fields.http_url_domain', '@fields.http_url_path']
+
+    # _has_all_required_fields only needs to know if there's a stack trace, it's fetched for reported entries only
+    EXISTS_FIELDS = ['stack_trace']
+    REPORT_FIELDS = FIELDS + ['stack_trace', 'event.type', '@fields.trace_id']
+
+    # fields read by _normalize and _get_env_from_entry methods
+    NORMALIZE_FIELDS = ['@message', 'datacenter', 'kubernetes.labels.app']
+
+    NORMALIZE_RULES = NormalizationRules(
+        [
+            # remove HTTP adresses
+            # Missing or invalid pubid from http://dragonball.wikia.com/__varnish_liftium/config in
+            # /var/www/liftium/delivery/config.php on line 17
+            (r'https?://[^\s]+', '<URL>'),
+        ],
+        [
+            # remove long backtraces from some error messages (they are already logged in separate field)
+            (r'\s?Stack trace:(.*)\{main\}\s?', '', re.MULTILINE),
+        ],
+        [
+            # remove index name / offset from notices
+            (r'Undefined index: [^\s]+ in', 'Undefined index: X in'),
+            (r'Undefined offset: \d+ in', 'Undefined offset: N in'),
+        ],
+        [
+            (r'Could not resolve cluster for DB name: (.*)', 'Could not resolve cluster for DB name: X'),
+        ],
+    )
+
     ERRORS_MAP = {
         'fatal': {'id': '9'}, #P2
         'error': {'id': '8'}, #P3
@@ -29,7 +60,8 @@ class UCPErrorsSource(KibanaSource):
 
     def _get_entries(self, query):
         return self._kibana.query_by_string(
-            query='NOT @message:"Wikimedia\\\\Rdbms" AND (event.type:"error" OR event.type:"fatal" OR event.type:"exception")',
+            query='NOT @message:"Wikimedia\\\\Rdbms" AND '
+                  '(event.type:"error" OR event.type:"fatal" OR event.type:"exception")',
             limit=self.LIMIT
         )
 
@@ -69,7 +101,8 @@ class UCPErrorsSource(KibanaSource):
         Normalize given message by removing variables like server name
         to improve grouping of messages
 
-        PHP Fatal Error: Call to a member function getText() on a non-object in /usr/wikia/slot1/3006/src/includes/api/ApiParse.php on line 20
+        PHP Fatal Error: Call to a member function getText() on a non-object in
+        /usr/wikia/slot1/3006/src/includes/api/ApiParse.php on line 20
 
         will become:
 
@@ -78,17 +111,7 @@ class UCPErrorsSource(KibanaSource):
         message = entry.get('@message')
         message = message.replace('\n', '')
 
-        # remove HTTP adresses
-        # Missing or invalid pubid from http://dragonball.wikia.com/__varnish_liftium/config in /var/www/liftium/delivery/config.php on line 17
-        message = re.sub(r'https?://[^\s]+', '<URL>', message)
-
-        # remove long backtraces from some error messages (they are already logged in separate field)
-        message = re.sub(r'\s?Stack trace:(.*)\{main\}\s?', '', message, flags=re.MULTILINE)
-
-        # remove index name / offset from notices
-        message = re.sub(r'Undefined index: [^\s]+ in', 'Undefined index: X in', message)
-        message = re.sub(r'Undefined offset: \d+ in', 'Undefined offset: N in', message)
-        message = re.sub(r'Could not resolve cluster for DB name: (.*)', 'Could not resolve cluster for DB name: X', message)
+        message = self.NORMALIZE_RULES.apply(message)
 
         entry['@message_normalized'] = message
 
@@ -100,7 +123,7 @@ class UCPErrorsSource(KibanaSource):
     def _has_all_required_fields(entry):
         fields = entry.get('@fields', {})
         return fields.get('http_url_path') is not None and fields.get('http_url_domain') is not None \
-            and entry.get('stack_trace') is not None
+            and KibanaSource._has_field(entry, 'stack_trace')
 
     def _get_url_from_entry(self, entry):
         fields = entry.get('@fields', {})
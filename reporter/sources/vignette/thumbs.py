@@ -21,6 +21,8 @@ h3. {full_message}
 
     LIMIT = 1000
 
+    FIELDS = ['@message', 'logger_name']
+
     LOGGER = 'vignette.util.thumb-verifier'
 
     KIBANA_QUERY = 'appname: "vignette" AND logger_name: "{}" AND level: "ERROR"'.format(LOGGER)
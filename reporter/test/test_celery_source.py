@@ -1,8 +1,10 @@
 """
 Set of unit tests for CeleryLogsSource
 """
+import time
 import unittest
 
+from ..fakes.elasticsearch_server import FakeElasticsearchServer
 from ..sources import CeleryLogsSource
 
 
@@ -70,3 +72,23 @@ class CeleryLogsSourceTestClass(unittest.TestCase):
 
         assert "Celery worker mediawiki-main reported: RemoteExecuteError(u'Wikia\\\\SwiftSync\\\\ImageSyncTask::synchronize',)" == report.get_summary()
         assert ['CeleryWorkersError', 'mediawiki-main'] == report.get_labels()
+
+    def test_long_exceptions(self):
+        """ Long tracebacks are not indexed as keywords, entries need to be grouped by the source """
+        server = FakeElasticsearchServer().start()
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(time.time() - 60))
+
+        server.add_documents('logstash-celery', [
+            dict(self.ENTRY, **{'@timestamp': timestamp, 'exception': 'Error #{}'.format(idx) + ' in foo.py' * 50})
+            for idx in (1, 2, 2)
+        ])
+
+        try:
+            reports = CeleryLogsSource(es_host=server.url).query(threshold=1)
+        finally:
+            server.stop()
+
+        assert sorted((report.get_summary()[:47], report.get_counter()) for report in reports) == [
+            ('Celery worker mediawiki-main reported: Error #1', 1),
+            ('Celery worker mediawiki-main reported: Error #2', 2),
+        ]
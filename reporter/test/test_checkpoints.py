@@ -0,0 +1,145 @@
+"""
+Set of unit tests for CheckpointStore class
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from ..reports import Report
+from ..sources.checkpoints import CheckpointStore
+from ..sources.common import KibanaSource
+from ..sources.kibana import KibanaRow, PaginatedKibana
+
+
+class CheckpointedKibanaSource(KibanaSource):
+    """ Returns given entries and records the time range they were queried for """
+    def __init__(self, entries, since, to, **kwargs):
+        super(CheckpointedKibanaSource, self).__init__(**kwargs)
+        self._entries = entries
+        self._kibana._since = since
+        self._kibana._to = to
+
+    def _get_entries(self, query):
+        self.time_range = self._kibana.get_time_range()
+        return iter(self._entries)
+
+    def _filter(self, entry):
+        return True
+
+    def _normalize(self, entry):
+        return entry['@message']
+
+    def _get_report(self, entry):
+        return Report(summary=entry['@message'], description='')
+
+
+class CheckpointStoreTestClass(unittest.TestCase):
+    """
+    Unit tests for CheckpointStore class
+    """
+    def setUp(self):
+        (handle, self._path) = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+
+    def tearDown(self):
+        os.unlink(self._path)
+
+    @staticmethod
+    def _get_entry(message, timestamp):
+        return {'@message': message, '@timestamp': PaginatedKibana.format_timestamp(timestamp)}
+
+    def test_get_bucket(self):
+        assert CheckpointStore.get_bucket('1970-01-01T00:59:59.999Z') == 0
+        assert CheckpointStore.get_bucket('1970-01-01T01:30:00.000Z') == 3600
+        assert CheckpointStore.get_bucket('2020-01-01T12:34:56.789Z') == 1577880000
+
+        assert CheckpointStore.get_bucket(None) is None
+        assert CheckpointStore.get_bucket('foo') is None
+
+    def test_store(self):
+        store = CheckpointStore(self._path)
+        assert store.get_checkpoint('foo') is None
+
+        store.save('foo', 7300, {
+            0: {
+                'foo': {
+                    'cnt': 2, 'entry': KibanaRow({'@message': 'foo'}, 'logstash', 'a'), 'has_all_required_fields': False
+                },
+            },
+            3600: {
+                'foo': {'cnt': 3, 'entry': {'@message': 'foo'}, 'has_all_required_fields': False},
+                'bar': {'cnt': 1, 'entry': {'@message': 'bar'}, 'has_all_required_fields': True},
+            },
+        })
+
+        # the next run continues the last bucket
+        store.save('foo', 7400, {
+            3600: {
+                'foo': {'cnt': 1, 'entry': {'@message': 'foo', 'next': True}, 'has_all_required_fields': False},
+                'bar': {'cnt': 1, 'entry': {'@message': 'bar', 'next': True}, 'has_all_required_fields': False},
+            },
+        })
+
+        assert store.get_checkpoint('foo') == 7400
+        assert store.get_checkpoint('bar') is None
+
+        groups = store.get_groups('foo', since=0)
+        assert groups['foo']['cnt'] == 6
+        assert groups['bar']['cnt'] == 2
+        assert groups['bar']['has_all_required_fields'] is True
+
+        # the most recent entry is kept, unless only the older one has all required fields
+        assert groups['foo']['entry'] == {'@message': 'foo', 'next': True}
+        assert groups['foo']['entry'].doc_id is None
+        assert groups['bar']['entry'] == {'@message': 'bar'}
+
+        # buckets that start before the period are not counted
+        assert store.get_groups('foo', since=1)['foo']['cnt'] == 4
+
+        store.prune('foo', since=1)
+        assert store.get_groups('foo', since=0)['foo']['cnt'] == 4
+
+    def test_previous_version(self):
+        db = sqlite3.connect(self._path)
+
+        with db:
+            db.execute('CREATE TABLE checkpoints (source TEXT PRIMARY KEY, timestamp INTEGER NOT NULL)')
+            db.execute('CREATE TABLE groups (source TEXT NOT NULL, key TEXT NOT NULL)')
+            db.execute("INSERT INTO checkpoints VALUES ('foo', 100)")
+
+        db.close()
+
+        # counts stored for whole runs can not be split into buckets, the entire period is fetched again
+        assert CheckpointStore(self._path).get_checkpoint('foo') is None
+
+    def test_source_query(self):
+        # the first run fetches the whole period, entries are counted in hourly buckets
+        source = CheckpointedKibanaSource([
+            self._get_entry('foo', 1500),  # the bucket starts before the period
+            self._get_entry('foo', 4000),
+            self._get_entry('foo', 7000),
+            self._get_entry('bar', 7250),
+        ], since=1000, to=7300, checkpoints=self._path)
+
+        reports = source.query(threshold=2)
+
+        assert source.time_range == (1000, 7300)
+        assert [(report.get_summary(), report.get_counter()) for report in reports] == [('foo', 2)]
+
+        # the upper boundary is excluded, the next run starts there
+        assert source._kibana._get_timestamp_filer()['range']['@timestamp'] == \
+            {'gte': '1970-01-01T00:16:40.000Z', 'lt': '1970-01-01T02:01:40.000Z'}
+
+        # the next one continues from the checkpoint and sums counts of buckets within the period
+        source = CheckpointedKibanaSource([self._get_entry('bar', 7500)], since=4600, to=8000, checkpoints=self._path)
+        reports = source.query(threshold=1)
+
+        assert source.time_range == (7300, 8000)
+        assert [(report.get_summary(), report.get_counter()) for report in reports] == [('bar', 2)]
+
+        # stored counts older than the period are dropped, entries without timestamp are counted at the end of it
+        source = CheckpointedKibanaSource([{'@message': 'foo'}], since=7300, to=12000, checkpoints=self._path)
+        reports = source.query(threshold=1)
+
+        assert [(report.get_summary(), report.get_counter()) for report in reports] == [('foo', 1)]
@@ -0,0 +1,162 @@
+"""
+Set of unit tests for recording and replaying of sources corpora
+"""
+import shutil
+import tempfile
+import unittest
+
+from ..reports import Report
+from ..sources.anemometer.client import AnemometerClient
+from ..sources.common import KibanaSource
+from ..sources.corpus import CorpusStore, CorpusError
+from ..sources.kibana import KibanaRow
+
+
+class ElasticsearchMock(object):
+    """
+    Returns the given rows in a single page and documents for multi-get requests
+    """
+    def __init__(self, rows):
+        self._rows = rows
+        self.requests = 0
+
+    def search(self, **kwargs):
+        self.requests += 1
+
+        return {'hits': {'total': len(self._rows), 'hits': [
+            {'_index': 'logstash-foo', '_id': str(idx), '_source': row} for idx, row in enumerate(self._rows)
+        ]}}
+
+    def mget(self, body):
+        self.requests += 1
+
+        return {'docs': [
+            {'found': True, '_source': {'trace': 'trace #{}'.format(doc['_id'])}} for doc in body['docs']
+        ]}
+
+
+class ElasticsearchDownMock(object):
+    """
+    Elasticsearch should not be asked when the corpus is replayed
+    """
+    def __getattr__(self, item):
+        raise AssertionError('elasticsearch should not be queried ({})'.format(item))
+
+
+class CorpusKibanaSource(KibanaSource):
+    """ Groups entries by name, the trace is fetched for reported entries only """
+    FIELDS = ['name']
+    REPORT_FIELDS = ['name', 'trace']
+
+    def _get_entries(self, query):
+        return self._kibana.query_by_string('name: *', limit=self.LIMIT)
+
+    def _filter(self, entry):
+        return entry['name'] != 'bar'
+
+    def _normalize(self, entry):
+        return entry['name']
+
+    def _get_report(self, entry):
+        return Report(summary=entry['name'], description=entry['trace'])
+
+
+class HttpResponseMock(object):
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class HttpMock(object):
+    def __init__(self, queries):
+        self._queries = queries
+        self.requests = 0
+
+    def get(self, url):
+        self.requests += 1
+        return HttpResponseMock({'result': self._queries})
+
+
+class CorpusStoreTestClass(unittest.TestCase):
+    """
+    Unit tests for CorpusStore class
+    """
+    ROWS = [{'name': 'foo'}, {'name': 'bar'}, {'name': 'foo'}, {'name': 'test'}]
+
+    def setUp(self):
+        self._path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._path)
+
+    @staticmethod
+    def _get_reports(source):
+        return sorted((report.get_summary(), report.get_description(), report.get_counter())
+                      for report in source.query(threshold=1))
+
+    def test_kibana_source(self):
+        source = CorpusKibanaSource(corpus=CorpusStore(self._path, CorpusStore.MODE_RECORD))
+        es = source._kibana._es = ElasticsearchMock(self.ROWS)
+
+        reports = self._get_reports(source)
+        time_range = source._kibana.get_time_range()
+
+        assert reports == [('foo', 'trace #0', 2), ('test', 'trace #3', 1)]
+        assert es.requests == 2
+
+        # replay the same query an hour later
+        source = CorpusKibanaSource(corpus=CorpusStore(self._path, CorpusStore.MODE_REPLAY))
+        source._kibana._es = ElasticsearchDownMock()
+        source._kibana.set_since(time_range[0] + 3600)
+        source._kibana._to = time_range[1] + 3600
+
+        assert self._get_reports(source) == reports
+
+        # the clock is frozen at the recorded time range
+        assert source._kibana.get_time_range() == time_range
+
+    def test_not_recorded(self):
+        source = CorpusKibanaSource(period=60, corpus=CorpusStore(self._path, CorpusStore.MODE_REPLAY))
+        source._kibana._es = ElasticsearchDownMock()
+
+        assert source.query(threshold=1) == []
+
+        with self.assertRaises(CorpusError):
+            CorpusStore(self._path).get_header('CorpusKibanaSource', {'query': 'foo'}, 60)
+
+    def test_entries(self):
+        corpus = CorpusStore(self._path, CorpusStore.MODE_RECORD)
+        entries = [KibanaRow({'name': 'foo'}, 'logstash-foo', 'a1', count=5), {'name': 'bar'}]
+
+        # the corpus is written only when all entries were consumed
+        recorded = corpus.record('foo', 'query', iter(entries), window=60)
+        assert next(recorded) == entries[0]
+        recorded.close()
+
+        with self.assertRaises(CorpusError):
+            corpus.get_header('foo', 'query', window=60)
+
+        assert list(corpus.record('foo', 'query', iter(entries), window=60, time_range=(1, 61))) == entries
+        assert corpus.get_header('foo', 'query', window=60)['time_range'] == [1, 61]
+
+        replayed = list(CorpusStore(self._path).replay('foo', 'query', window=60))
+        assert replayed == entries
+        assert (replayed[0].index, replayed[0].doc_id, replayed[0].count) == ('logstash-foo', 'a1', 5)
+        assert not isinstance(replayed[1], KibanaRow)
+
+    def test_anemometer_client(self):
+        queries = [{'checksum': '123', 'snippet': 'SELECT foo'}, {'checksum': '456', 'snippet': 'SELECT bar'}]
+
+        client = AnemometerClient('http://anemometer', corpus=CorpusStore(self._path, CorpusStore.MODE_RECORD))
+        http = client._http = HttpMock(queries)
+
+        assert client.get_queries() == queries
+        assert http.requests == 1
+
+        client = AnemometerClient('http://anemometer', corpus=CorpusStore(self._path, CorpusStore.MODE_REPLAY))
+        http = client._http = HttpMock([])
+
+        assert client.get_queries() == queries
+        assert http.requests == 0
@@ -0,0 +1,227 @@
+"""
+Set of unit tests for the local elasticsearch stand-in
+"""
+import gzip
+import json
+import shutil
+import tempfile
+import time
+import unittest
+
+from elasticsearch import Elasticsearch, TransportError
+
+from ..fakes.elasticsearch_server import FakeElasticsearchServer, filter_response
+from ..fakes.es_query import LuceneQuery, ElasticsearchQuery, QueryError, filter_source
+from ..sources.kibana import PaginatedKibana
+
+
+class LuceneQueryTestClass(unittest.TestCase):
+    """
+    Unit tests for LuceneQuery class
+    """
+    DOCUMENT = {
+        '@message': 'PHP Fatal Error: Call to a member function foo() on null in /includes/Foo.php on line 42',
+        '@source_host': 'chat-s1',
+        '@fields': {'environment': 'prod', 'app_name': 'mediawiki'},
+        '@exception': {'class': 'Wikia\\Util\\AssertionException'},
+        '@context': {'num_rows': 2500, 'jira_reporter': 1, 'tags': ['foo', 'bar']},
+        'kubernetes.namespace_name': 'prod',
+        'severity': 'error',
+    }
+
+    def _matches(self, query):
+        return LuceneQuery(query).matches(self.DOCUMENT)
+
+    def test_matches(self):
+        # phrases and terms
+        assert self._matches('@message:"^PHP Fatal Error"')
+        assert not self._matches('@message:"PHP Warning"')
+        assert self._matches('"member function foo"')
+        assert self._matches('severity: error')
+        assert self._matches('kubernetes.namespace_name: "prod"')
+        assert self._matches('@exception.class: "Wikia\\\\Util\\\\AssertionException"')
+        assert self._matches('@context.jira_reporter: 1 AND @context.tags: *')
+
+        # wildcards and regular expressions
+        assert self._matches('@source_host:chat-s* AND @message:*function*')
+        assert not self._matches('@source_host:ap-s*')
+        assert self._matches('@source_host: /[cs]hat-.*/')
+        assert not self._matches('@context.foo: *')
+
+        # ranges
+        assert self._matches('@context.num_rows: [1000 TO *]')
+        assert not self._matches('@context.num_rows: {2500 TO *]')
+        assert self._matches('@context.num_rows:>=2500')
+
+        # boolean operators
+        assert self._matches('severity: "error" AND -@context.logGroup: "createwiki"')
+        assert not self._matches('severity: "error" AND -@fields.environment: "prod"')
+        assert self._matches('NOT @message:"Wikimedia\\\\Rdbms" AND (severity:"fatal" OR severity:"error")')
+        assert not self._matches('(severity:"fatal") OR (severity:"warning")')
+        assert self._matches('severity:(fatal OR error)')
+        assert self._matches('severity:warning || severity:error')
+
+    def test_errors(self):
+        for query in ['', '(foo', '@message:"foo', '@context.num_rows: [1000 *]']:
+            with self.assertRaises(QueryError):
+                LuceneQuery(query)
+
+
+class ElasticsearchQueryTestClass(unittest.TestCase):
+    """
+    Unit tests for ElasticsearchQuery class
+    """
+    def test_matches(self):
+        query = ElasticsearchQuery({'bool': {'must': [
+            {'match': {'@exception.class': 'Wikia\\Security\\CSRFException'}},
+            {'range': {'@timestamp': {'gte': '2020-01-31T10:00:00.000Z', 'lte': '2020-01-31T11:00:00.000Z'}}},
+        ]}})
+
+        assert query.matches({'@timestamp': '2020-01-31T10:30:00.123Z', '@exception': {'class': 'CSRFException'}})
+        assert not query.matches({'@timestamp': '2020-01-31T11:30:00.123Z', '@exception': {'class': 'CSRFException'}})
+        assert not query.matches({'@timestamp': '2020-01-31T10:30:00.123Z', '@exception': {'class': 'Foo'}})
+
+        query = ElasticsearchQuery({'bool': {'should': [{'term': {'level': 'error'}}, {'exists': {'field': 'foo'}}],
+                                             'must_not': [{'terms': {'host': ['a', 'b']}}]}})
+
+        assert query.matches({'level': 'error'})
+        assert query.matches({'foo': 1})
+        assert not query.matches({'level': 'error', 'host': 'b'})
+        assert not query.matches({'level': 'warning'})
+
+        query = ElasticsearchQuery({'range': {'@timestamp': {'gte': 'now-1h'}}}, now=1580468400)
+        assert query.matches({'@timestamp': 1580468400000 - 600 * 1000})
+        assert not query.matches({'@timestamp': '2020-01-30T10:00:00.000Z'})
+
+        with self.assertRaises(QueryError):
+            ElasticsearchQuery({'fuzzy': {'foo': 'bar'}})
+
+    def test_matched_queries(self):
+        query = ElasticsearchQuery({'bool': {'must': [{'term': {'level': 'error'}}], 'should': [
+            {'exists': {'field': 'foo', '_name': 'foo'}}, {'exists': {'field': 'bar', '_name': 'bar'}}]}})
+
+        # named queries do not filter the results
+        assert query.matches({'level': 'error'})
+        assert query.get_matched_queries({'level': 'error'}) == []
+        assert query.get_matched_queries({'level': 'error', 'bar': [1]}) == ['bar']
+
+    def test_filter_source(self):
+        document = {'@message': 'foo', '@context': {'errno': 1, 'query': 'SELECT 1'}, '@exception': {'trace': []}}
+
+        assert filter_source(document) == document
+        assert filter_source(document, ['@message', '@context.errno']) == {'@message': 'foo', '@context': {'errno': 1}}
+        assert filter_source(document, ['@context']) == {'@context': {'errno': 1, 'query': 'SELECT 1'}}
+        assert filter_source(document, ['@c*.q*']) == {'@context': {'query': 'SELECT 1'}}
+        assert filter_source(document, None, ['@exception', '@context.query']) == \
+            {'@message': 'foo', '@context': {'errno': 1}}
+
+    def test_filter_response(self):
+        response = {'_scroll_id': 'foo', 'took': 1, 'hits': {'total': 1, 'hits': [{'_id': '1', '_source': {}}]}}
+
+        assert filter_response(response, 'hits.total,hits.hits._id') == {'hits': {'total': 1, 'hits': [{'_id': '1'}]}}
+        assert filter_response({'hits': {'total': 0, 'hits': []}}, 'hits.hits._id') == {}
+
+
+class FakeElasticsearchServerTestClass(unittest.TestCase):
+    """
+    Query the local elasticsearch stand-in using elasticsearch client
+    """
+    def setUp(self):
+        self._data_dir = tempfile.mkdtemp()
+        now = time.time()
+
+        # a gzipped NDJSON file with the recent entries and the one that is too old
+        with gzip.open('{}/logstash-other.ndjson.gz'.format(self._data_dir), 'wt') as handle:
+            for idx in range(25):
+                handle.write(json.dumps({
+                    '_id': 'doc-{}'.format(idx),
+                    '@timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(now - 60 - idx)),
+                    '@message': 'Foo #{}'.format(idx % 3),
+                    'count': idx,
+                    '@context': {'foo': 'bar'},
+                }) + '\n')
+
+            handle.write(json.dumps({'@timestamp': '2020-01-31T10:00:00.000Z', '@message': 'Foo #0'}) + '\n')
+
+        self._server = FakeElasticsearchServer(data_dir=self._data_dir).start()
+
+    def tearDown(self):
+        self._server.stop()
+        shutil.rmtree(self._data_dir)
+
+    def _get_kibana(self, **kwargs):
+        return PaginatedKibana(es_host=self._server.url, index_prefix='logstash-other', batch_size=10, **kwargs)
+
+    def test_pages(self):
+        kibana = self._get_kibana(fields=['@message'])
+        rows = list(kibana.query_by_string('@message: foo', limit=100))
+
+        assert [row.doc_id for row in rows] == ['doc-{}'.format(idx) for idx in range(25)]
+        assert rows[0] == {'@message': 'Foo #0'}
+        assert [page['rows'] for page in kibana.get_pages_stats()] == [10, 10, 5]
+
+        # the rest of the document
+        assert kibana.get_documents(rows[:2], fields=['@context']) == [{'@context': {'foo': 'bar'}}] * 2
+
+        # truncated results
+        kibana = self._get_kibana()
+        rows = list(kibana.get_rows(match={'@message': '#1'}, limit=5))
+
+        assert [row.doc_id for row in rows] == ['doc-1', 'doc-4', 'doc-7', 'doc-10', 'doc-13']
+
+        stats = self._server.get_stats()
+        assert (stats['search'], stats['scroll'], stats['mget']) == (2, 2, 1)
+
+    def test_exists_fields(self):
+        kibana = self._get_kibana(fields=['@message'], exists_fields=['@context.foo', 'foo'])
+        rows = list(kibana.query_by_string('@message: foo', limit=2))
+
+        assert rows[0] == {'@message': 'Foo #0'}
+        assert [row.existing_fields for row in rows] == [['@context.foo']] * 2
+
+        # grouped rows as well
+        kibana = self._get_kibana(fields=['@message'], aggregate_by=['@message'], exists_fields=['count'])
+        rows = list(kibana.query_by_string('@message: foo', limit=1))
+
+        assert [row.existing_fields for row in rows] == [['count']]
+
+    def test_aggregations(self):
+        kibana = self._get_kibana(aggregate_by=['@message'])
+        kibana._batch_size = 2
+
+        rows = list(kibana.query_by_string('@message: *', limit=100))
+
+        assert [(row['@message'], row.count) for row in rows] == [('Foo #0', 9), ('Foo #1', 8), ('Foo #2', 8)]
+        assert self._server.get_stats()['search'] == 2
+
+        # long values are not indexed as keywords, they all get into the missing bucket
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(time.time() - 60))
+        self._server.add_documents('logstash-foo', [
+            {'@timestamp': timestamp, '@message': message} for message in ['Foo', 'Foo 1' * 100, 'Foo 2' * 100]])
+
+        kibana = PaginatedKibana(es_host=self._server.url, index_prefix='logstash-foo', aggregate_by=['@message'])
+        rows = list(kibana.query_by_string('@message: *', limit=100))
+
+        assert [(row['@message'][:5], row.count) for row in rows] == [('Foo 1', 2), ('Foo', 1)]
+
+    def test_search(self):
+        es = Elasticsearch(hosts=self._server.url)
+
+        resp = es.search(index='logstash-other-2020.01.31', body={
+            'query': {'range': {'count': {'gte': 20}}},
+            'sort': [{'count': 'desc'}],
+            '_source': ['count'],
+        }, size=2, from_=1)
+
+        assert resp['hits']['total'] == 5
+        assert [hit['_source'] for hit in resp['hits']['hits']] == [{'count': 23}, {'count': 22}]
+
+        with self.assertRaises(TransportError) as context:
+            es.search(index='logstash-other', body={'query': {'match_all': {}}}, size=10000, from_=1)
+
+        assert context.exception.status_code == 400
+
+        with self.assertRaises(TransportError) as context:
+            es.search(index='logstash-foo', body={'query': {'match_all': {}}})
+
+        assert context.exception.status_code == 404
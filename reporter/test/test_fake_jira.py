@@ -0,0 +1,111 @@
+"""
+Set of unit tests for the local Jira stand-in
+"""
+import unittest
+
+from jira import JIRA, JIRAError
+
+from ..fakes.jira_server import FakeJiraServer
+from ..fakes.jql import JQLQuery, JQLError
+
+
+class JQLQueryTestClass(unittest.TestCase):
+    """
+    Unit tests for JQLQuery class
+    """
+    ISSUE = {
+        'key': 'ER-12',
+        'project': 'ER',
+        'status': 'Closed',
+        'resolution': "Won't Fix",
+        'description': 'Foo\n\nHash: 9a4f3b',
+        'updated': 1000.0,
+        'customfield_13200': '9a4f3b',
+        'customfield_16900': None,
+    }
+
+    def _matches(self, jql):
+        return JQLQuery(jql, now=1000.0 + 600).matches(self.ISSUE)
+
+    def test_matches(self):
+        assert self._matches("project = 'ER'")
+        assert self._matches("project = er")
+        assert not self._matches("project != 'ER'")
+
+        assert self._matches("description ~ '9a4f3b' AND project = 'ER'")
+        assert self._matches("project = 'ER' AND (cf[13200] ~ 'foo' OR cf[13200] ~ '9a4f3b')")
+        assert not self._matches("project = 'ER' AND (cf[13200] ~ 'foo' OR cf[13200] ~ 'bar')")
+
+        assert self._matches("key in (ER-1, ER-12)")
+        assert not self._matches("key not in (ER-1, ER-12)")
+
+        assert self._matches("cf[13200] is not EMPTY AND cf[16900] is EMPTY")
+        assert self._matches('resolution = "Won\'t Fix"')
+
+        assert self._matches("updated >= '-11m'")
+        assert not self._matches("updated >= '-9m'")
+        assert self._matches("NOT updated >= '-9m'")
+
+    def test_errors(self):
+        for jql in ["project = ", "(project = 'ER'", "project 'ER'", "updated >= 'yesterday'"]:
+            with self.assertRaises(JQLError):
+                JQLQuery(jql)
+
+
+class FakeJiraServerTestClass(unittest.TestCase):
+    """
+    Talk to the local Jira stand-in using Jira client
+    """
+    def setUp(self):
+        self._server = FakeJiraServer(custom_fields={'customfield_13200': 'Unique ID'}).start()
+        self._client = JIRA(server=self._server.url, basic_auth=('foo', 'bar'))
+
+    def tearDown(self):
+        self._server.stop()
+
+    def test_issues(self):
+        self._server.add_issue(status='Closed', resolution='Done', fields={'customfield_13200': 'foo'})
+
+        issue = self._client.create_issue(fields={
+            'project': {'key': 'ER'},
+            'issuetype': {'name': 'Defect'},
+            'summary': 'Bar',
+            'customfield_13200': 'bar',
+        })
+
+        assert issue.key == 'ER-2'
+        assert issue.fields.summary == 'Bar'
+
+        issues = self._client.search_issues(
+            "project = 'ER' AND (cf[13200] ~ 'foo' OR cf[13200] ~ 'bar')",
+            fields=['status', 'resolution', 'customfield_13200'],
+            maxResults=False)
+
+        assert [(issue.key, str(issue.fields.status), str(issue.fields.resolution)) for issue in issues] == [
+            ('ER-1', 'Closed', 'Done'),
+            ('ER-2', 'Open', 'None'),
+        ]
+
+        # fields that were not asked for are not returned
+        assert not hasattr(issues[0].fields, 'summary')
+
+        # reopen the closed one
+        transitions = {item['name']: item['id'] for item in self._client.transitions(issues[0])}
+        self._client.transition_issue(issue=issues[0], transition=transitions['Open'], comment='Reopened')
+
+        issue = self._client.issue('ER-1')
+        assert str(issue.fields.status) == 'Open'
+        assert issue.fields.resolution is None
+        assert [comment.body for comment in issue.fields.comment.comments] == ['Reopened']
+
+        issue.update(fields={'customfield_13200': 'test'})
+        assert self._client.issue('ER-1').fields.customfield_13200 == 'test'
+
+    def test_rate_limit(self):
+        self._server.error_rate = 1
+
+        with self.assertRaises(JIRAError) as context:
+            self._client.search_issues("project = 'ER'")
+
+        assert context.exception.status_code == 429
+        assert self._server.get_stats()['429'] == 1
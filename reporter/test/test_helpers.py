@@ -81,6 +81,13 @@ SELECT page_title
         assert generalize_sql(sql) ==\
             "SELECT page_title FROM page WHERE page_namespace = X AND page_title COLLATE LATINN_GENERAL_CI LIKE X"
 
+        # empty strings
+        assert generalize_sql("UPDATE page SET page_title = '' WHERE page_id = 42") ==\
+            "UPDATE page SET page_title = '' WHERE page_id = N"
+
+        assert generalize_sql("SELECT * FROM page WHERE page_title = '' AND page_namespace = 'foo'") ==\
+            "SELECT * FROM page WHERE page_title = 'Xfoo'"
+
     def test_get_method_from_query(self):
         assert get_method_from_query("SELECT column from table where foo = 1") is None
 
@@ -4,6 +4,8 @@ Set of unit tests for KibanaSource
 import unittest
 
 from ..sources.common import KibanaSource
+from ..reports import Report
+from ..sources.kibana import KibanaRow
 
 
 class KibanaSourceTestClass(unittest.TestCase):
@@ -50,3 +52,170 @@ class KibanaSourceTestClass(unittest.TestCase):
 
         # staging
         assert self._source._get_env_from_entry({'@fields': {'environment': 'staging'}}) is self._source.ENV_STAGING
+
+
+class ElasticsearchMock(object):
+    """
+    Returns the given number of rows split into pages
+    """
+    def __init__(self, rows, page_size):
+        self._rows = [{'_source': {'id': idx}} for idx in range(rows)]
+        self._page_size = page_size
+        self._offset = 0
+        self.requests = 0
+
+    def _get_page(self):
+        hits = self._rows[self._offset:self._offset + self._page_size]
+        self._offset += self._page_size
+        self.requests += 1
+
+        return {'_scroll_id': 'foo', 'hits': {'total': len(self._rows), 'hits': hits}}
+
+    def mget(self, body):
+        self.requests += 1
+
+        return {'docs': [
+            {'found': True, '_source': {'id': doc['_id'], '@context': {'foo': 'bar', 'errno': 0}, '@exception': 'trace'}}
+            for doc in body['docs']
+        ]}
+
+    def search(self, **kwargs):
+        assert kwargs['size'] == self._page_size
+        return self._get_page()
+
+    def scroll(self, **kwargs):
+        assert kwargs['scroll_id'] == 'foo'
+        return self._get_page()
+
+
+class PaginatedKibanaTestClass(unittest.TestCase):
+    """
+    Unit tests for PaginatedKibana class
+    """
+    def test_pages(self):
+        source = KibanaSource(page_size=10)
+        es = source._kibana._es = ElasticsearchMock(rows=25, page_size=10)
+
+        entries = source._kibana.query_by_string('foo', limit=100)
+        assert es.requests == 0  # rows are fetched lazily
+
+        assert [entry['id'] for entry in entries] == list(range(25))
+        assert es.requests == 3
+        assert [page['rows'] for page in source._kibana.get_pages_stats()] == [10, 10, 5]
+
+    def test_pages_limit(self):
+        source = KibanaSource(page_size=10)
+        es = source._kibana._es = ElasticsearchMock(rows=50, page_size=10)
+
+        entries = list(source._kibana.get_rows({'foo': 'bar'}, limit=15))
+
+        assert [entry['id'] for entry in entries] == list(range(15))
+        assert es.requests == 2
+
+
+class ProjectedKibanaSource(KibanaSource):
+    """ Reads only selected fields when grouping entries """
+    FIELDS = ['id', '@context.errno']
+
+
+class KibanaSourceFieldsTestClass(unittest.TestCase):
+    """
+    Unit tests for fields projection in KibanaSource class
+    """
+    def test_merge_entries(self):
+        assert KibanaSource._merge_entries(
+            {'@message': 'foo', '@context': {'errno': 1, 'query': 'SELECT 1'}, '@exception': {'trace': []}},
+            {'@message': 'foo', '@context': {'errno': 1, 'function': 'Foo::bar'}, '@normalized': 'bar'}
+        ) == {
+            '@message': 'foo',
+            '@context': {'errno': 1, 'query': 'SELECT 1', 'function': 'Foo::bar'},
+            '@exception': {'trace': []},
+            '@normalized': 'bar'
+        }
+
+    def test_complete_entries(self):
+        source = ProjectedKibanaSource()
+        es = source._kibana._es = ElasticsearchMock(rows=0, page_size=10)
+
+        items = {
+            'foo': {'cnt': 5, 'entry': KibanaRow({'id': 1, '@context': {'errno': 42}}, 'logstash-foo', 1)},
+            'bar': {'cnt': 1, 'entry': KibanaRow({'id': 2}, 'logstash-foo', 2)},
+        }
+
+        source._complete_entries(items, threshold=5)
+
+        # the entry that will be reported was fetched and merged with the modified one
+        assert items['foo']['entry'] == {'id': 1, '@context': {'foo': 'bar', 'errno': 42}, '@exception': 'trace'}
+
+        # below the threshold
+        assert items['bar']['entry'] == {'id': 2}
+
+        assert es.requests == 1
+
+
+class AggregationsElasticsearchMock(object):
+    """
+    Returns the given groups (as a list of counts) split into composite aggregation pages
+    """
+    def __init__(self, groups, page_size):
+        self._groups = groups
+        self._page_size = page_size
+        self.bodies = []
+
+    def search(self, index, body):
+        self.bodies.append(body)
+        offset = body['aggregations']['groups']['composite'].get('after', {}).get('name', 0)
+
+        buckets = [
+            {
+                'key': {'name': idx},
+                'doc_count': count,
+                'entry': {'hits': {'hits': [{'_index': 'foo', '_id': idx, '_source': {'name': 'job-{}'.format(idx % 3)}}]}}
+            }
+            for idx, count in enumerate(self._groups)
+        ][offset:offset + self._page_size]
+
+        return {'aggregations': {'groups': {'buckets': buckets, 'after_key': {'name': offset + self._page_size}}}}
+
+
+class AggregatedKibanaSource(KibanaSource):
+    """ Groups entries by name in elasticsearch """
+    FIELDS = ['name']
+    AGGREGATION_FIELDS = FIELDS
+
+    def _get_entries(self, query):
+        return self._kibana.query_by_string('name: *', limit=self.LIMIT)
+
+    def _filter(self, entry):
+        return True
+
+    def _normalize(self, entry):
+        return entry['name']
+
+    def _get_report(self, entry):
+        return Report(summary=entry['name'], description='')
+
+    def _complete_entries(self, items, threshold):
+        pass
+
+
+class KibanaSourceAggregationsTestClass(unittest.TestCase):
+    """
+    Unit tests for aggregations in KibanaSource class
+    """
+    def test_query(self):
+        source = AggregatedKibanaSource(page_size=2)
+        es = source._kibana._es = AggregationsElasticsearchMock(groups=[5, 1, 10, 2, 3], page_size=2)
+
+        reports = source.query(threshold=5)
+
+        # groups are merged using the key returned by _normalize
+        assert sorted((report.get_summary(), report.get_counter()) for report in reports) == \
+            [('job-0', 7), ('job-2', 10)]
+
+        assert len(es.bodies) == 3
+        assert es.bodies[0]['size'] == 0
+        assert es.bodies[0]['aggregations']['groups']['aggregations']['entry']['top_hits'] == \
+            {'size': 1, '_source': {'includes': ['name']}}
+        assert es.bodies[0]['aggregations']['groups']['composite']['sources'] == \
+            [{'name': {'terms': {'field': 'name.keyword', 'missing_bucket': True}}}]
@@ -0,0 +1,100 @@
+"""
+Set of unit tests for the synthetic log corpora generator
+"""
+import gzip
+import json
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+from collections import Counter
+
+from ..fakes.elasticsearch_server import FakeElasticsearchServer
+from ..fakes.log_generator import LogGenerator, ZipfSampler, get_schemas, SCHEMAS
+from ..sources import DBQueryNoLimitSource, HeliosSource, KubernetesBackoffSource, UCPErrorsSource
+
+
+class LogGeneratorTestClass(unittest.TestCase):
+    """
+    Unit tests for LogGenerator class
+    """
+    def test_zipf_sampler(self):
+        groups = Counter(ZipfSampler(groups=50, exponent=1.2, rng=random.Random(0)).sample(20000))
+
+        assert set(groups) <= set(range(50))
+        assert groups[0] > groups[1] > groups[5] > groups[40]
+
+        # about 30% of entries belong to the most frequent group
+        assert 0.25 < groups[0] / 20000 < 0.35
+
+    def test_get_documents(self):
+        generator = LogGenerator(schemas=get_schemas(['helios', 'sql']), entries=1000, groups=5, now=1580468400)
+        documents = list(generator.get_documents())
+
+        assert len(documents) == 1000
+        assert {index for (index, _) in documents} == {'logstash-helios', 'logstash-mediawiki-sql'}
+        assert generator.get_indices() == ['logstash-helios', 'logstash-mediawiki-sql']
+
+        # documents are spread over the time window
+        assert min(document['@timestamp'] for (_, document) in documents) >= '2020-01-31T09:00:00.000Z'
+        assert max(document['@timestamp'] for (_, document) in documents) < '2020-01-31T11:00:00.000Z'
+
+        # group cardinality is kept, while the rest of the document varies
+        messages = Counter(document['@message'] for (index, document) in documents if index == 'logstash-helios')
+        queries = {document['@message'] for (index, document) in documents if index == 'logstash-mediawiki-sql'}
+        methods = {document['@context']['method'] for (index, document) in documents
+                   if index == 'logstash-mediawiki-sql'}
+
+        assert len(messages) <= 5
+        assert len(methods) <= 5
+        assert len(queries) > 100
+
+        # the same seed gives the same corpus
+        assert list(LogGenerator(schemas=get_schemas(['helios', 'sql']), entries=1000, groups=5,
+                                 now=1580468400).get_documents()) == documents
+
+    def test_get_schemas(self):
+        assert [schema_class.NAME for schema_class in get_schemas(['ucp', 'pandora'])] == ['ucp', 'pandora']
+        assert len({schema_class.NAME for schema_class in SCHEMAS}) == len(SCHEMAS)
+
+        with self.assertRaises(ValueError):
+            get_schemas(['foo'])
+
+
+class LogCorpusSourcesTestClass(unittest.TestCase):
+    """
+    Sources query the generated corpus served by the local elasticsearch
+    """
+    def setUp(self):
+        self._data_dir = tempfile.mkdtemp()
+
+        self._generator = LogGenerator(schemas=get_schemas(['sql', 'helios', 'k8s-events', 'ucp']),
+                                       entries=2000, groups=10, now=time.time() - 30)
+        self._written = self._generator.write(self._data_dir)
+
+        self._server = FakeElasticsearchServer(data_dir=self._data_dir).start()
+
+    def tearDown(self):
+        self._server.stop()
+        shutil.rmtree(self._data_dir)
+
+    def test_write(self):
+        assert sum(self._written.values()) == 2000
+        assert self._server.get_indices() == sorted(self._written.keys())
+
+        with open('{}/{}'.format(self._data_dir, LogGenerator.MANIFEST)) as manifest:
+            manifest = json.load(manifest)
+
+        assert manifest['indices'] == self._written
+        assert tuple(manifest['time_range']) == self._generator.get_time_range()
+
+        with gzip.open('{}/logstash-helios.ndjson.gz'.format(self._data_dir), 'rt') as handle:
+            assert len(handle.readlines()) == self._written['logstash-helios']
+
+    def test_sources(self):
+        for source_class in [DBQueryNoLimitSource, HeliosSource, KubernetesBackoffSource, UCPErrorsSource]:
+            reports = source_class(es_host=self._server.url).query(threshold=1)
+
+            assert 0 < len(reports) <= 10, source_class.__name__
@@ -0,0 +1,41 @@
+"""
+Set of unit tests for NormalizationRules class
+"""
+import re
+import unittest
+
+from ..sources.normalization import NormalizationRules
+
+
+class NormalizationRulesTestClass(unittest.TestCase):
+    """
+    Unit tests for NormalizationRules class
+    """
+    def test_apply(self):
+        rules = NormalizationRules(
+            [
+                (r'\d+ bytes', 'N bytes'),
+                (r'offset \d+', 'offset N'),
+                (r'php fatal error:\s+', 'PHP Fatal Error: ', re.IGNORECASE),
+            ],
+            [
+                (r'/usr/wikia/slot1/(\d+)', r'/slot/\1'),
+            ],
+        )
+
+        assert rules.apply('Failed to read 42 bytes at offset 1024') == 'Failed to read N bytes at offset N'
+        assert rules.apply('PHP Fatal error:   foo in /usr/wikia/slot1/123/index.php') == \
+            'PHP Fatal Error: foo in /slot/123/index.php'
+        assert rules.apply('foo') == 'foo'
+
+    def test_steps_are_applied_in_order(self):
+        rules = NormalizationRules(
+            [(r'\d+', 'N')],
+            [(r'N+', 'X')],
+        )
+
+        assert rules.apply('123 foo 45') == 'X foo X'
+
+    def test_fused_rules_with_backreferences(self):
+        with self.assertRaises(AssertionError):
+            NormalizationRules([(r'(\d+)', r'\1'), (r'foo', 'bar')])
@@ -24,6 +24,14 @@ class PHPErrorsSourceTestClass(unittest.TestCase):
 
         assert self._source._filter({'@message': 'PHP Fatal Error: Allowed memory size of 536870912 bytes exhausted on line 42', '@source_host': 'ap-s32'}) is False  # do not report OOM errors
 
+    def test_match(self):
+        assert self._source._match({'@message': 'PHP Fatal Error: bar on line 22'}, 'PHP Fatal Error') is True
+        assert self._source._match({'@message': 'PHP Fatal error:  bar on line 22'}, 'PHP Fatal Error') is True
+        assert self._source._match({'@message': 'PHP Catchable Fatal error: bar'}, 'PHP Fatal Error') is False
+        assert self._source._match({'@message': 'PHP Catchable Fatal error: bar'}, 'PHP Catchable Fatal') is True
+        assert self._source._match({'@message': 'PHP Warnings: bar'}, 'PHP Warning') is False
+        assert self._source._match({}, 'PHP Warning') is False
+
     def test_normalize(self):
         # normalize file path
         assert self._source._normalize({
@@ -3,7 +3,11 @@ Set of unit tests for PHPLogsSource
 """
 import unittest
 
+from ..sources import PHPErrorsSource, PHPExceptionsSource, PHPTypeErrorsSource, DBQueryErrorsSource
 from ..sources.php.common import PHPLogsSource
+from ..sources.php.coordinator import PHPLogsCoordinator
+from ..sources.php.security import PHPSecuritySource
+from ..sources.kibana import KibanaRow
 
 
 class PHPLogsSourceTestClass(unittest.TestCase):
@@ -107,3 +111,128 @@ class PHPLogsSourceTestClass(unittest.TestCase):
             "/usr/wikia/slot1/7550/src/includes/wikia/nirvana/WikiaApp.class.php:638",
             "/usr/wikia/slot1/7550/src/wikia.php:48"
         ]}) == '/includes/wikia/api/SendGridPostBackApiController.class.php:77'
+
+
+class PHPSecuritySourceTestClass(unittest.TestCase):
+    """
+    Unit tests for PHPSecuritySource class
+    """
+    def test_normalize(self):
+        source = PHPSecuritySource()
+        fetched = []
+
+        def get_documents(rows, fields=None):
+            fetched.append(([row.doc_id for row in rows], fields))
+            return [{'@exception': {'trace': [
+                "/usr/wikia/slot1/7550/src/extensions/wikia/Security/classes/CSRFDetector.class.php:81",
+                "/usr/wikia/slot1/7550/src/includes/wikia/api/SendGridPostBackApiController.class.php:77",
+            ]}}]
+
+        source._kibana.get_documents = get_documents
+
+        # backtraces are not fetched with the entries
+        assert '@exception.trace' not in source.FIELDS
+
+        entry = KibanaRow({'@exception': {'file': '/extensions/wikia/Security/classes/CSRFDetector.class.php'}},
+                          'logstash-mediawiki', 'doc-1')
+
+        assert source._normalize(entry) == \
+            'CSRF-CSRF-/includes/wikia/api/SendGridPostBackApiController.class.php:77'
+        assert entry['@exception']['trace'][0].endswith('CSRFDetector.class.php:81')
+
+        # entries that are not reported do not need it
+        entry = KibanaRow({'@exception': {'file': '/extensions/wikia/Foo.php'}}, 'logstash-mediawiki', 'doc-2')
+
+        assert source._normalize(entry) is None
+        assert fetched == [(['doc-1'], ['@exception.trace'])]
+
+
+class PHPLogsCoordinatorTestClass(unittest.TestCase):
+    """
+    Unit tests for PHPLogsCoordinator class
+    """
+    ENTRIES = [
+        {'@message': 'PHP Fatal Error: foo in /includes/Foo.php on line 42', '@fields': {'environment': 'prod', 'http_url': 'http://foo.net'}},
+        {'@message': 'PHP Fatal Error: foo in /includes/Foo.php on line 42', '@fields': {'environment': 'prod', 'http_url': 'http://foo.net'}},
+        {'@message': 'PHP Warning: bar in /includes/Bar.php on line 2', '@fields': {'environment': 'prod', 'http_url': 'http://foo.net'}},
+        {'@message': 'Foo', 'severity': 'error', '@fields': {'environment': 'prod', 'app_name': 'mediawiki'}, '@exception': {'class': 'TypeError', 'message': 'Foo'}},
+        {'@message': 'Bar', 'severity': 'error', '@fields': {'environment': 'prod', 'app_name': 'mediawiki'}, '@exception': {'class': 'DBQueryError', 'message': 'Bar'}},
+    ]
+
+    def test_query(self):
+        coordinator = PHPLogsCoordinator(sources=[
+            (PHPErrorsSource, [('PHP Fatal Error', 2), ('PHP Warning', 1)]),
+            (PHPExceptionsSource, [('error', 1)]),
+            (PHPTypeErrorsSource, [('', 1)]),
+            (DBQueryErrorsSource, [('', 5)]),
+        ])
+
+        queries = []
+
+        def query_by_string(query, limit):
+            queries.append(query)
+            return iter(self.ENTRIES)
+
+        coordinator._kibana.query_by_string = query_by_string
+
+        # fields needed by all sources are fetched
+        assert '@message' in coordinator.FIELDS
+        assert '@exception.class' in coordinator.FIELDS
+        assert '@context.errno' in coordinator.FIELDS
+
+        reports = coordinator.query()
+
+        # a single query is made
+        assert len(queries) == 1
+        assert queries[0].startswith('(@message:"^PHP Fatal Error") OR (@message:"^PHP Warning") OR ')
+
+        # entries are routed to every source and query they match
+        assert [(report.get_labels()[0], report.get_counter()) for report in reports] == [
+            ('PHPErrors', 2), ('PHPErrors', 1), ('PHPExceptions', 1), ('PHPTypeError', 1),
+        ]
+
+    def test_query_limits(self):
+        coordinator = PHPLogsCoordinator(sources=[
+            (PHPErrorsSource, [('PHP Fatal Error', 1), ('PHP Warning', 1)]),
+            (PHPTypeErrorsSource, [('', 1)]),
+        ])
+
+        limits = []
+
+        def query_by_string(query, limit):
+            limits.append(limit)
+            return iter(self.ENTRIES * 10)
+
+        coordinator._kibana.query_by_string = query_by_string
+
+        # each query gets at most LIMIT entries, even if it matches most of the fetched ones
+        coordinator._sources[0][0].LIMIT = 2
+        coordinator._sources[1][0].LIMIT = 3
+
+        reports = coordinator.query()
+
+        assert limits == [2 * 2 + 3]
+        assert [(report.get_labels()[0], report.get_counter()) for report in reports] == [
+            ('PHPErrors', 2), ('PHPErrors', 2), ('PHPTypeError', 3),
+        ]
+
+    def test_query_failing_source(self):
+        coordinator = PHPLogsCoordinator(sources=[
+            (PHPErrorsSource, [('PHP Fatal Error', 2), ('PHP Warning', 1)]),
+            (PHPExceptionsSource, [('error', 1)]),
+            (PHPTypeErrorsSource, [('', 1)]),
+        ])
+
+        coordinator._kibana.query_by_string = lambda query, limit: iter(self.ENTRIES)
+
+        def _filter(entry):
+            raise ValueError('Filtering failed')
+
+        coordinator._sources[1][0]._filter = _filter
+
+        # the failing source does not affect the rest of them
+        reports = coordinator.query()
+
+        assert [(report.get_labels()[0], report.get_counter()) for report in reports] == [
+            ('PHPErrors', 2), ('PHPErrors', 1), ('PHPTypeError', 1),
+        ]
@@ -0,0 +1,39 @@
+"""
+Set of unit tests for ReportsPipeSource
+"""
+import time
+import unittest
+
+from ..fakes.elasticsearch_server import FakeElasticsearchServer
+from ..sources import ReportsPipeSource
+
+
+class ReportsPipeSourceTestClass(unittest.TestCase):
+    """
+    Unit tests for ReportsPipeSource class
+    """
+    def test_long_hashes(self):
+        """ Long hashes are not indexed as keywords, entries need to be grouped by the source """
+        server = FakeElasticsearchServer().start()
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(time.time() - 60))
+
+        server.add_documents('logstash-jira-reporter-pipe', [
+            {'@timestamp': timestamp, 'report': {
+                'title': 'Script #{} is not used'.format(idx),
+                'message': 'Consider removing this script',
+                'hash': 'not-used-maintenance-scripts-' + '/extensions/wikia/Foo' * 20 + '/script{}.php'.format(idx),
+                'tags': ['not-used-maintenance-scripts'],
+            }}
+            for idx in (1, 2, 2)
+        ])
+
+        try:
+            reports = ReportsPipeSource(es_host=server.url).query(threshold=1)
+        finally:
+            server.stop()
+
+        assert sorted((report.get_summary(), report.get_counter()) for report in reports) == [
+            ('Script #1 is not used', 1),
+            ('Script #2 is not used', 2),
+        ]
+        assert reports[0].get_labels() == ['not-used-maintenance-scripts']
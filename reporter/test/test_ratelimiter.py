@@ -0,0 +1,146 @@
+"""
+Set of unit tests for rate limiting of Jira requests
+"""
+import io
+import unittest
+
+from unittest.mock import patch
+
+from jira import JIRAError
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+
+from ..fakes.jira_server import FakeJiraServer
+from ..ratelimiter import RateLimitedAdapter, RateLimitedJIRA, TokenBucket
+
+
+class FakeClock(object):
+    """ Time that moves forward only when someone sleeps """
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def get_response(status_code, headers=None):
+    response = Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(b'')
+    return response
+
+
+class TokenBucketTestClass(unittest.TestCase):
+    """
+    Unit tests for TokenBucket class
+    """
+    def test_acquire(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock.time, sleep=clock.sleep)
+
+        # the burst is available at once
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        assert clock.sleeps == []
+
+        # then we get two tokens a second
+        assert bucket.acquire() == 0.5
+        assert bucket.acquire() == 0.5
+
+        # tokens are refilled up to the burst size
+        clock.now += 10
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        assert bucket.acquire() == 0.5
+
+    def test_pause(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=10, clock=clock.time, sleep=clock.sleep)
+
+        bucket.pause(5)
+        assert bucket.acquire() == 5
+        assert bucket.acquire() == 0
+
+
+class RateLimitedAdapterTestClass(unittest.TestCase):
+    """
+    Unit tests for RateLimitedAdapter class
+    """
+    def setUp(self):
+        self._clock = FakeClock()
+        self._bucket = TokenBucket(rate=10, burst=10, clock=self._clock.time, sleep=self._clock.sleep)
+
+        self._request = PreparedRequest()
+        self._request.prepare(method='GET', url='https://jira.example.net/rest/api/2/search')
+
+    def test_parse_retry_after(self):
+        assert RateLimitedAdapter.parse_retry_after(None) is None
+        assert RateLimitedAdapter.parse_retry_after('5') == 5
+        assert RateLimitedAdapter.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+        assert RateLimitedAdapter.parse_retry_after('foo') is None
+
+    def test_retry_after(self):
+        adapter = RateLimitedAdapter(self._bucket, backoff=0.5)
+        responses = [get_response(429, {'Retry-After': '3'}), get_response(200)]
+
+        with patch.object(HTTPAdapter, 'send', side_effect=responses) as send:
+            assert adapter.send(self._request).status_code == 200
+            assert send.call_count == 2
+
+        # the bucket is paused for Retry-After (with the jitter added)
+        assert len(self._clock.sleeps) == 1
+        assert 3 <= self._clock.sleeps[0] <= 3.5
+
+    def test_backoff(self):
+        adapter = RateLimitedAdapter(self._bucket, retries=2, backoff=1, max_backoff=3)
+        responses = [get_response(429), get_response(429), get_response(429)]
+
+        with patch.object(HTTPAdapter, 'send', side_effect=responses) as send:
+            # give up after two retries
+            assert adapter.send(self._request).status_code == 429
+            assert send.call_count == 3
+
+        assert len(self._clock.sleeps) <= 2
+        assert all(0 <= delay <= 3 for delay in self._clock.sleeps)
+
+    def test_no_retry(self):
+        adapter = RateLimitedAdapter(self._bucket)
+
+        # 503 is retried only when the server tells us when to do it
+        with patch.object(HTTPAdapter, 'send', side_effect=[get_response(503), get_response(404)]) as send:
+            assert adapter.send(self._request).status_code == 503
+            assert adapter.send(self._request).status_code == 404
+            assert send.call_count == 2
+
+        assert self._clock.sleeps == []
+
+
+class RateLimitedJIRATestClass(unittest.TestCase):
+    """
+    Unit tests for RateLimitedJIRA class
+    """
+    def setUp(self):
+        self._server = FakeJiraServer(retry_after=0).start()
+
+    def tearDown(self):
+        self._server.stop()
+
+    def test_retries(self):
+        client = RateLimitedJIRA(
+            adapter=RateLimitedAdapter(TokenBucket(rate=1000, burst=1000), retries=2, backoff=0.01),
+            server=self._server.url,
+            basic_auth=('test', 'test')
+        )
+
+        self._server.error_rate = 1
+
+        with self.assertRaises(JIRAError) as context:
+            client.search_issues("project = 'ER'")
+
+        # only the adapter retries rejected requests
+        assert context.exception.status_code == 429
+        assert self._server.get_stats()['429'] == 3
@@ -0,0 +1,201 @@
+"""
+Set of unit tests for Jira reporter (run against the local Jira stand-in)
+"""
+import time
+import unittest
+
+from ..fakes.jira_server import FakeJiraServer
+from ..reporters import Jira
+from ..reports import Report
+
+UNIQUE_ID_FIELD = 'customfield_13200'
+LAST_SEEN_FIELD = 'customfield_16900'
+
+
+class JiraTestClass(unittest.TestCase):
+    """
+    Unit tests for Jira class
+    """
+    def setUp(self):
+        self._server = FakeJiraServer(custom_fields={UNIQUE_ID_FIELD: 'Unique ID', LAST_SEEN_FIELD: 'ER Date'}).start()
+
+        self._config = {
+            'url': self._server.url,
+            'user': 'test',
+            'password': 'test',
+            'project': 'ER',
+            'fields': {
+                'default': {
+                    'issuetype': {'name': 'Defect'},
+                    'priority': {'id': '8'},
+                },
+                'custom': {
+                    'unique_id': UNIQUE_ID_FIELD,
+                    'last_seen': LAST_SEEN_FIELD,
+                },
+            },
+            'rate_limit': {'rate': 1000, 'burst': 1000},
+        }
+
+        self._jira = Jira(config=self._config)
+
+    def tearDown(self):
+        self._server.stop()
+
+    @staticmethod
+    def _get_report(unique_id, priority=None):
+        report = Report(summary='Foo {}'.format(unique_id), description='Bar', priority=priority)
+        report.set_unique_id(unique_id)
+
+        return report
+
+    def _get_requests(self, endpoint):
+        return self._server.get_stats().get(endpoint, 0)
+
+    def test_find_tickets(self):
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'foo'})
+        self._server.add_issue(status='Closed', resolution='Done', fields={UNIQUE_ID_FIELD: 'foo'})
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'bar'})
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'foobar'})  # text search matches "foo" as well
+
+        self._jira.LOOKUP_BATCH_SIZE = 2
+        searches = self._get_requests('search')
+
+        found = self._jira.find_tickets(['foo', 'bar', 'test', 'foo', 'baz'])
+
+        # four unique IDs in two batches (unique IDs not found are looked up in descriptions then)
+        assert self._get_requests('search') - searches == 4
+
+        assert sorted(found.keys()) == ['bar', 'baz', 'foo', 'test']
+        assert [ticket.key for ticket in found['foo']] == ['ER-1', 'ER-2']
+        assert [ticket.key for ticket in found['bar']] == ['ER-3']
+        assert found['test'] == []
+
+    def test_find_legacy_tickets(self):
+        """ Tickets reported before the unique ID field was introduced have the hash in their description only """
+        self._server.add_issue(fields={'description': 'Foo\n\nHash: foo\nOccurrences: 2 in the last hour'})
+        self._server.add_issue(fields={'description': 'Bar\n\nHash: bar', UNIQUE_ID_FIELD: 'test'})
+        self._server.add_issue(fields={'description': 'Baz\n\nHash: baz', UNIQUE_ID_FIELD: 'baz'})
+
+        found = self._jira.find_tickets(['foo', 'bar', 'baz'])
+
+        assert [ticket.key for ticket in found['foo']] == ['ER-1']
+        assert found['bar'] == []
+        assert [ticket.key for ticket in found['baz']] == ['ER-3']
+
+        # no duplicate is created for the legacy ticket
+        reports = [self._get_report('foo'), self._get_report('bar')]
+
+        assert self._jira.report_many(reports) == [Jira.OUTCOME_DUPLICATE, Jira.OUTCOME_REPORTED]
+        assert self._jira.ticket_exists('foo') is True
+        assert [issue['key'] for issue in self._server.search("cf[13200] ~ 'bar'")] == ['ER-4']
+
+    def test_find_tickets_without_legacy_lookup(self):
+        """ Descriptions are not searched once the unique ID field was backfilled """
+        self._config['legacy_lookup'] = False
+        self._server.add_issue(fields={'description': 'Foo\n\nHash: foo'})
+
+        searches = self._get_requests('search')
+        found = self._jira.find_tickets(['foo', 'bar'])
+
+        assert self._get_requests('search') - searches == 1
+        assert found == {'foo': [], 'bar': []}
+
+    def test_report_many(self):
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'foo', LAST_SEEN_FIELD: '2020-01-01'})
+
+        reports = [self._get_report('foo'), self._get_report('bar'), self._get_report('bar')]
+        outcomes = self._jira.report_many(reports, workers=2)
+
+        # the same unique ID is reported once during a run
+        assert outcomes == [Jira.OUTCOME_DUPLICATE, Jira.OUTCOME_REPORTED, Jira.OUTCOME_DUPLICATE]
+        assert self._get_requests('create') == 1
+
+        assert [issue['key'] for issue in self._server.search("cf[13200] ~ 'bar'")] == ['ER-2']
+        assert self._server.get_issue('ER-1')[LAST_SEEN_FIELD] == Jira.get_today_timestamp()
+
+    def test_report_many_batches(self):
+        """ Reports of each source are sent as soon as it is done """
+        assert self._jira.report_many([self._get_report('foo')]) == [Jira.OUTCOME_REPORTED]
+        assert self._jira.report_many([self._get_report('bar'), self._get_report('foo')]) == \
+            [Jira.OUTCOME_REPORTED, Jira.OUTCOME_DUPLICATE]
+
+        assert self._get_requests('create') == 2
+
+    def test_report_failing_description(self):
+        """ Descriptions are rendered lazily when reporting, a failing one does not affect other reports """
+        def get_description():
+            raise KeyError('context')
+
+        failing = Report(summary='Foo', description=get_description)
+        failing.set_unique_id('foo')
+
+        assert self._jira.report_many([failing, self._get_report('bar')]) == \
+            [Jira.OUTCOME_FAILED, Jira.OUTCOME_REPORTED]
+
+        assert self._get_requests('create') == 1
+
+        # the failed report is retried by the next call
+        assert self._jira.report_many([self._get_report('foo')]) == [Jira.OUTCOME_REPORTED]
+        assert self._get_requests('create') == 2
+
+    def test_report_priority(self):
+        reports = [self._get_report('foo', priority={'id': '2'}), self._get_report('bar')]
+
+        assert self._jira.report_many(reports, workers=1) == [Jira.OUTCOME_REPORTED] * 2
+
+        # the priority of the first report does not leak to the next one
+        assert self._server.get_issue('ER-1')['priority'] == {'id': '2'}
+        assert self._server.get_issue('ER-2')['priority'] == {'id': '8'}
+        assert self._config['fields']['default']['priority'] == {'id': '8'}
+
+    def test_reopen(self):
+        month_ago = time.time() - 30 * 86400
+
+        for unique_id in ['foo', 'bar']:
+            self._server.add_issue(status='Closed', resolution='Done', resolved=month_ago,
+                                   fields={UNIQUE_ID_FIELD: unique_id})
+
+        # closed as "Won't Fix" and recently closed tickets are left as they are
+        self._server.add_issue(status='Closed', resolution="Won't Fix", resolved=month_ago,
+                               fields={UNIQUE_ID_FIELD: 'test'})
+        self._server.add_issue(status='Closed', resolution='Done', fields={UNIQUE_ID_FIELD: 'baz'})
+
+        reports = [self._get_report(unique_id) for unique_id in ['foo', 'bar', 'test', 'baz']]
+
+        assert self._jira.report_many(reports, workers=1) == [Jira.OUTCOME_DUPLICATE] * 4
+
+        assert [self._server.get_issue(key)['status'] for key in ['ER-1', 'ER-2', 'ER-3', 'ER-4']] == \
+            ['Open', 'Open', 'Closed', 'Closed']
+
+        # the comment is sent with the transition, transitions are fetched once per (project, type, status)
+        for key in ['ER-1', 'ER-2']:
+            assert [comment['body'] for comment in self._server.get_issue(key)['comments']] == \
+                ['[~Unassigned], I reopened this ticket - logs say it is still valid']
+
+        assert self._get_requests('transitions') == 1
+        assert self._get_requests('transition') == 2
+        assert self._get_requests('comment') == 0
+        assert list(self._jira._transitions.keys()) == [('ER', 'Defect', 'Closed')]
+
+    def test_should_update_last_seen(self):
+        today = Jira.get_today_timestamp()
+
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'foo', LAST_SEEN_FIELD: '2020-01-01'})
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'bar', LAST_SEEN_FIELD: today})
+
+        client = self._jira.get_api_client()
+
+        # updated once a day at most
+        assert self._jira._should_update_last_seen(client.issue('ER-1')) is True
+        assert self._jira._should_update_last_seen(client.issue('ER-1')) is False
+        assert self._jira._should_update_last_seen(client.issue('ER-2')) is False
+
+        # the same ticket found again during a run is not updated
+        self._server.add_issue(fields={UNIQUE_ID_FIELD: 'baz', LAST_SEEN_FIELD: '2020-01-01'})
+
+        assert self._jira.ticket_exists('baz') is True
+        assert self._jira.ticket_exists('baz') is True
+
+        assert self._get_requests('update') == 1
+        assert self._server.get_issue('ER-3')[LAST_SEEN_FIELD] == today
@@ -0,0 +1,47 @@
+"""
+Set of unit tests for Report class
+"""
+import pickle
+import unittest
+
+from ..reports import Report
+
+
+class ReportTestClass(unittest.TestCase):
+    """
+    Unit tests for Report class
+    """
+    def test_description(self):
+        report = Report(summary='Foo', description='Bar')
+        report.append_to_description('\n\nTest')
+
+        assert report.get_description() == 'Bar\n\nTest'
+
+    def test_lazy_description(self):
+        calls = []
+
+        def get_description():
+            calls.append(True)
+            return 'Bar'
+
+        report = Report(summary='Foo', description=get_description)
+        report.append_to_description(lambda: '\n\nLink')
+        report.append_to_description('\n\nTest')
+
+        assert calls == []
+
+        assert report.get_description() == 'Bar\n\nLink\n\nTest'
+        assert report.get_description() == 'Bar\n\nLink\n\nTest'
+        assert len(calls) == 1
+
+    def test_pickle(self):
+        report = Report(summary='Foo', description=lambda: 'Bar', label='Test')
+        report.append_to_description(lambda: '\n\nLink')
+        report.set_counter(5)
+
+        report = pickle.loads(pickle.dumps(report))
+
+        assert report.get_summary() == 'Foo'
+        assert report.get_description() == 'Bar\n\nLink'
+        assert report.get_labels() == ['Test']
+        assert report.get_counter() == 5
@@ -0,0 +1,123 @@
+"""
+Set of unit tests for SourcesRunner class
+"""
+import subprocess
+import sys
+import time
+import unittest
+
+from ..reports import Report
+from ..runner import SourceJob, SourcesRunner
+from ..sources import Source
+
+
+class SleepingSource(Source):
+    """ Returns a single report named after the query after a given delay """
+    def __init__(self, delay=0):
+        super(SleepingSource, self).__init__()
+        self._delay = delay
+
+    def query(self, query='', threshold=50):
+        time.sleep(self._delay)
+        return [Report(summary=query, description='')]
+
+
+class FailingSource(Source):
+    """ Always fails """
+    def query(self, query='', threshold=50):
+        raise ValueError('Source failed')
+
+
+class SourceError(Exception):
+    """ Can not be unpickled as its constructor takes two arguments """
+    def __init__(self, source, message):
+        super(SourceError, self).__init__('{}: {}'.format(source, message))
+
+
+class UnpicklableErrorSource(Source):
+    """ Fails with an exception that can not be passed back from a child process """
+    def query(self, query='', threshold=50):
+        raise SourceError('foo', 'Source failed')
+
+
+class SourcesRunnerTestClass(unittest.TestCase):
+    """ Test SourcesRunner class """
+
+    def test_job_repr(self):
+        assert repr(SourceJob(SleepingSource, 'foo', threshold=5, delay=1)) == \
+            "<SourceJob: SleepingSource(delay=1) query:'foo' threshold:5>"
+
+        assert repr(SourceJob(SleepingSource, queries=[('foo', 5), ('bar', 1)])) == \
+            "<SourceJob: SleepingSource() queries:[('foo', 5), ('bar', 1)]>"
+
+    def test_run(self):
+        runner = SourcesRunner(workers=2, timeout=5)
+
+        reports = runner.run([
+            SourceJob(SleepingSource, 'slow', delay=0.3),
+            SourceJob(SleepingSource, 'fast', delay=0),
+            SourceJob(FailingSource, 'failing'),
+            SourceJob(SleepingSource, 'queued', delay=0),
+        ])
+
+        # reports are streamed in the order sources complete
+        assert [report.get_summary() for report in reports] == ['fast', 'queued', 'slow']
+        assert runner.get_timed_out_jobs() == []
+
+    def test_run_with_timeout(self):
+        runner = SourcesRunner(workers=2, timeout=0.2)
+        job = SourceJob(SleepingSource, 'slow', delay=1)
+
+        reports = list(runner.run([
+            job,
+            SourceJob(SleepingSource, 'fast', delay=0),
+        ]))
+
+        assert [report.get_summary() for report in reports] == ['fast']
+        assert runner.get_timed_out_jobs() == [job]
+
+    def test_run_batches(self):
+        runner = SourcesRunner(workers=2, timeout=5)
+
+        batches = runner.run_batches([
+            SourceJob(SleepingSource, 'slow', delay=0.3),
+            SourceJob(SleepingSource, queries=[('foo', 1), ('bar', 1)]),
+            SourceJob(FailingSource, 'failing'),
+        ])
+
+        # reports of each job are yielded together
+        assert [[report.get_summary() for report in reports] for reports in batches] == [['foo', 'bar'], ['slow']]
+
+    def test_run_processes(self):
+        runner = SourcesRunner(workers=2, timeout=0.5, executor=SourcesRunner.EXECUTOR_PROCESS)
+        job = SourceJob(SleepingSource, 'slow', delay=30)
+
+        started = time.time()
+
+        reports = list(runner.run([
+            job,
+            SourceJob(FailingSource, 'failing'),
+            SourceJob(UnpicklableErrorSource, 'unpicklable'),
+            SourceJob(SleepingSource, 'fast', delay=0),
+        ]))
+
+        # failing jobs are reported as such, they do not time out
+        assert [report.get_summary() for report in reports] == ['fast']
+        assert runner.get_timed_out_jobs() == [job]
+
+        # the process of the job that timed out is terminated
+        assert time.time() - started < 5
+
+        for process in list(runner._processes.values()):
+            process.join(timeout=1)
+            assert process.exitcode is not None
+
+    def test_timed_out_thread_does_not_block_exit(self):
+        script = 'from reporter.test.test_runner import SleepingSource; from reporter.runner import *; ' \
+            'print(list(SourcesRunner(timeout=0.2).run([SourceJob(SleepingSource, delay=30)])))'
+
+        started = time.time()
+        output = subprocess.check_output([sys.executable, '-c', script], timeout=10)
+
+        assert output.strip() == b'[]'
+        assert time.time() - started < 10
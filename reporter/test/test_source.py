@@ -81,6 +81,35 @@ class DummySource(Source):
     pass
 
 
+class DummyManySource(DummySource):
+    """ Dummy class used for testing Source.query_many """
+    def __init__(self):
+        super(DummyManySource, self).__init__()
+        self.requests = 0
+
+    def _get_entries_many(self, queries):
+        self.requests += 1
+        return iter(self._get_entries(query=','.join(queries)))
+
+    def _match(self, entry, query):
+        return query in entry.get('@message', '')
+
+
+class DummyRawKeySource(DummySource):
+    """ Dummy class used for testing entries normalized using the raw key """
+    NORMALIZE_FIELDS = ['@message']
+
+    def __init__(self):
+        super(DummyRawKeySource, self).__init__()
+        self.normalized = 0
+
+    def _normalize(self, entry):
+        self.normalized += 1
+        entry['@normalized'] = True
+
+        return super(DummyRawKeySource, self)._normalize(entry)
+
+
 class SourceTestClass(unittest.TestCase):
     """ Test Source class via DummySource """
 
@@ -93,8 +122,8 @@ class SourceTestClass(unittest.TestCase):
         # threshold set to '2' means that 'Foo Bar' report will be returned
         reports = source.query(query=self.QUERY, threshold=2)
 
-        # two various reports where generated by the source (threshold not yet applied)
-        assert source.get_reports_count() == 2
+        # only the report that reached the threshold was generated by the source
+        assert source.get_reports_count() == 1
 
         # one report to be returned (threshold applied)
         assert len(reports) == 1
@@ -107,3 +136,97 @@ class SourceTestClass(unittest.TestCase):
         assert report.get_summary() == '[Error] Foo-Bar - http://example.com'
         assert report.get_description() == '[456, "{query}"]'.format(query=self.QUERY)
         assert report.get_unique_id() == 'e5f9ec048d1dbe19c70f720e002f9cb1'
+
+    def test_source_flow_logging(self):
+        """ Items below the threshold are summarized with a single line """
+        source = DummySource()
+
+        with self.assertLogs(source._logger, level='INFO') as logs:
+            source.query(query=self.QUERY, threshold=2)
+
+        assert [line for line in logs.output if 'Skipped' in line] == \
+            ['INFO:DummySource:Skipped 1 of 2 items below the threshold of 2 occurrences']
+
+    def test_source_flow_with_generator(self):
+        """ Entries can be streamed by _get_entries """
+        source = DummySource()
+        entries = source._get_entries(self.QUERY)
+
+        # entries are consumed one by one
+        source._get_entries = lambda query: (entry for entry in entries)
+
+        reports = source.query(query=self.QUERY, threshold=2)
+
+        assert len(reports) == 1
+        assert reports[0].get_counter() == 2
+        assert source._filtered_entries == 4  # entries without @message are filtered out
+
+    def test_source_query_many(self):
+        """ Entries are fetched once and routed to every query they match """
+        source = DummyManySource()
+
+        reports = source.query_many([('Foo', 2), ('Bar', 3), ('test', 1)])
+
+        assert source.requests == 1
+        assert [report.get_counter() for report in reports] == [2]
+        assert reports[0].get_summary() == '[Error] Foo-Bar - http://example.com'
+
+        # fall back to queries run one by one
+        reports = DummySource().query_many([('foo', 2), ('bar', 2)])
+
+        assert [report.get_description() for report in reports] == ['[456, "foo"]', '[456, "bar"]']
+
+    def test_source_add_entry(self):
+        """ Entries fetched for multiple sources at once are passed to each of them """
+        source = DummyManySource()
+        groups = [dict(), dict()]
+
+        assert source.match({'@message': 'Foo Bar'}, 'Foo') is True
+        assert source.add_entry({'foo': 'bar'}, groups) == 0
+        assert source.add_entry({'@message': 'Foo Bar'}, groups) == 1
+
+        assert [sorted(group.keys()) for group in groups] == [['foo-bar'], ['foo-bar']]
+        assert source.get_reports(groups[0], threshold=2) == []
+
+    def test_source_raw_key(self):
+        """ Entries with the same values of NORMALIZE_FIELDS are normalized once """
+        source = DummyRawKeySource()
+        entries = [
+            {'@message': 'Foo Bar', '@fields': {}},
+            {'@message': 'Foo Bar'},
+            {'@message': 'Foo Bar', '@fields': {'http_url': 'http://example.com'}},
+            {'@message': 'Foo Bar', '@fields': {'http_url': 'http://example.net'}},
+            {'@message': 'Foo-Bar'},
+            {'@message': 'test', '@context': {'foo': [1, 2]}},
+        ]
+
+        normalized = source._normalize_entries(iter(entries))
+
+        assert sorted(normalized.keys()) == ['foo-bar', 'test']
+        assert normalized['foo-bar']['cnt'] == 5
+
+        # the first entry with all required fields is kept and updated by _normalize
+        assert normalized['foo-bar']['entry'] is entries[2]
+        assert entries[2]['@normalized'] is True
+        assert '@normalized' not in entries[3]
+
+        # three distinct messages + the entry that replaced the one without all required fields
+        assert source.normalized == 4
+
+        assert source._get_raw_key({'@message': 1}) != source._get_raw_key({'@message': True})
+        assert source._get_raw_key({'@message': ['foo']}) == source._get_raw_key({'@message': ['foo']})
+        assert DummySource()._get_raw_key({'@message': 'foo'}) is None
+
+    def test_source_raw_key_cache_size(self):
+        """ Only the most recently used normalized keys are kept """
+        source = DummyRawKeySource()
+        source.NORMALIZED_KEYS_CACHE_SIZE = 2
+
+        source._normalize_entries(iter([{'@message': message} for message in ['foo', 'bar', 'foo', 'test', 'foo']]))
+
+        assert list(source._normalized_keys.values()) == ['test', 'foo']
+        assert source.normalized == 3
+
+        # "bar" was removed from the cache
+        source._normalize_entries(iter([{'@message': 'bar'}]))
+        assert source.normalized == 4
@@ -0,0 +1,50 @@
+"""
+Set of unit tests for TicketIndex class
+"""
+import os
+import tempfile
+import unittest
+
+from ..tickets import IndexedTicket, TicketIndex
+
+
+class TicketIndexTestClass(unittest.TestCase):
+    """
+    Unit tests for TicketIndex class
+    """
+    def setUp(self):
+        (handle, self._path) = tempfile.mkstemp(suffix='.sqlite')
+        os.close(handle)
+
+    def tearDown(self):
+        os.unlink(self._path)
+
+    def test_index(self):
+        index = TicketIndex(self._path)
+        assert index.get_last_sync() is None
+        assert index.get_tickets(['foo']) == {}
+
+        index.update([
+            IndexedTicket('ER-1', 'foo', 'Open', None, None, '2020-01-01'),
+            IndexedTicket('ER-2', 'bar', 'Closed', "Won't Fix", '2019-12-01T10:00:00.000+0000', None),
+            IndexedTicket('ER-3', 'foo', 'Closed', 'Done', '2019-12-02T10:00:00.000+0000', '2019-12-01'),
+        ], synced_at=1000)
+
+        assert index.get_last_sync() == 1000
+
+        tickets = index.get_tickets(['foo', 'bar', 'test'])
+        assert sorted(tickets.keys()) == ['bar', 'foo']
+        assert [ticket.key for ticket in tickets['foo']] == ['ER-1', 'ER-3']
+        assert tickets['bar'][0].resolution == "Won't Fix"
+
+        # ticket changed since the previous sync, the sync timestamp is kept as it is
+        index.update([IndexedTicket('ER-1', 'foo', 'In Progress', None, None, '2020-01-02')])
+        assert index.get_last_sync() == 1000
+
+        # "ER Date" was updated
+        index.set_last_seen('ER-3', '2020-01-03')
+        assert index.get_tickets(['foo'])['foo'][1].last_seen == '2020-01-03'
+
+        # the index is kept on disk
+        tickets = TicketIndex(self._path).get_tickets(['foo'])
+        assert tickets['foo'][0] == IndexedTicket('ER-1', 'foo', 'In Progress', None, None, '2020-01-02')
@@ -5,7 +5,9 @@ Set of unit tests for UCPErrorsSource
 import unittest
 import json
 import os.path
+import time
 
+from ..fakes.elasticsearch_server import FakeElasticsearchServer
 from ..sources import UCPErrorsSource
 
 class UCPErrorsSourceTestClass(unittest.TestCase):
@@ -127,3 +129,45 @@ class UCPErrorsSourceTestClass(unittest.TestCase):
         second_report = self._source._get_report(self.entry)
 
         assert first_report.get_unique_id() == second_report.get_unique_id()
+
+    def test_normalize_env(self):
+        """ Entries that differ in the env fields only are grouped separately """
+        entries = [
+            {'@message': self.message, 'datacenter': 'SJC', 'kubernetes': {'labels': {'app': 'mediawiki-preview-ucp'}}},
+            {'@message': self.message, 'datacenter': 'SJC', 'kubernetes': {'labels': {'app': 'mediawiki-prod'}}},
+        ]
+
+        normalized = self._source._normalize_entries(iter(entries))
+        keys = sorted(normalized.keys())
+
+        assert len(keys) == 2
+        assert keys[0].endswith('-preview')
+        assert keys[1].endswith('-production')
+        assert [normalized[key]['cnt'] for key in keys] == [1, 1]
+
+    def test_query_stack_trace(self):
+        """ Stack traces are fetched for reported entries only, entries with one are preferred """
+        server = FakeElasticsearchServer().start()
+
+        entry = {
+            '@timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(time.time() - 60)),
+            '@message': self.message,
+            '@fields': self.entry['@fields'],
+            'datacenter': 'SJC',
+            'event': {'type': 'fatal'},
+        }
+
+        server.add_documents('logstash-mediawiki-unified-platform', [entry, dict(entry, stack_trace=self.stack_trace)])
+
+        try:
+            rows = list(UCPErrorsSource(es_host=server.url)._get_entries(''))
+            reports = UCPErrorsSource(es_host=server.url).query(threshold=1)
+        finally:
+            server.stop()
+
+        assert [('stack_trace' in row, row.existing_fields) for row in rows] == [(False, []), (False, ['stack_trace'])]
+
+        assert len(reports) == 1
+        assert reports[0].get_counter() == 2
+        assert reports[0].get_priority() == {'id': '9'}
+        assert self.stack_trace in reports[0].get_description()
@@ -0,0 +1,103 @@
+"""
+Local index of tickets reported so far (kept in sync with Jira)
+"""
+import logging
+import sqlite3
+import threading
+
+from collections import namedtuple
+
+# ticket details needed to handle a duplicated report without asking Jira
+IndexedTicket = namedtuple('IndexedTicket', [
+    'key', 'unique_id', 'status', 'resolution', 'resolution_date', 'last_seen'
+])
+
+
+class TicketIndex(object):
+    """
+    Keeps unique ID -> ticket key, status, resolution, resolution date and "ER Date" mapping in SQLite
+
+    The index is updated with tickets changed since the previous sync (see Jira.sync_index)
+    """
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS tickets (key TEXT PRIMARY KEY, unique_id TEXT NOT NULL, status TEXT, '
+        'resolution TEXT, resolution_date TEXT, last_seen TEXT)',
+        'CREATE INDEX IF NOT EXISTS tickets_unique_id ON tickets (unique_id)',
+        'CREATE TABLE IF NOT EXISTS sync (id INTEGER PRIMARY KEY CHECK (id = 0), timestamp INTEGER NOT NULL)',
+    ]
+
+    # SQLite limits the number of query parameters
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, path):
+        """
+        :type path str
+        :arg path: SQLite database file
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+        with self._lock, self._db:
+            for statement in self.SCHEMA:
+                self._db.execute(statement)
+
+    def get_last_sync(self):
+        """
+        Return UNIX timestamp of the last sync (None if the index was never synced)
+
+        :rtype: int|None
+        """
+        with self._lock:
+            row = self._db.execute('SELECT timestamp FROM sync').fetchone()
+
+        return row[0] if row else None
+
+    def update(self, tickets, synced_at=None):
+        """
+        Store given tickets (replacing their previous state) and the sync timestamp
+
+        :type tickets list[IndexedTicket]
+        :type synced_at int|None
+        """
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?)', tickets)
+
+            if synced_at is not None:
+                self._db.execute('INSERT OR REPLACE INTO sync VALUES (0, ?)', (synced_at,))
+
+        self._logger.info('Stored {} tickets'.format(len(tickets)))
+
+    def set_last_seen(self, key, last_seen):
+        """
+        Store "ER Date" set for a given ticket
+
+        :type key str
+        :type last_seen str
+        """
+        with self._lock, self._db:
+            self._db.execute('UPDATE tickets SET last_seen = ? WHERE key = ?', (last_seen, key))
+
+    def get_tickets(self, unique_ids):
+        """
+        Return indexed tickets for given unique IDs (the ones without a ticket are not included)
+
+        :type unique_ids list[str]
+        :rtype: dict[str, list[IndexedTicket]]
+        """
+        tickets = dict()
+
+        for offset in range(0, len(unique_ids), self.QUERY_BATCH_SIZE):
+            batch = unique_ids[offset:offset + self.QUERY_BATCH_SIZE]
+
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT key, unique_id, status, resolution, resolution_date, last_seen FROM tickets '
+                    'WHERE unique_id IN ({}) ORDER BY key'.format(', '.join('?' * len(batch))), batch).fetchall()
+
+            for row in rows:
+                ticket = IndexedTicket(*row)
+                tickets.setdefault(ticket.unique_id, []).append(ticket)
+
+        return tickets